@@ -0,0 +1,404 @@
+"""ASGI entry point with a native asyncio ingest path.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8000 --workers 4
+    python asgi.py   (one worker per core, see WEB_CONCURRENCY and BIND)
+
+POST /api/ingest is handled on the event loop: URL downloads use a shared
+httpx.AsyncClient and the CPU-bound analysis runs in the analysis process
+pool, so one process overlaps many downloads with analysis instead of
+blocking a thread per request. A client that disconnects cancels its
+download and analysis. Every other route, including the progress events
+of an ingest, is served by the Flask app.
+"""
+import asyncio
+import json
+import os
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+from urllib.parse import parse_qs
+
+from a2wsgi import WSGIMiddleware
+
+from controllers.ingest_controller import (
+    CANCELLED_STATUS,
+    FetchError,
+    analyse_content,
+    analysis_params,
+    ingest_response,
+    request_cancel_token,
+    request_deadline,
+    rejection_progress,
+    request_progress,
+    store_analysis,
+)
+from main import create_app
+from services.admission import ADMISSION, Overloaded, estimate_cost
+from services.cancellation import CANCEL_POLL_INTERVAL, Cancelled, CancelToken
+from services.compression import COMPRESS_MIN_BYTES, compress, negotiate
+from services.progress import ProgressReporter
+from services.result_cache import RESULT_CACHE, cache_key
+from services.serialization import dumps_bytes
+from services.single_flight import INGEST_FLIGHTS
+from services.workers import FETCH_WORKERS, get_analysis_pool, reset_analysis_pool
+
+# Concurrent downloads allowed per process
+ASYNC_FETCH_CONNECTIONS = int(os.getenv("ASYNC_FETCH_CONNECTIONS", str(FETCH_WORKERS * 8)))
+
+flask_app = create_app()
+wsgi_app = WSGIMiddleware(flask_app)
+
+_http_client = None
+
+
+def http_client():
+    """Shared AsyncClient for URL downloads, created on first use."""
+    global _http_client
+    if _http_client is None:
+        import httpx
+
+        _http_client = httpx.AsyncClient(
+            timeout=20,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=ASYNC_FETCH_CONNECTIONS),
+        )
+    return _http_client
+
+
+async def fetch_fasta_async(url: str, progress: ProgressReporter | None = None) -> str:
+    """Download FASTA text from a URL, raising on HTTP errors, reporting the
+    bytes downloaded to `progress` like `fetch_fasta`."""
+    async with http_client().stream("GET", url) as resp:
+        resp.raise_for_status()
+        total = resp.headers.get("Content-Length")
+        total = int(total) if total and total.isdigit() else None
+        chunks = []
+        async for chunk in resp.aiter_text():
+            chunks.append(chunk)
+            if progress is not None:
+                progress.update(
+                    "download", bytes=resp.num_bytes_downloaded, total=total
+                )
+    if progress is not None:
+        progress.event("download_done", bytes=resp.num_bytes_downloaded)
+        progress.flush()
+    return "".join(chunks)
+
+
+async def coalesced_async(key: str, analyse) -> tuple:
+    """Async counterpart of `coalesced`, for a coroutine function."""
+    outcome = {}
+    led = []
+
+    async def lead():
+        led.append(True)
+        dataset_id, outcome["result"], outcome["cached"] = await analyse()
+        return dataset_id
+
+    try:
+        dataset_id, _ = await INGEST_FLIGHTS.do_async(key, lead)
+    except (Cancelled, asyncio.CancelledError):
+        # Run it ourselves unless it was this request that was cancelled
+        if led or asyncio.current_task().cancelling():
+            raise
+        return await analyse()
+    if outcome:
+        return dataset_id, outcome["result"], outcome["cached"]
+    result = None
+    if dataset_id is not None:
+        result = await asyncio.to_thread(RESULT_CACHE.get, dataset_id)
+    if result is None:
+        return await analyse()
+    return dataset_id, result, True
+
+
+async def analyse_fasta_async(
+    fasta_content: str,
+    params: dict | None = None,
+    deadline=None,
+    cancel=None,
+    progress=None,
+) -> tuple:
+    """Async counterpart of `analyse_fasta`: hashing and cache I/O run in
+    threads and the analysis in the process pool."""
+    key = await asyncio.to_thread(cache_key, fasta_content, params)
+    result = await asyncio.to_thread(RESULT_CACHE.get, key)
+    if result is not None:
+        return key, result, True
+    analyse = partial(
+        _analyse_fasta_async, key, fasta_content, params, deadline, cancel, progress
+    )
+    if deadline is not None:
+        return await analyse()
+    return await coalesced_async(key, analyse)
+
+
+async def analyse_url_async(
+    url: str, params: dict | None = None, deadline=None, cancel=None, progress=None
+) -> tuple:
+    """Async counterpart of `analyse_url`. The download is cancelled with
+    the task running it."""
+
+    async def fetch_and_analyse():
+        try:
+            fasta_content = await fetch_fasta_async(url, progress)
+        except Exception as e:
+            raise FetchError(str(e)) from e
+        return await analyse_fasta_async(
+            fasta_content, params, deadline, cancel, progress
+        )
+
+    if deadline is not None:
+        return await fetch_and_analyse()
+    key = await asyncio.to_thread(cache_key, url, params)
+    return await coalesced_async("url:" + key, fetch_and_analyse)
+
+
+def _release_when_done(cost: int, analysis: asyncio.Future) -> None:
+    if not analysis.cancelled():
+        # Nobody may await it any more; retrieving its exception keeps it
+        # from being logged as never retrieved
+        analysis.exception()
+    ADMISSION.release(cost)
+
+
+async def _analyse_fasta_async(
+    key: str, fasta_content: str, params: dict | None, deadline, cancel, progress
+) -> tuple:
+    result = await asyncio.to_thread(RESULT_CACHE.get, key)
+    if result is not None:
+        return key, result, True
+    loop = asyncio.get_running_loop()
+    cost = estimate_cost(len(fasta_content))
+    await ADMISSION.acquire_async(cost)
+    try:
+        try:
+            analysis = loop.run_in_executor(
+                get_analysis_pool(),
+                analyse_content,
+                fasta_content,
+                params,
+                deadline,
+                cancel,
+                progress,
+            )
+        except BaseException:
+            ADMISSION.release(cost)
+            raise
+        # The pool job runs on if this request is cancelled (e.g. its client
+        # disconnected), so its memory stays reserved until the job ends
+        analysis.add_done_callback(partial(_release_when_done, cost))
+        result, artifacts = await asyncio.shield(analysis)
+    except BrokenProcessPool:
+        reset_analysis_pool()
+        raise
+    return *await asyncio.to_thread(store_analysis, key, result, artifacts), False
+
+
+async def read_body(receive) -> bytes:
+    chunks = []
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            break
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body", False):
+            break
+    return b"".join(chunks)
+
+
+async def cancel_on_disconnect(receive, cancel: CancelToken) -> None:
+    """Cancel `cancel` once the client disconnects."""
+    while (await receive())["type"] != "http.disconnect":
+        pass
+    await asyncio.to_thread(cancel.cancel)
+
+
+async def until_cancelled(cancel: CancelToken) -> None:
+    """Return once `cancel` is cancelled, e.g. by POST /api/ingest/cancel
+    answered by another server process."""
+    while not cancel.cancelled():
+        await asyncio.sleep(CANCEL_POLL_INTERVAL)
+
+
+async def send_json(
+    send,
+    status: int,
+    body: dict,
+    headers: tuple = (),
+    accept_encoding=None,
+    progress: ProgressReporter | None = None,
+) -> None:
+    """Send `body` as JSON, compressed for `accept_encoding` (the request's
+    Accept-Encoding) like the Flask app's responses. The status, and the
+    error of a failure, are reported to `progress` as its 'done' event."""
+    if progress is not None:
+        outcome = {"status": status}
+        if status >= 400:
+            outcome["error"] = body.get("error")
+        progress.finish(**outcome)
+    data = await asyncio.to_thread(dumps_bytes, body)
+    encoding = negotiate(accept_encoding)
+    if encoding is not None and len(data) >= COMPRESS_MIN_BYTES:
+        data = await asyncio.to_thread(compress, data, encoding)
+        headers = ((b"content-encoding", encoding.encode()), *headers)
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(data)).encode()),
+                (b"access-control-allow-origin", b"*"),
+                (b"vary", b"Accept-Encoding"),
+                *headers,
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": data})
+
+
+async def send_overloaded(
+    send, error: Overloaded, progress: ProgressReporter | None = None
+) -> None:
+    headers = ()
+    if error.retry_after is not None:
+        headers = ((b"retry-after", str(error.retry_after).encode()),)
+    await send_json(
+        send, error.status, {"error": str(error)}, headers, progress=progress
+    )
+
+
+async def ingest_fasta(scope, receive, send) -> None:
+    """Same contract as the Flask /api/ingest route."""
+    headers = dict(scope["headers"])
+    try:
+        # Refuse a body that could never be analysed before reading it
+        ADMISSION.check(estimate_cost(int(headers.get(b"content-length", 0))))
+    except ValueError:
+        pass
+    except Overloaded as e:
+        # Only a 'request_id' in the query string can hear of it
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+        request_id = query.get("request_id", [None])[0]
+        return await send_overloaded(send, e, rejection_progress(request_id))
+    try:
+        payload = json.loads(await read_body(receive) or b"{}")
+    except ValueError:
+        payload = {}
+    if not isinstance(payload, dict):
+        payload = {}
+    include_interpretation = payload.get("interpret", False)
+    try:
+        params = analysis_params(payload)
+        deadline = request_deadline(payload)
+        cancel = request_cancel_token(payload) or CancelToken()
+    except ValueError as e:
+        return await send_json(
+            send,
+            400,
+            {"error": str(e)},
+            progress=rejection_progress(payload.get("request_id")),
+        )
+
+    if "fasta" in payload and isinstance(payload["fasta"], str):
+        source = partial(analyse_fasta_async, payload["fasta"].strip())
+    elif "url" in payload and isinstance(payload["url"], str):
+        source = partial(analyse_url_async, payload["url"])
+    else:
+        return await send_json(
+            send,
+            400,
+            {"error": "Provide 'fasta' string or 'url' in JSON body."},
+            progress=rejection_progress(payload.get("request_id")),
+        )
+    progress = None
+    if "request_id" in payload:
+        progress = await asyncio.to_thread(request_progress, cancel)
+    analyse = partial(source, params, deadline, cancel, progress)
+
+    analysis = asyncio.ensure_future(analyse())
+    disconnected = asyncio.ensure_future(cancel_on_disconnect(receive, cancel))
+    watchers = [disconnected]
+    if "request_id" in payload:
+        watchers.append(asyncio.ensure_future(until_cancelled(cancel)))
+    try:
+        await asyncio.wait(
+            (analysis, *watchers), return_when=asyncio.FIRST_COMPLETED
+        )
+        if not analysis.done():
+            # Stop the download or wait here; a pooled analysis sees the
+            # token at its next chunk
+            analysis.cancel()
+            if disconnected.done():
+                if progress is not None:
+                    progress.finish(
+                        status=CANCELLED_STATUS, error="The client disconnected."
+                    )
+                return
+            cancel.raise_if_cancelled()
+        dataset_id, cached_result, cached = analysis.result()
+        cancel.raise_if_cancelled()
+        result = await asyncio.to_thread(
+            ingest_response,
+            dataset_id,
+            cached_result,
+            cached,
+            include_interpretation,
+            deadline,
+        )
+    except Cancelled as e:
+        error = {"error": str(e)}
+        return await send_json(send, CANCELLED_STATUS, error, progress=progress)
+    except FetchError as e:
+        error = {"error": f"Failed to fetch URL: {e}"}
+        return await send_json(send, 400, error, progress=progress)
+    except Overloaded as e:
+        return await send_overloaded(send, e, progress)
+    except Exception as e:
+        error = {"error": f"Failed to process FASTA: {e}"}
+        return await send_json(send, 500, error, progress=progress)
+    finally:
+        for watcher in watchers:
+            watcher.cancel()
+    accept_encoding = headers.get(b"accept-encoding", b"").decode("latin-1")
+    await send_json(
+        send, 200, result, accept_encoding=accept_encoding, progress=progress
+    )
+
+
+async def lifespan(receive, send) -> None:
+    global _http_client
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            if _http_client is not None:
+                await _http_client.aclose()
+                _http_client = None
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if (
+        scope["type"] == "http"
+        and scope["method"] == "POST"
+        and scope["path"] == "/api/ingest"
+    ):
+        return await ingest_fasta(scope, receive, send)
+    return await wsgi_app(scope, receive, send)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    host, _, port = os.getenv("BIND", "0.0.0.0:8000").rpartition(":")
+    uvicorn.run(
+        "asgi:app",
+        host=host,
+        port=int(port),
+        workers=int(os.getenv("WEB_CONCURRENCY", "0")) or os.cpu_count() or 1,
+    )
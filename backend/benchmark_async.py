@@ -0,0 +1,136 @@
+"""Benchmark: URL ingests under I/O-heavy load, synchronous (gunicorn, one
+worker process) vs asyncio (uvicorn asgi:app, one worker process).
+
+A local FASTA server answers each download after an artificial delay, to
+stand in for a slow remote host. Every request asks for a different genome,
+so none is served from the result cache.
+
+Usage: python benchmark_async.py [--requests 32] [--delay 2] [--length 200000]
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+
+def serve_genomes(port: int, delay: float, length: int) -> ThreadingHTTPServer:
+    """Serve /genome/<n>.fasta: a random genome of `length` bases per n,
+    each response sent `delay` seconds after the request."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            time.sleep(delay)
+            name = self.path.rsplit("/", 1)[-1].split(".")[0]
+            rng = random.Random(name)
+            body = f">genome_{name}\n".encode() + bytes(
+                rng.choices(b"ACGT", k=length)
+            )
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def start_server(mode: str, port: int, dataset_dir: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": "1",
+        "BIND": f"127.0.0.1:{port}",
+        "DATASET_DIR": dataset_dir,
+    }
+    if mode == "sync":
+        command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+                   "--access-logfile", "/dev/null", "wsgi:app"]
+    else:
+        command = [sys.executable, "-m", "uvicorn", "asgi:app", "--host", "127.0.0.1",
+                   "--port", str(port), "--log-level", "warning"]
+    return subprocess.Popen(
+        command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+
+
+def wait_ready(base_url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{base_url}/api/genome_data", timeout=2)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start")
+
+
+def run(base_url: str, genome_url: str, requests: int, offset: int) -> dict:
+    def ingest(n: int) -> tuple:
+        started = time.perf_counter()
+        resp = httpx.post(
+            f"{base_url}/api/ingest",
+            json={"url": f"{genome_url}/genome/{offset + n}.fasta"},
+            timeout=600,
+        )
+        return resp.status_code == 200, time.perf_counter() - started
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=requests) as pool:
+        outcomes = list(pool.map(ingest, range(requests)))
+    wall = time.perf_counter() - started
+    latencies = sorted(latency for ok, latency in outcomes if ok)
+    return {
+        "ok": len(latencies),
+        "wall": wall,
+        "throughput": len(latencies) / wall,
+        "p50": latencies[len(latencies) // 2] if latencies else 0.0,
+        "max": latencies[-1] if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=32)
+    parser.add_argument("--delay", type=float, default=2.0)
+    parser.add_argument("--length", type=int, default=200_000)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--fasta-port", type=int, default=8767)
+    args = parser.parse_args()
+
+    genome_server = serve_genomes(args.fasta_port, args.delay, args.length)
+    genome_url = f"http://127.0.0.1:{args.fasta_port}"
+    print(f"{args.requests} concurrent URL ingests, {args.delay:.1f}s download delay, "
+          f"{args.length:,} bp genomes, {os.cpu_count()} cores, one server process")
+    print(f"{'mode':>6} {'ok':>4} {'wall s':>8} {'ingests/s':>10} {'p50 s':>7} {'max s':>7}")
+    try:
+        for offset, mode in enumerate(["sync", "async"]):
+            base_url = f"http://127.0.0.1:{args.port}"
+            with tempfile.TemporaryDirectory() as dataset_dir:
+                server = start_server(mode, args.port, dataset_dir)
+                try:
+                    wait_ready(base_url)
+                    stats = run(base_url, genome_url, args.requests, offset * args.requests)
+                finally:
+                    server.terminate()
+                    server.wait()
+            print(f"{mode:>6} {stats['ok']:>4} {stats['wall']:>8.2f} "
+                  f"{stats['throughput']:>10.2f} {stats['p50']:>7.2f} {stats['max']:>7.2f}")
+    finally:
+        genome_server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
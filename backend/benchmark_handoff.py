@@ -0,0 +1,108 @@
+"""Hand-off benchmark: what it costs to fan one record's ORF scan out to
+worker processes when each task gets the sequence pickled, compared with a
+shared-memory handle (name, offset, length), and how that compares with the
+scan itself.
+
+Usage: python benchmark_handoff.py [--fasta test_genomes/<file>.fasta]
+                                   [--workers 2] [--runs 3]
+"""
+import argparse
+import multiprocessing
+import os
+import pickle
+import statistics
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from Bio import SeqIO
+
+from services.composition import encode_sequence
+from services.orfs import (
+    DEFAULT_ORF_TOP_K,
+    MIN_ORF_LENGTH,
+    longest_orfs,
+    scan_chunk,
+    strand_chunks,
+)
+from services.sequence_view import SequenceView, reverse_complement_codes
+from services.shared_sequences import SharedSequence
+
+
+def scan_pickled_chunk(seq_str: str, strand: str, start: int, end: int) -> list:
+    """A chunk task handed the whole record, as a naive fan-out would."""
+    seq_len = len(seq_str)
+    if strand == "+":
+        codes = encode_sequence(seq_str[start : end + 2])
+    else:
+        codes = reverse_complement_codes(
+            encode_sequence(seq_str[seq_len - end - 2 : seq_len - start])
+        )
+    return scan_chunk(codes, start, DEFAULT_ORF_TOP_K, MIN_ORF_LENGTH)
+
+
+def median_seconds(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fasta", default=None)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    path = args.fasta or os.path.join(
+        "test_genomes", sorted(os.listdir("test_genomes"))[0]
+    )
+    record = max(SeqIO.parse(path, "fasta"), key=len)
+    seq_str = str(record.seq)
+    view = SequenceView(seq_str)
+    tasks = 2 * len(list(strand_chunks(len(seq_str))))
+    print(f"{record.id}: {len(seq_str):,} bp, {tasks} chunk tasks, "
+          f"{args.workers} workers")
+
+    serial = median_seconds(lambda: longest_orfs(view, DEFAULT_ORF_TOP_K), args.runs)
+    payload = pickle.dumps(seq_str, protocol=pickle.HIGHEST_PROTOCOL)
+    round_trip = median_seconds(lambda: pickle.loads(pickle.dumps(seq_str)), args.runs)
+    with SharedSequence(seq_str) as shared:
+        handle_bytes = len(pickle.dumps(shared.handle.region(0, 1 << 20)))
+    encode = median_seconds(lambda: SharedSequence(seq_str).close(), args.runs)
+
+    print("\nPer record (ms):")
+    print(f"  ORF scan in this process               {serial * 1000:8.1f}")
+    print(f"  encode into shared memory (once)       {encode * 1000:8.1f}")
+    print(f"  pickle + unpickle the sequence (each)  {round_trip * 1000:8.1f}"
+          f"  x {tasks} tasks = {round_trip * tasks * 1000:.1f}")
+    print(f"\nBytes sent per task: sequence {len(payload):,}, handle {handle_bytes}")
+
+    with ProcessPoolExecutor(
+        max_workers=args.workers, mp_context=multiprocessing.get_context("spawn")
+    ) as pool:
+        # Start the workers before timing
+        list(pool.map(int, range(args.workers)))
+        chunks = list(strand_chunks(len(seq_str)))
+
+        def pickled():
+            futures = [
+                pool.submit(scan_pickled_chunk, seq_str, strand, start, end)
+                for strand in ("+", "-")
+                for start, end in chunks
+            ]
+            for future in futures:
+                future.result()
+
+        pooled_pickled = median_seconds(pickled, args.runs)
+        pooled_shared = median_seconds(
+            lambda: longest_orfs(view, DEFAULT_ORF_TOP_K, pool=pool), args.runs
+        )
+    print("\nORF scan across the pool (ms):")
+    print(f"  sequence pickled to every task         {pooled_pickled * 1000:8.1f}")
+    print(f"  shared-memory handles                  {pooled_shared * 1000:8.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""JSON benchmark: time to encode analysis results per MB of JSON with the
+standard library (as Flask's default provider does), with orjson when it is
+installed, and what a repeat GET /api/genome_data costs once the serialised
+bytes are kept.
+
+Usage: python benchmark_json.py [--fasta test_genomes/<file>.fasta ...]
+                                [--orf-top-k 50] [--runs 5]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+# Keep the benchmark's datasets out of the real store
+os.environ.setdefault("DATASET_DIR", tempfile.mkdtemp(prefix="benchmark_json_"))
+
+from flask.json.provider import DefaultJSONProvider  # noqa: E402
+
+from controllers.ingest_controller import analyse_content  # noqa: E402
+from main import create_app  # noqa: E402
+from services.result_cache import RESULT_CACHE, cache_key  # noqa: E402
+from services.serialization import _stdlib_dumps, orjson  # noqa: E402
+
+
+def median_seconds(fn, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--fasta", nargs="*", default=None)
+    parser.add_argument("--orf-top-k", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+    paths = args.fasta or [
+        os.path.join("test_genomes", name)
+        for name in sorted(os.listdir("test_genomes"))[:3]
+    ]
+    app = create_app()
+    flask_provider = DefaultJSONProvider(app)
+    client = app.test_client()
+    params = {"kmer_k": 6, "orf_top_k": args.orf_top_k}
+
+    encoders = [
+        ("stdlib json (Flask default)", lambda body: flask_provider.dumps(body)),
+        ("stdlib json, compact bytes", _stdlib_dumps),
+    ]
+    if orjson is not None:
+        from services.serialization import dumps_bytes
+
+        encoders.append(("orjson", dumps_bytes))
+    else:
+        print("orjson is not installed; only the standard library is timed.")
+
+    for path in paths:
+        with open(path) as f:
+            fasta_content = f.read()
+        dataset_id = cache_key(fasta_content, params)
+        result, artifacts = analyse_content(fasta_content, params)
+        RESULT_CACHE.put(dataset_id, result, artifacts)
+        body = {**result, "dataset_id": dataset_id}
+        megabytes = len(_stdlib_dumps(body)) / 1024**2
+        print(f"\n{os.path.basename(path)}: {megabytes:.2f} MB of JSON, "
+              f"{len(result['features'])} features")
+        print("  encode (ms)                          total    per MB")
+        for name, encode in encoders:
+            seconds = median_seconds(lambda: encode(body), args.runs)
+            print(f"  {name:<34} {seconds * 1000:7.1f}  {seconds * 1000 / megabytes:8.1f}")
+
+        url = f"/api/genome_data?dataset_id={dataset_id}"
+        for encoding in ("identity", "gzip"):
+            headers = {"Accept-Encoding": encoding}
+            started = time.perf_counter()
+            client.get(url, headers=headers)
+            first = time.perf_counter() - started
+            repeat = median_seconds(lambda: client.get(url, headers=headers), args.runs)
+            print(f"  GET /api/genome_data ({encoding}): first {first * 1000:.1f} ms, "
+                  f"repeat {repeat * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
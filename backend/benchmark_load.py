@@ -0,0 +1,130 @@
+"""Load test: requests/sec of the production server (gunicorn) as the number
+of worker processes grows.
+
+For each worker count a fresh server is started on a temporary dataset
+store, one genome is ingested to warm it up, and then concurrent clients
+re-ingest it (served from the shared result store) and read
+/api/genome_data for a fixed time.
+
+Usage: python benchmark_load.py [--workers 1,2,4] [--clients 16] [--seconds 10]
+                                [--fasta test_genomes/<file>.fasta]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import httpx
+
+
+def start_server(workers: int, port: int, dataset_dir: str) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "WEB_CONCURRENCY": str(workers),
+        "BIND": f"127.0.0.1:{port}",
+        "DATASET_DIR": dataset_dir,
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py",
+         "--access-logfile", "/dev/null", "wsgi:app"],
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+
+
+def wait_ready(base_url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{base_url}/api/genome_data", timeout=2)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server at {base_url} did not start")
+
+
+def run_load(base_url: str, fasta: str, clients: int, seconds: float) -> dict:
+    latencies = []
+    errors = 0
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client(index: int) -> None:
+        nonlocal errors
+        with httpx.Client(base_url=base_url, timeout=120) as session:
+            requests_made = 0
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    if (index + requests_made) % 2:
+                        resp = session.get("/api/genome_data")
+                    else:
+                        resp = session.post("/api/ingest", json={"fasta": fasta})
+                    ok = resp.status_code == 200
+                except httpx.HTTPError:
+                    ok = False
+                elapsed = time.perf_counter() - started
+                requests_made += 1
+                with lock:
+                    if ok:
+                        latencies.append(elapsed)
+                    else:
+                        errors += 1
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    duration = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "rps": len(latencies) / duration,
+        "p50_ms": statistics.median(latencies) * 1000 if latencies else 0.0,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--workers", default="1,2,4")
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--fasta", default=None)
+    args = parser.parse_args()
+
+    fasta_path = args.fasta or os.path.join(
+        "test_genomes", sorted(os.listdir("test_genomes"))[0]
+    )
+    with open(fasta_path) as f:
+        fasta = f.read()
+    print(f"{os.cpu_count()} cores, {args.clients} clients, {args.seconds:.0f}s per run, "
+          f"genome {os.path.basename(fasta_path)}")
+    print(f"{'workers':>8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'errors':>7}")
+
+    for workers in [int(w) for w in args.workers.split(",")]:
+        base_url = f"http://127.0.0.1:{args.port}"
+        with tempfile.TemporaryDirectory() as dataset_dir:
+            server = start_server(workers, args.port, dataset_dir)
+            try:
+                wait_ready(base_url)
+                httpx.post(f"{base_url}/api/ingest", json={"fasta": fasta}, timeout=600)
+                stats = run_load(base_url, fasta, args.clients, args.seconds)
+            finally:
+                server.terminate()
+                server.wait()
+        print(f"{workers:>8} {stats['rps']:>8.1f} {stats['p50_ms']:>8.1f} "
+              f"{stats['p95_ms']:>8.1f} {stats['errors']:>7}")
+
+
+if __name__ == "__main__":
+    main()
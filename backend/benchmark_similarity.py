@@ -0,0 +1,105 @@
+"""Similarity benchmark: GET /api/similarity over N stored sketches.
+
+Stores N synthetic datasets, one sketched sequence each, in families of
+near-identical genomes, then times the first request (every manifest read
+and every pair compared), a repeat (answered from the kept estimates), the
+request after one more dataset is stored (its row only), and the matrix
+format with its ANI matrix (up to MATRIX_MAX_SIZE sketches: beyond that the
+time goes into JSON for N^2 numbers twice).
+
+Usage: python benchmark_similarity.py [--sizes 1000,2000,5000] [--hashes 5000]
+                                      [--families 50] [--runs 3]
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+# Keep the benchmark's datasets out of the real store
+os.environ.setdefault("DATASET_DIR", tempfile.mkdtemp(prefix="benchmark_similarity_"))
+
+import numpy as np  # noqa: E402
+
+from controllers.compare_controller import SKETCHES  # noqa: E402
+from main import create_app  # noqa: E402
+from services.dataset_store import DatasetStore  # noqa: E402
+from services.result_cache import RESULT_CACHE  # noqa: E402
+from services.sketch import SKETCH_K, SKETCH_SCALED, signature  # noqa: E402
+
+MAX_HASH = np.uint64((1 << 64) // SKETCH_SCALED - 1)
+MATRIX_MAX_SIZE = 2000
+
+
+def synthetic_sketch(rng, family: np.ndarray, mutated: float) -> dict:
+    """A family member's sketch: a share of its hashes replaced by new ones."""
+    keep = family[rng.random(len(family)) >= mutated]
+    fresh = rng.integers(0, int(MAX_HASH), len(family) - len(keep), dtype=np.uint64)
+    hashes = np.unique(np.concatenate([keep, fresh]))
+    return {
+        "k": SKETCH_K,
+        "scaled": SKETCH_SCALED,
+        "hashes": hashes,
+        "signature": signature(hashes, MAX_HASH),
+    }
+
+
+def store_datasets(store: DatasetStore, rng, count: int, families: list, start: int):
+    for index in range(start, start + count):
+        key = f"{index:032x}"
+        family = families[index % len(families)]
+        sketch = synthetic_sketch(rng, family, mutated=rng.random() * 0.3)
+        result = {"features": [], "sequences": [{"id": "seq", "length": 1}]}
+        artifacts = {"sequences": {"seq": "A"}, "sketches": {"seq": sketch}}
+        store.save(key, result, artifacts)
+
+
+def timed_get(client, url: str) -> tuple:
+    started = time.perf_counter()
+    response = client.get(url)
+    return time.perf_counter() - started, response
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="1000,2000,5000")
+    parser.add_argument("--hashes", type=int, default=5000)
+    parser.add_argument("--families", type=int, default=50)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+    rng = np.random.default_rng(0)
+    families = [
+        np.unique(rng.integers(0, int(MAX_HASH), args.hashes, dtype=np.uint64))
+        for _ in range(args.families)
+    ]
+    store = RESULT_CACHE.store
+    store.max_datasets = max(int(size) for size in args.sizes.split(",")) + 1
+    client = create_app().test_client()
+
+    stored = 0
+    print("sketches   first (s)   repeat (ms)   one added (ms)   matrix (s)")
+    for size in (int(size) for size in args.sizes.split(",")):
+        store_datasets(store, rng, size - stored, families, stored)
+        stored = size
+        # A fresh matrix, as in a newly started worker
+        SKETCHES.__init__(store)
+        first, response = timed_get(client, "/api/similarity")
+        assert len(response.get_json()["genomes"]) == size
+        repeat = statistics.median(
+            timed_get(client, "/api/similarity")[0] for _ in range(args.runs)
+        )
+        store_datasets(store, rng, 1, families, stored)
+        stored += 1
+        added, _ = timed_get(client, "/api/similarity")
+        matrix = "-"
+        if size <= MATRIX_MAX_SIZE:
+            seconds, _ = timed_get(client, "/api/similarity?format=matrix")
+            matrix = f"{seconds:.2f}"
+        print(
+            f"{size:8d}   {first:9.2f}   {repeat * 1000:11.1f}"
+            f"   {added * 1000:14.1f}   {matrix:>10}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+"""Cold-start benchmark: time from interpreter start to the first
+/api/genome_data response, plus the import time of each module.
+
+Usage: python benchmark_startup.py [runs]
+"""
+import statistics
+import subprocess
+import sys
+
+# Runs in a fresh interpreter per sample; prints seconds to first response.
+STARTUP_SNIPPET = """
+import time
+started = time.perf_counter()
+from main import create_app
+app = create_app()
+app.test_client().get("/api/genome_data")
+print(time.perf_counter() - started)
+"""
+
+# Dependencies that are imported on first use instead of at startup
+DEFERRED_MODULES = ["Bio.SeqIO", "Bio.SeqUtils", "httpx", "google.genai"]
+
+
+def run_startup() -> tuple:
+    """Return (seconds to first response, {module: cumulative import us})."""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", STARTUP_SNIPPET],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    imports = {}
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, module = line[len("import time:") :].split("|")
+        if cumulative.strip().isdigit():
+            imports[module.strip()] = int(cumulative)
+    return float(proc.stdout.strip().splitlines()[-1]), imports
+
+
+def import_cost(module: str) -> float | None:
+    """Seconds to import one module in a fresh interpreter."""
+    snippet = (
+        "import time; started = time.perf_counter(); "
+        f"import {module}; print(time.perf_counter() - started)"
+    )
+    proc = subprocess.run(
+        [sys.executable, "-c", snippet], capture_output=True, text=True
+    )
+    if proc.returncode != 0:
+        return None
+    return float(proc.stdout.strip())
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    samples = [run_startup() for _ in range(runs)]
+    totals = [total for total, _ in samples]
+    print(f"Startup to first /api/genome_data response over {runs} runs:")
+    print(f"  median {statistics.median(totals) * 1000:.0f} ms, "
+          f"min {min(totals) * 1000:.0f} ms, max {max(totals) * 1000:.0f} ms")
+
+    # Top-level packages only (no dots), by median cumulative import time
+    modules = {}
+    for _, imports in samples:
+        for module, micros in imports.items():
+            if "." not in module:
+                modules.setdefault(module, []).append(micros)
+    ranked = sorted(
+        ((statistics.median(times), module) for module, times in modules.items()),
+        reverse=True,
+    )
+    print("\nSlowest imports at startup (median cumulative ms):")
+    for micros, module in ranked[:15]:
+        print(f"  {module:<40} {micros / 1000:8.1f}")
+
+    print("\nDeferred until first use (ms, fresh interpreter):")
+    for module in DEFERRED_MODULES:
+        cost = import_cost(module)
+        print(f"  {module:<40} {'not installed' if cost is None else f'{cost * 1000:8.1f}'}")
+
+
+if __name__ == "__main__":
+    main()
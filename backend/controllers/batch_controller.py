@@ -0,0 +1,281 @@
+from flask import Blueprint, Response, jsonify, request, stream_with_context
+from concurrent.futures import FIRST_COMPLETED, wait
+from concurrent.futures.process import BrokenProcessPool
+import json
+
+from controllers.ingest_controller import (
+    analyse_content,
+    analysis_params,
+    count_feature_types,
+    fetch_fasta,
+)
+from services.admission import ADMISSION, Overloaded, estimate_cost
+from services.cancellation import CancelToken
+from services.result_cache import RESULT_CACHE, cache_key
+from services.summary_table import FEATURE_TYPES
+from services.workers import get_analysis_pool, get_fetch_pool, reset_analysis_pool
+
+
+bp = Blueprint("batch", __name__)
+
+MAX_BATCH_SIZE = 100
+# Seconds between keep-alive lines of a streamed batch while no genome
+# finishes; writing them is how a client that went away is noticed.
+STREAM_HEARTBEAT = 1.0
+
+
+def parse_batch_items(payload: dict) -> list:
+    """Normalise the 'genomes' list into dicts with index, name and url/fasta.
+    Each entry may be a URL string or an object with 'url' or 'fasta'."""
+    genomes = payload.get("genomes")
+    if not isinstance(genomes, list) or not genomes:
+        raise ValueError("Provide a non-empty 'genomes' list in JSON body.")
+    if len(genomes) > MAX_BATCH_SIZE:
+        raise ValueError(f"At most {MAX_BATCH_SIZE} genomes per batch.")
+
+    items = []
+    for index, entry in enumerate(genomes):
+        if isinstance(entry, str):
+            entry = {"url": entry}
+        if not isinstance(entry, dict):
+            raise ValueError(f"Genome {index} must be a URL string or an object.")
+        if isinstance(entry.get("fasta"), str):
+            items.append(
+                {
+                    "index": index,
+                    "name": entry.get("name") or f"genome_{index}",
+                    "fasta": entry["fasta"].strip(),
+                }
+            )
+        elif isinstance(entry.get("url"), str):
+            items.append(
+                {
+                    "index": index,
+                    "name": entry.get("name") or entry["url"].rsplit("/", 1)[-1],
+                    "url": entry["url"],
+                }
+            )
+        else:
+            raise ValueError(f"Genome {index} needs a 'fasta' string or 'url'.")
+    return items
+
+
+def genome_summary(item: dict, dataset_id: str, result: dict, cached: bool) -> dict:
+    """Per-genome entry of a batch response, without the feature list."""
+    nucleotide_counts = {"A": 0, "T": 0, "G": 0, "C": 0, "N": 0}
+    for seq in result["sequences"]:
+        for base in nucleotide_counts:
+            nucleotide_counts[base] += seq["nucleotide_counts"].get(base, 0)
+    return {
+        "index": item["index"],
+        "name": item["name"],
+        "status": "ok",
+        "dataset_id": dataset_id,
+        "cached": cached,
+        "summary": result["summary"],
+        "feature_counts": count_feature_types(result["features"]),
+        "nucleotide_counts": nucleotide_counts,
+        "sequences": [
+            {
+                "id": seq["id"],
+                "length": seq["length"],
+                "gc_content": seq["gc_content"],
+                "gc_skew": seq["gc_skew"],
+                "at_skew": seq["at_skew"],
+            }
+            for seq in result["sequences"]
+        ],
+    }
+
+
+def genome_error(item: dict, message: str) -> dict:
+    return {
+        "index": item["index"],
+        "name": item["name"],
+        "status": "error",
+        "error": message,
+    }
+
+
+def comparison_row(entry: dict) -> dict:
+    """Whole-genome composition row; skews use base counts summed over records."""
+    counts = entry["nucleotide_counts"]
+    gc = counts["G"] + counts["C"]
+    at = counts["A"] + counts["T"]
+    summary = entry["summary"]
+    row = {
+        "name": entry["name"],
+        "dataset_id": entry["dataset_id"],
+        "total_sequences": summary["total_sequences"],
+        "length": summary["total_bases"],
+        "gc_content": summary["overall_gc_content"],
+        "at_content": summary["overall_at_content"],
+        "gc_skew": round((counts["G"] - counts["C"]) / gc, 4) if gc else 0.0,
+        "at_skew": round((counts["A"] - counts["T"]) / at, 4) if at else 0.0,
+    }
+    feature_counts = entry["feature_counts"]
+    for feat_type in FEATURE_TYPES:
+        row[feat_type] = feature_counts.get(feat_type, 0)
+    return row
+
+
+def build_comparison(entries: list) -> dict:
+    rows = [comparison_row(entry) for entry in entries if entry["status"] == "ok"]
+    columns = list(rows[0].keys()) if rows else []
+    return {"columns": columns, "rows": rows}
+
+
+def run_batch(items: list, params: dict, heartbeat: float | None = None):
+    """Yield per-genome entries as they finish.
+
+    Downloads run on the fetch thread pool while earlier genomes are already
+    being analysed on the process pool. Identical content is analysed once and
+    cache hits skip analysis entirely. Each analysis is admitted against the
+    memory budget first; genomes that do not fit yet are held back until one
+    of this batch's analyses finishes, or waited for when none is running.
+
+    With `heartbeat`, None is yielded whenever that many seconds pass
+    without an entry. Closing the generator early (the client went away)
+    cancels the downloads and analyses still queued or running."""
+    cancel = CancelToken()
+    fetch_pool = get_fetch_pool()
+    analysis_pool = get_analysis_pool()
+
+    fetches = {}  # download future -> item
+    analyses = {}  # analysis future -> (dataset_id, admitted cost)
+    waiting = {}  # dataset_id -> items awaiting that analysis
+    ready = []  # (item, fasta_content) with content in hand
+    deferred = []  # (item, fasta_content) not admitted yet
+
+    for item in items:
+        if "url" in item:
+            fetches[fetch_pool.submit(fetch_fasta, item["url"], cancel)] = item
+        else:
+            ready.append((item, item["fasta"]))
+
+    def schedule(item, fasta_content, block=False):
+        dataset_id = cache_key(fasta_content, params)
+        result = RESULT_CACHE.get(dataset_id)
+        if result is not None:
+            return genome_summary(item, dataset_id, result, True)
+        if dataset_id not in waiting:
+            cost = estimate_cost(len(fasta_content))
+            try:
+                if block:
+                    ADMISSION.acquire(cost)
+                elif not ADMISSION.try_acquire(cost):
+                    deferred.append((item, fasta_content))
+                    return None
+            except Overloaded as e:
+                return genome_error(item, str(e))
+            future = analysis_pool.submit(
+                analyse_content, fasta_content, params, None, cancel
+            )
+            analyses[future] = (dataset_id, cost)
+            waiting[dataset_id] = []
+        waiting[dataset_id].append(item)
+        return None
+
+    try:
+        while ready or fetches or analyses or deferred:
+            for item, fasta_content in ready:
+                entry = schedule(item, fasta_content)
+                if entry is not None:
+                    yield entry
+            ready = []
+
+            if not fetches and not analyses:
+                if deferred:
+                    # Nothing of ours holds capacity, so waiting cannot deadlock
+                    entry = schedule(*deferred.pop(0), block=True)
+                    if entry is not None:
+                        yield entry
+                    continue
+                break
+            done, _ = wait(
+                list(fetches) + list(analyses),
+                timeout=heartbeat,
+                return_when=FIRST_COMPLETED,
+            )
+            if not done:
+                yield None
+            for future in done:
+                if future in fetches:
+                    item = fetches.pop(future)
+                    try:
+                        ready.append((item, future.result()))
+                    except Exception as e:
+                        yield genome_error(item, f"Failed to fetch URL: {e}")
+                    continue
+
+                dataset_id, cost = analyses.pop(future)
+                ADMISSION.release(cost)
+                ready.extend(deferred)
+                deferred = []
+                try:
+                    result, artifacts = future.result()
+                except Exception as e:
+                    if isinstance(e, BrokenProcessPool):
+                        reset_analysis_pool()
+                    for item in waiting.pop(dataset_id):
+                        yield genome_error(item, f"Failed to process FASTA: {e}")
+                    continue
+                RESULT_CACHE.put(dataset_id, result, artifacts)
+                for item in waiting.pop(dataset_id):
+                    yield genome_summary(item, dataset_id, result, False)
+    finally:
+        # The client went away mid-batch: stop its work and release what is
+        # still reserved
+        if fetches or analyses:
+            cancel.cancel()
+            for future in [*fetches, *analyses]:
+                future.cancel()
+        for _, cost in analyses.values():
+            ADMISSION.release(cost)
+
+
+@bp.route("/api/ingest/batch", methods=["POST"])
+def ingest_batch():
+    """Accepts JSON with a 'genomes' list of URL strings or {'url'|'fasta', 'name'}
+    objects. Downloads concurrently, analyses across a worker pool and returns
+    per-genome summaries plus a cross-genome comparison table.
+
+    Optional: Set 'stream': true to receive newline-delimited JSON, one line
+    per genome as it completes, followed by the comparison table. Blank
+    keep-alive lines are sent while genomes are in progress; once the client
+    disconnects the remaining work is cancelled."""
+    payload = request.get_json(silent=True) or {}
+    try:
+        items = parse_batch_items(payload)
+        params = analysis_params(payload)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    if payload.get("stream"):
+
+        def generate():
+            entries = []
+            for entry in run_batch(items, params, STREAM_HEARTBEAT):
+                if entry is None:
+                    yield "\n"
+                    continue
+                entries.append(entry)
+                yield json.dumps({"type": "genome", **entry}) + "\n"
+            yield json.dumps(
+                {"type": "comparison", "comparison": build_comparison(entries)}
+            ) + "\n"
+
+        return Response(
+            stream_with_context(generate()), mimetype="application/x-ndjson"
+        )
+
+    entries = sorted(run_batch(items, params), key=lambda entry: entry["index"])
+    return (
+        jsonify(
+            {
+                "genomes": entries,
+                "comparison": build_comparison(entries),
+            }
+        ),
+        200,
+    )
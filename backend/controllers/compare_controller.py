@@ -0,0 +1,115 @@
+from flask import Blueprint, jsonify, request
+import time
+
+import numpy as np
+
+from services.result_cache import RESULT_CACHE
+from services.sketch import (
+    SIGNATURE_BINS,
+    SKETCH_K,
+    SKETCH_SCALED,
+    SketchMatrix,
+    compare_sketches,
+    mash_ani,
+)
+
+
+bp = Blueprint("compare", __name__)
+
+DEFAULT_PAIR_LIMIT = 1000
+
+SKETCHES = SketchMatrix(RESULT_CACHE.store)
+
+
+def top_pairs(estimates: np.ndarray, min_jaccard: float, limit: int) -> tuple:
+    """(rows, cols) of the `limit` pairs i < j with the highest estimates of
+    at least `min_jaccard`, highest first and, among equal estimates, the
+    last pair first. Only the listed pairs are sorted: the rest are cut at
+    the limit-th highest estimate, of which (being ratios of bin counts, it
+    often has many ties) only as many pairs are taken as fit."""
+    pairs = np.triu(estimates >= min_jaccard, k=1)
+    values = estimates[pairs]
+    if len(values) > limit:
+        threshold = np.sort(values)[len(values) - limit] if limit else np.inf
+        ties = pairs & (estimates == threshold)
+        pairs &= estimates > threshold
+        needed = limit - np.count_nonzero(pairs)
+        if needed > 0:
+            covered = np.cumsum(ties.sum(axis=1)[::-1])
+            first = len(estimates) - 1 - int(np.searchsorted(covered, needed))
+            tie_rows, tie_cols = np.nonzero(ties[first:])
+            pairs[first + tie_rows[-needed:], tie_cols[-needed:]] = True
+    rows, cols = np.nonzero(pairs)
+    order = np.lexsort((cols, rows, estimates[rows, cols]))[::-1]
+    return rows[order], cols[order]
+
+
+@bp.route("/api/similarity", methods=["GET"])
+def get_similarity():
+    """All-vs-all similarity of every stored sequence from MinHash sketches.
+
+    Query: dataset_ids (comma-separated, default all stored), min_jaccard
+    (default 0), limit (pairs returned, default 1000), format ('pairs' or
+    'matrix'). Pairs are screened with fixed-width signatures; the returned
+    ones are then compared exactly on the full FracMinHash sketches."""
+    started = time.perf_counter()
+    dataset_ids = request.args.get("dataset_ids")
+    dataset_ids = set(dataset_ids.split(",")) if dataset_ids else None
+    try:
+        min_jaccard = float(request.args.get("min_jaccard", 0.0))
+        limit = max(0, int(request.args.get("limit", DEFAULT_PAIR_LIMIT)))
+    except ValueError:
+        return jsonify({"error": "'min_jaccard' and 'limit' must be numbers."}), 400
+    output_format = request.args.get("format", "pairs")
+    if output_format not in ("pairs", "matrix"):
+        return jsonify({"error": "'format' must be 'pairs' or 'matrix'."}), 400
+
+    genomes, estimates = SKETCHES.snapshot()
+    if dataset_ids is not None:
+        selected = [
+            index
+            for index, genome in enumerate(genomes)
+            if genome["dataset_id"] in dataset_ids
+        ]
+        genomes = [genomes[index] for index in selected]
+        estimates = estimates[np.ix_(selected, selected)]
+    response = {
+        "k": SKETCH_K,
+        "scaled": SKETCH_SCALED,
+        "signature_bins": SIGNATURE_BINS,
+        "genomes": [
+            {
+                "dataset_id": genome["dataset_id"],
+                "seq_id": genome["seq_id"],
+                "length": genome["length"],
+                "sketch_size": len(genome["sketch"]["hashes"]),
+            }
+            for genome in genomes
+        ],
+    }
+    if len(genomes) < 2:
+        if output_format == "matrix":
+            response["matrix"] = response["ani_matrix"] = [[1.0]] * len(genomes)
+        else:
+            response["pairs"] = []
+        response["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+        return jsonify(response)
+
+    if output_format == "matrix":
+        estimates = estimates.astype(np.float64)
+        np.fill_diagonal(estimates, 1.0)
+        response["matrix"] = np.round(estimates, 4).tolist()
+        response["ani_matrix"] = np.round(mash_ani(estimates, SKETCH_K), 4).tolist()
+    else:
+        rows, cols = top_pairs(estimates, min_jaccard, limit)
+        response["pairs"] = [
+            {
+                "a": int(a),
+                "b": int(b),
+                "estimated_jaccard": round(float(estimates[a, b]), 4),
+                **compare_sketches(genomes[a]["sketch"], genomes[b]["sketch"]),
+            }
+            for a, b in zip(rows.tolist(), cols.tolist())
+        ]
+    response["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 2)
+    return jsonify(response)
@@ -0,0 +1,84 @@
+from flask import Blueprint, jsonify, request
+
+from services.result_cache import RESULT_CACHE
+from services.summary_table import (
+    GROUP_KEYS,
+    NUMERIC_COLUMNS,
+    TEXT_COLUMNS,
+    SummaryTable,
+    query_summary,
+)
+
+
+bp = Blueprint("datasets", __name__)
+
+DEFAULT_CATALOG_LIMIT = 100
+SUMMARY_TABLE = SummaryTable(RESULT_CACHE.store)
+
+
+@bp.route("/api/datasets", methods=["GET"])
+def list_datasets():
+    """Catalog of analysed datasets kept on disk, newest first. Any of them
+    can be served by id (e.g. /api/genome_data?dataset_id=...) without
+    re-ingesting. Query: limit (default 100), offset (default 0)."""
+    try:
+        limit = max(0, int(request.args.get("limit", DEFAULT_CATALOG_LIMIT)))
+        offset = max(0, int(request.args.get("offset", 0)))
+    except ValueError:
+        return jsonify({"error": "'limit' and 'offset' must be integers."}), 400
+    catalog = RESULT_CACHE.catalog()
+    latest = RESULT_CACHE.latest()
+    loaded = set(RESULT_CACHE.keys())
+    datasets = [
+        {
+            **entry,
+            "latest": entry["dataset_id"] == latest,
+            "loaded": entry["dataset_id"] in loaded,
+        }
+        for entry in catalog[offset : offset + limit]
+    ]
+    return jsonify({"total": len(catalog), "offset": offset, "datasets": datasets})
+
+
+@bp.route("/api/datasets/summary", methods=["GET"])
+def summarise_datasets():
+    """Comparative summary of every stored dataset from the summary table:
+    one row per genome (composition, feature density per Mb, skew
+    statistics) or, with group_by, per-group min/max/mean/median/std.
+    Query: dataset_ids (comma-separated, default all), group_by (genus,
+    species, gc_band, size_band), sort (a column, or 'count' for groups),
+    order ('desc' default, or 'asc'), limit (default 100), offset."""
+    dataset_ids = request.args.get("dataset_ids")
+    dataset_ids = set(dataset_ids.split(",")) if dataset_ids else None
+    group_by = request.args.get("group_by") or None
+    if group_by is not None and group_by not in GROUP_KEYS:
+        return (
+            jsonify({"error": f"'group_by' must be one of: {', '.join(GROUP_KEYS)}."}),
+            400,
+        )
+    if group_by:
+        sortable = ["count"] + [name for name in NUMERIC_COLUMNS if name != "created_at"]
+    else:
+        sortable = TEXT_COLUMNS + NUMERIC_COLUMNS
+    sort = request.args.get("sort") or None
+    if sort is not None and sort not in sortable:
+        return jsonify({"error": f"Cannot sort by '{sort}'."}), 400
+    order = request.args.get("order", "desc")
+    if order not in ("asc", "desc"):
+        return jsonify({"error": "'order' must be 'asc' or 'desc'."}), 400
+    try:
+        limit = max(0, int(request.args.get("limit", DEFAULT_CATALOG_LIMIT)))
+        offset = max(0, int(request.args.get("offset", 0)))
+    except ValueError:
+        return jsonify({"error": "'limit' and 'offset' must be integers."}), 400
+
+    summary = query_summary(
+        SUMMARY_TABLE.columns(),
+        dataset_ids=dataset_ids,
+        group_by=group_by,
+        sort=sort,
+        descending=order == "desc",
+        limit=limit,
+        offset=offset,
+    )
+    return jsonify(summary)
@@ -1,75 +1,91 @@
-from flask import Blueprint, jsonify, request
-from Bio import SeqIO
-from Bio.SeqUtils import gc_fraction
-from Bio.Seq import Seq
-import httpx
+from flask import Blueprint, Response, jsonify, make_response, request
+from flask import stream_with_context
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
 import io
-import re
-import os
-from google import genai
+import time
 
+import numpy as np
+
+from services.admission import ADMISSION, Overloaded, estimate_cost
+from services.cancellation import Cancelled, CancelToken, valid_request_id
+from services.interpretation import build_prompt, request_interpretation
+from services.result_cache import RESULT_CACHE, cache_key, cache_key_from_chunks
+from services.serialization import dumps_bytes
+from services.sequence_files import (
+    MAX_UPLOAD_BYTES,
+    CountingReader,
+    UploadTooLarge,
+    open_decompressed,
+    open_text,
+    spool_stream,
+    stripped_chunks,
+)
+from services.composition import block_size_for, feed_consumers, scan_composition
+from services.compression import STORED_LEVELS, SUFFIXES, add_vary, compress, negotiate
+from services.deadline import MAX_TIME_BUDGET_MS, Deadline
+from services.kmers import DEFAULT_KMER_K, MAX_KMER_K, CodonUsage, KmerCounter
+from services.orfs import (
+    DEFAULT_ORF_TOP_K,
+    MAX_ORF_TOP_K,
+    longest_orfs,
+    merge_chunk_scans,
+    submit_chunk_scans,
+)
+from services.progress import ProgressReporter, follow_events
+from services.sequence_view import SequenceView
+from services.single_flight import INGEST_FLIGHTS
+from services.sketch import SketchBuilder
+from services.skew import skew_profile_from_prefix
+from services.work_queue import get_work_queue, result_before
+from services.workers import get_detector_pool, reset_analysis_pool
+
+# Biopython and httpx are imported where they are used, so a worker process
+# starts serving without paying for them until the first ingest.
 
 bp = Blueprint("api", __name__)
 
 
-# Optional Gemini client (reads GEMINI_API_KEY from env)
-GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
-gemini_client = genai.Client() if GEMINI_API_KEY else None
+# At most this many features of each window-based type per record
+MAX_FEATURES_PER_TYPE = 50
+# Loop iterations between deadline checks in the window-based detectors
+DEADLINE_CHECK_INTERVAL = 1024
+# Status of a cancelled ingest, as nginx logs a request the client closed
+CANCELLED_STATUS = 499
+# Name of a dataset's kept /api/genome_data body, before the coding suffix
+GENOME_DATA_BODY = "genome_data.json"
 
 
-def extract_biological_features(
-    seq: Seq, seq_id: str, max_features_per_type: int = 50
-) -> list:
-    """Extract ORFs, GC-rich regions, repeats, and CpG islands."""
-    features = []
-    seq_str = str(seq)
-    seq_len = len(seq_str)
-    if seq_len == 0:
-        return features
+def _out_of_time(deadline: Deadline | None, iteration: int) -> bool:
+    return (
+        deadline is not None
+        and iteration % DEADLINE_CHECK_INTERVAL == 0
+        and deadline.expired()
+    )
 
-    feature_counts = {
-        "ORF": 0,
-        "GC_rich_region": 0,
-        "tandem_repeat": 0,
-        "CpG_island": 0,
-    }
 
-    min_orf_length = 300
-    orfs_temp = []
-    for strand, seq_strand in [("+", seq), ("-", seq.reverse_complement())]:
-        if feature_counts["ORF"] >= max_features_per_type:
-            break
-        seq_str_strand = str(seq_strand)
-        for frame in range(3):
-            if feature_counts["ORF"] >= max_features_per_type:
-                break
-            for match in re.finditer(r"ATG", seq_str_strand[frame:]):
-                start_pos = match.start() + frame
-                for i in range(start_pos, len(seq_str_strand) - 2, 3):
-                    codon = seq_str_strand[i : i + 3]
-                    if codon in ["TAA", "TAG", "TGA"]:
-                        orf_length = i + 3 - start_pos
-                        if orf_length >= min_orf_length:
-                            if strand == "+":
-                                actual_start = start_pos
-                                actual_end = i + 3
-                            else:
-                                actual_start = seq_len - (i + 3)
-                                actual_end = seq_len - start_pos
-                            orfs_temp.append(
-                                {
-                                    "start": actual_start,
-                                    "end": actual_end,
-                                    "strand": strand,
-                                    "length": orf_length,
-                                    "frame": frame,
-                                }
-                            )
-                            feature_counts["ORF"] += 1
-                        break
-
-    orfs_temp.sort(key=lambda x: x["length"], reverse=True)
-    for idx, orf in enumerate(orfs_temp[:max_features_per_type]):
+def detect_orfs(
+    view: SequenceView,
+    seq_id: str,
+    orf_top_k: int = DEFAULT_ORF_TOP_K,
+    deadline: Deadline | None = None,
+) -> tuple:
+    """(gene/CDS and ORF features for the `orf_top_k` longest ORFs over all
+    six frames, whether the scan finished). The scan of a long record is
+    split across the analysis pool when it has several workers."""
+    pool = get_detector_pool(len(view))
+    try:
+        orfs, complete = longest_orfs(view, orf_top_k, pool=pool, deadline=deadline)
+    except BrokenProcessPool:
+        reset_analysis_pool()
+        orfs, complete = longest_orfs(view, orf_top_k, deadline=deadline)
+    return orf_features(orfs, seq_id), complete
+
+
+def orf_features(orfs: list, seq_id: str) -> list:
+    """gene/CDS and ORF features of a record's ORFs, longest first."""
+    features = []
+    for idx, orf in enumerate(orfs):
         feature_type = "gene" if orf["length"] > 900 else "CDS"
         features.append(
             {
@@ -82,15 +98,32 @@ def extract_biological_features(
         features.append(
             {"id": f"orf_{seq_id}_{idx}", "type": "ORF", "seq_id": seq_id, **orf}
         )
+    return features
+
+
+def detect_gc_rich_regions(
+    view: SequenceView,
+    seq_id: str,
+    max_features_per_type: int = MAX_FEATURES_PER_TYPE,
+    deadline: Deadline | None = None,
+) -> tuple:
+    """(merged 200 bp windows with at least 65% GC, whether the scan finished)."""
+    from Bio.SeqUtils import gc_fraction
 
+    seq_str = view.forward
+    seq_len = len(seq_str)
     window_size = 200
     gc_threshold = 0.65
     step_size = 200
+    complete = True
     gc_regions_temp = []
     for i in range(0, seq_len - window_size, step_size):
-        if feature_counts["GC_rich_region"] >= max_features_per_type:
+        if len(gc_regions_temp) >= max_features_per_type:
+            break
+        if _out_of_time(deadline, i // step_size):
+            complete = False
             break
-        window_seq = seq[i : i + window_size]
+        window_seq = seq_str[i : i + window_size]
         gc_content = gc_fraction(window_seq)
         if gc_content >= gc_threshold:
             gc_regions_temp.append(
@@ -100,7 +133,6 @@ def extract_biological_features(
                     "gc_content": round(gc_content * 100, 2),
                 }
             )
-            feature_counts["GC_rich_region"] += 1
     merged_gc_regions = []
     for region in gc_regions_temp:
         if merged_gc_regions and region["start"] - merged_gc_regions[-1]["end"] < 100:
@@ -110,27 +142,42 @@ def extract_biological_features(
             )
         else:
             merged_gc_regions.append(region)
-    for idx, region in enumerate(merged_gc_regions[:max_features_per_type]):
-        features.append(
-            {
-                "id": f"gc_rich_{seq_id}_{idx}",
-                "type": "GC_rich_region",
-                "seq_id": seq_id,
-                "strand": "+",
-                **region,
-            }
-        )
+    features = [
+        {
+            "id": f"gc_rich_{seq_id}_{idx}",
+            "type": "GC_rich_region",
+            "seq_id": seq_id,
+            "strand": "+",
+            **region,
+        }
+        for idx, region in enumerate(merged_gc_regions[:max_features_per_type])
+    ]
+    return features, complete
+
 
+def detect_tandem_repeats(
+    view: SequenceView,
+    seq_id: str,
+    max_features_per_type: int = MAX_FEATURES_PER_TYPE,
+    deadline: Deadline | None = None,
+) -> tuple:
+    """(units of 15-29 bp repeated at least 3 times in a row, sampled every
+    100 bp; whether the scan finished)."""
+    seq_str = view.forward
+    seq_len = len(seq_str)
+    features = []
     repeat_min_length = 15
     repeat_pattern_limit = 30
     repeat_step = 100
     seen_repeats = set()
     for repeat_len in range(repeat_min_length, min(repeat_pattern_limit, seq_len // 4)):
-        if feature_counts["tandem_repeat"] >= max_features_per_type:
+        if len(features) >= max_features_per_type:
             break
         for i in range(0, seq_len - repeat_len * 2, repeat_step):
-            if feature_counts["tandem_repeat"] >= max_features_per_type:
+            if len(features) >= max_features_per_type:
                 break
+            if _out_of_time(deadline, i // repeat_step):
+                return features, False
             pattern = seq_str[i : i + repeat_len]
             if seq_str[i + repeat_len : i + repeat_len * 2] == pattern:
                 repeat_count = 2
@@ -147,7 +194,7 @@ def extract_biological_features(
                         seen_repeats.add(repeat_key)
                         features.append(
                             {
-                                "id": f"repeat_{seq_id}_{feature_counts['tandem_repeat']}",
+                                "id": f"repeat_{seq_id}_{len(features)}",
                                 "type": "tandem_repeat",
                                 "seq_id": seq_id,
                                 "start": i,
@@ -159,13 +206,27 @@ def extract_biological_features(
                                 "unit_length": repeat_len,
                             }
                         )
-                        feature_counts["tandem_repeat"] += 1
+    return features, True
+
 
+def detect_cpg_islands(
+    view: SequenceView,
+    seq_id: str,
+    max_features_per_type: int = MAX_FEATURES_PER_TYPE,
+    deadline: Deadline | None = None,
+) -> tuple:
+    """(200 bp windows over 55% GC with a CpG observed/expected ratio over
+    0.65, whether the scan finished)."""
+    seq_str = view.forward
+    seq_len = len(seq_str)
+    features = []
     window_size = 200
     cpg_step = 200
     for i in range(0, seq_len - window_size, cpg_step):
-        if feature_counts["CpG_island"] >= max_features_per_type:
+        if len(features) >= max_features_per_type:
             break
+        if _out_of_time(deadline, i // cpg_step):
+            return features, False
         window = seq_str[i : i + window_size]
         cg_count = window.count("CG")
         c_count = window.count("C")
@@ -177,7 +238,7 @@ def extract_biological_features(
             if gc_content > 0.55 and obs_exp_ratio > 0.65:
                 features.append(
                     {
-                        "id": f"cpg_island_{seq_id}_{feature_counts['CpG_island']}",
+                        "id": f"cpg_island_{seq_id}_{len(features)}",
                         "type": "CpG_island",
                         "seq_id": seq_id,
                         "start": i,
@@ -187,9 +248,125 @@ def extract_biological_features(
                         "obs_exp_ratio": round(obs_exp_ratio, 2),
                     }
                 )
-                feature_counts["CpG_island"] += 1
+    return features, True
 
-    return features
+
+# Feature detectors in the order their features are listed for a record
+DETECTORS = {
+    "ORF": detect_orfs,
+    "GC_rich_region": detect_gc_rich_regions,
+    "tandem_repeat": detect_tandem_repeats,
+    "CpG_island": detect_cpg_islands,
+}
+# Order they run in, so an anytime analysis finds ORFs first and leaves the
+# slowest scan, for tandem repeats, until last
+REFINEMENT_ORDER = ("ORF", "GC_rich_region", "CpG_island", "tandem_repeat")
+# Detectors scanning a record window by window, run as one work queue task
+WINDOW_DETECTORS = ("GC_rich_region", "CpG_island", "tandem_repeat")
+
+
+def detect_windows(seq_str: str, seq_id: str) -> dict:
+    """{feature type: features} of the window-based detectors on one record.
+    Top-level so work queue workers on other nodes can run it."""
+    view = SequenceView(seq_str)
+    return {
+        feature_type: DETECTORS[feature_type](view, seq_id)[0]
+        for feature_type in WINDOW_DETECTORS
+    }
+
+
+def submit_record(queue, view: SequenceView, seq_id: str, orf_top_k: int) -> dict:
+    """Queue the detector tasks of one record: its ORF scan chunk by chunk,
+    and the window-based detectors as one task. Their results are reduced
+    here by `collect_record`."""
+    return {
+        "ORF": submit_chunk_scans(queue, view, orf_top_k),
+        "windows": queue.submit(detect_windows, view.forward, seq_id),
+    }
+
+
+def collect_record(
+    tasks: dict,
+    feature_type: str,
+    view: SequenceView,
+    seq_id: str,
+    orf_top_k: int,
+    deadline: Deadline | None = None,
+) -> tuple:
+    """(features, complete) of one detector from a record's queued tasks,
+    as the detector returns them; incomplete once `deadline` expires."""
+    if feature_type == "ORF":
+        orfs, complete = merge_chunk_scans(
+            tasks["ORF"], len(view), orf_top_k, deadline=deadline
+        )
+        return orf_features(orfs, seq_id), complete
+    windows = result_before(tasks["windows"], deadline)
+    if windows is None:
+        return [], False
+    return windows[feature_type], True
+
+
+def cancel_record(tasks: dict) -> None:
+    """Cancel a record's queued tasks that no worker has finished yet."""
+    for _, future in tasks["ORF"]:
+        future.cancel()
+    tasks["windows"].cancel()
+
+
+# Detector that reports each feature type
+FEATURE_DETECTORS = {
+    "gene": "ORF",
+    "CDS": "ORF",
+    "ORF": "ORF",
+    **{feature_type: feature_type for feature_type in WINDOW_DETECTORS},
+}
+
+
+def record_key(seq_str: str, orf_top_k: int) -> str:
+    """Key of a record's detector results: its sequence and the detector
+    parameters, but not its id."""
+    return cache_key(seq_str, {"orf_top_k": orf_top_k})
+
+
+def relabel_features(features: list, source_id: str, seq_id: str) -> list:
+    """Copies of the features of record `source_id` for an identical record
+    `seq_id`: the same coordinates under the record's own ids."""
+    relabeled = []
+    for feat in features:
+        head, _, number = feat["id"].rpartition("_")
+        prefix = head.removesuffix(f"_{source_id}")
+        relabeled.append(
+            {**feat, "id": f"{prefix}_{seq_id}_{number}", "seq_id": seq_id}
+        )
+    return relabeled
+
+
+def stored_record_features(key: str, seq_id: str, loaded: dict) -> dict | None:
+    """{detector: features} for record `seq_id` from an identical record of
+    a stored dataset, or None if no stored dataset has one. `loaded` keeps
+    the datasets read so far, their features grouped by record."""
+    source = RESULT_CACHE.record_source(key)
+    if source is None:
+        return None
+    dataset_id, source_id = source
+    if dataset_id not in loaded:
+        result = RESULT_CACHE.get(dataset_id)
+        grouped = None
+        if result is not None:
+            grouped = {}
+            for feat in result.get("features", []):
+                detector = FEATURE_DETECTORS.get(feat.get("type"))
+                if detector is not None:
+                    record = grouped.setdefault(feat["seq_id"], {})
+                    record.setdefault(detector, []).append(feat)
+        loaded[dataset_id] = grouped
+    if loaded[dataset_id] is None:
+        return None
+    features = loaded[dataset_id].get(source_id, {})
+    return {
+        detector: relabel_features(features.get(detector, []), source_id, seq_id)
+        for detector in DETECTORS
+    }
 
 
 def calculate_sequence_metrics(seq_str: str) -> dict:
@@ -259,24 +436,196 @@ def calculate_sequence_metrics(seq_str: str) -> dict:
     }
 
 
-def process_fasta_content(fasta_content: str) -> dict:
-    """Parse FASTA, compute metrics, and extract features."""
-    records = SeqIO.parse(io.StringIO(fasta_content), "fasta")
-    features_list = []
+def analysis_params(payload: dict) -> dict:
+    """Validated analysis parameters from a request payload, defaults filled in
+    so equal requests share a cache key."""
+    kmer_k = payload.get("kmer_k", DEFAULT_KMER_K)
+    if isinstance(kmer_k, bool) or not isinstance(kmer_k, int):
+        raise ValueError("'kmer_k' must be an integer.")
+    if not 1 <= kmer_k <= MAX_KMER_K:
+        raise ValueError(f"'kmer_k' must be between 1 and {MAX_KMER_K}.")
+    orf_top_k = payload.get("orf_top_k", DEFAULT_ORF_TOP_K)
+    if isinstance(orf_top_k, bool) or not isinstance(orf_top_k, int):
+        raise ValueError("'orf_top_k' must be an integer.")
+    if not 0 <= orf_top_k <= MAX_ORF_TOP_K:
+        raise ValueError(f"'orf_top_k' must be between 0 and {MAX_ORF_TOP_K}.")
+    return {"kmer_k": kmer_k, "orf_top_k": orf_top_k}
+
+
+def request_deadline(payload: dict) -> Deadline | None:
+    """Deadline for an anytime analysis from 'time_budget_ms', started now;
+    None when the request has no budget. Not an analysis parameter: the
+    budget changes how much of the result is computed, not its values."""
+    budget = payload.get("time_budget_ms")
+    if budget is None:
+        return None
+    if isinstance(budget, bool) or not isinstance(budget, (int, float)):
+        raise ValueError("'time_budget_ms' must be a number.")
+    if not 0 < budget <= MAX_TIME_BUDGET_MS:
+        raise ValueError(
+            f"'time_budget_ms' must be above 0 and at most {MAX_TIME_BUDGET_MS}."
+        )
+    return Deadline(budget / 1000)
+
+
+def request_cancel_token(payload: dict) -> CancelToken | None:
+    """Token for the client-chosen 'request_id', which POST
+    /api/ingest/cancel can cancel from any server process; None without
+    one."""
+    request_id = payload.get("request_id")
+    if request_id is None:
+        return None
+    if not valid_request_id(request_id):
+        raise ValueError(
+            "'request_id' must be 1 to 64 letters, digits, '-' or '_'."
+        )
+    return CancelToken(request_id)
+
+
+def request_progress(cancel: CancelToken | None) -> ProgressReporter | None:
+    """Progress reporter of a request with a 'request_id', which GET
+    /api/ingest/<request_id>/events streams; None without one."""
+    if cancel is None:
+        return None
+    progress = ProgressReporter(cancel.request_id)
+    progress.event("started")
+    progress.flush()
+    return progress
+
+
+def reported(progress: ProgressReporter | None, respond) -> Response:
+    """The response `respond()` returns, its status also reported as the
+    final progress event, with the error message of a failure."""
+    response = make_response(respond())
+    if progress is not None:
+        outcome = {"status": response.status_code}
+        if response.status_code >= 400:
+            outcome["error"] = (response.get_json(silent=True) or {}).get("error")
+        progress.finish(**outcome)
+    return response
+
+
+def rejection_progress(request_id) -> ProgressReporter | None:
+    """Progress reporter for the 'done' event of a request refused before it
+    started, so a client that opened its event stream first is not left
+    waiting for it; None without a valid 'request_id'."""
+    if not valid_request_id(request_id):
+        return None
+    return ProgressReporter(request_id)
+
+
+def rejected(request_id, error: str, status: int = 400) -> Response:
+    """Error response for a request refused before it started, reported as
+    the 'done' event of its 'request_id' if it has one."""
+    return reported(
+        rejection_progress(request_id), lambda: (jsonify({"error": error}), status)
+    )
+
+
+def process_fasta_content(
+    fasta_content: str,
+    params: dict | None = None,
+    artifacts: dict | None = None,
+    deadline: Deadline | None = None,
+    cancel: CancelToken | None = None,
+    progress: ProgressReporter | None = None,
+) -> dict:
+    """Parse FASTA, compute metrics, and extract features.
+    If `artifacts` is given it is filled with results too large for the JSON
+    response: per-sequence sequences (for motif search and viewports), block
+    composition prefix sums, skew profiles and MinHash sketches, plus the
+    k-mer spectrum and codon usage over all records."""
+    return process_fasta_handle(
+        io.StringIO(fasta_content), params, artifacts, deadline, cancel, progress
+    )
+
+
+def process_fasta_handle(
+    handle,
+    params: dict | None = None,
+    artifacts: dict | None = None,
+    deadline: Deadline | None = None,
+    cancel: CancelToken | None = None,
+    progress: ProgressReporter | None = None,
+) -> dict:
+    """`process_fasta_content` for a text handle, e.g. an uploaded file, so
+    records are parsed as they are read instead of from one big string.
+
+    Exact composition metrics and block composition (the skew tracks) of
+    every record come first. Then each detector runs over all records in
+    `REFINEMENT_ORDER`, followed by the k-mer spectrum and sketches. With a
+    `deadline`, the later stages stop once it passes, keeping what they
+    found, and the result gets a `completeness` map of which parts
+    finished. Once `cancel` is cancelled, Cancelled is raised at the next
+    record or chunk boundary. `progress` gets records parsed, each
+    detector's progress over the records and partial feature counts, and
+    a 'stage' event with its timing as each stage finishes.
+
+    Records are hashed as they are parsed. The detectors run once per
+    distinct sequence: a record identical to an earlier one in the file
+    reuses its composition and features, and one identical to a record of
+    a stored dataset reuses that record's features, each under its own id."""
+    from Bio import SeqIO
+
+    params = params or {}
+    budgeted = deadline is not None
+    if cancel is not None:
+        # Detectors stop at their next deadline check, then the stage raises
+        deadline = (deadline or Deadline()).with_cancel(cancel)
+
+    def check_cancelled():
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+
+    stage_started = time.perf_counter()
+
+    def stage_done(stage: str, **data):
+        nonlocal stage_started
+        now = time.perf_counter()
+        if progress is not None:
+            stage_ms = round((now - stage_started) * 1000, 1)
+            progress.event("stage", stage=stage, stage_ms=stage_ms, **data)
+        stage_started = now
+
+    records = SeqIO.parse(handle, "fasta")
+    orf_top_k = params.get("orf_top_k", DEFAULT_ORF_TOP_K)
+    views = []
     sequences_info = []
+    record_keys = []
+    # Index of the first identical record of each record, None for a first
+    sources = []
+    first_seen = {}
     total_length = 0
     total_gc = 0
     total_at = 0
     for i, record in enumerate(records):
+        check_cancelled()
         seq_str = str(record.seq)
         seq_len = len(seq_str)
         total_length += seq_len
         seq_id = record.id
-        metrics = calculate_sequence_metrics(seq_str)
+        key = record_key(seq_str, orf_top_k)
+        record_keys.append(key)
+        if key in first_seen:
+            source, metrics, block_size, prefix, skew_profile = first_seen[key]
+            sources.append(source)
+        else:
+            metrics = calculate_sequence_metrics(seq_str)
+            block_size = block_size_for(seq_len)
+            prefix = scan_composition(seq_str, block_size)
+            skew_profile = skew_profile_from_prefix(prefix, seq_len, block_size)
+            first_seen[key] = (i, metrics, block_size, prefix, skew_profile)
+            sources.append(None)
         total_gc += metrics["gc_count"]
         total_at += metrics["at_count"]
-        seq_features = extract_biological_features(record.seq, seq_id)
-        features_list.extend(seq_features)
+        if artifacts is not None:
+            artifacts.setdefault("sequences", {})[seq_id] = seq_str.upper()
+            artifacts.setdefault("composition", {})[seq_id] = {
+                "block_size": block_size,
+                "prefix": prefix.astype(np.int32 if seq_len < 2**31 else np.int64),
+            }
+            artifacts.setdefault("skew_profiles", {})[seq_id] = skew_profile
+        views.append((seq_id, SequenceView(seq_str)))
         sequences_info.append(
             {
                 "id": seq_id,
@@ -289,13 +638,150 @@ def process_fasta_content(fasta_content: str) -> dict:
                 "gc_skew": metrics["gc_skew"],
                 "at_skew": metrics["at_skew"],
                 "ambiguous_bases": metrics["ambiguous_bases"],
+                "origin_estimate": skew_profile["origin"],
+                "terminus_estimate": skew_profile["terminus"],
                 "sequence_preview": seq_str[:100] + ("..." if seq_len > 100 else ""),
             }
         )
+        if progress is not None:
+            progress.update("parse", records=i + 1, bases=total_length, record=seq_id)
+    if artifacts is not None:
+        artifacts["record_keys"] = {
+            seq_id: key for (seq_id, _), key in zip(views, record_keys)
+        }
+    stage_done(
+        "composition",
+        records=len(views),
+        bases=total_length,
+        distinct_records=len(first_seen),
+    )
+
+    # Features of first records analysed before, as stored datasets have them
+    reused = {}
+    loaded = {}
+    for index, (seq_id, _) in enumerate(views):
+        if sources[index] is None:
+            stored = stored_record_features(record_keys[index], seq_id, loaded)
+            if stored is not None:
+                reused[index] = stored
+    del loaded
+    runs = [
+        sources[index] is None and index not in reused for index in range(len(views))
+    ]
+
+    completeness = {"composition": True, "skew_profile": True}
+    record_features = [{} for _ in views]
+    feature_counts = {}
+    options = {"ORF": {"orf_top_k": orf_top_k}}
+    # A large unbudgeted analysis hands its detectors to the work queue, if
+    # one is configured. Every record's tasks are queued before any result
+    # is awaited, so the queue's workers share the whole batch; the results
+    # are reduced here, in the same order as running them here.
+    bases_to_run = sum(len(view) for (_, view), run in zip(views, runs) if run)
+    queue = None if budgeted else get_work_queue(bases_to_run)
+    queued = None
+    if queue is not None:
+        queued = [
+            submit_record(queue, view, seq_id, orf_top_k) if run else None
+            for (seq_id, view), run in zip(views, runs)
+        ]
+    try:
+        for feature_type in REFINEMENT_ORDER:
+            completeness[feature_type] = True
+            for index, (seq_id, view) in enumerate(views):
+                source = sources[index]
+                if index in reused:
+                    found, complete = reused[index][feature_type], True
+                elif source is not None:
+                    found = relabel_features(
+                        record_features[source][feature_type], views[source][0], seq_id
+                    )
+                    complete = True
+                elif queued is None:
+                    found, complete = DETECTORS[feature_type](
+                        view, seq_id, deadline=deadline, **options.get(feature_type, {})
+                    )
+                else:
+                    found, complete = collect_record(
+                        queued[index], feature_type, view, seq_id, orf_top_k, deadline
+                    )
+                record_features[index][feature_type] = found
+                completeness[feature_type] &= complete
+                check_cancelled()
+                if progress is not None:
+                    for feat in found:
+                        feat_type = feat["type"]
+                        feature_counts[feat_type] = feature_counts.get(feat_type, 0) + 1
+                    progress.update(
+                        "detect",
+                        stage=feature_type,
+                        records_done=index + 1,
+                        records=len(views),
+                        feature_counts=dict(feature_counts),
+                    )
+            stage_done(
+                feature_type,
+                complete=completeness[feature_type],
+                feature_counts=dict(feature_counts),
+            )
+    finally:
+        if queued is not None:
+            # Nothing is left to run once the analysis stops, e.g. cancelled
+            for tasks in queued:
+                if tasks is not None:
+                    cancel_record(tasks)
+
+    # Codon usage is read over the ORFs found, however many that was
+    codon_usage = CodonUsage()
+    for (_, view), found in zip(views, record_features):
+        codon_usage.add_orfs(
+            view, [feat for feat in found["ORF"] if feat["type"] == "ORF"]
+        )
+    completeness["codon_usage"] = completeness["ORF"]
+    stage_done("codon_usage")
+
+    # Partial k-mer counts or sketches would mislead, so they are all or nothing
+    kmer_counter = KmerCounter(params.get("kmer_k", DEFAULT_KMER_K))
+    sketches = {}
+    kmers_complete = True
+    for index, (seq_id, view) in enumerate(views):
+        kmer_counter.reset_carry()
+        source = sources[index]
+        # An identical record's sketch is the same; its k-mers still count
+        consumers = [kmer_counter]
+        if source is None:
+            consumers.append(SketchBuilder())
+        if not feed_consumers(view.forward, consumers, deadline):
+            kmers_complete = False
+            break
+        if source is not None:
+            sketches[seq_id] = sketches[views[source][0]]
+        else:
+            sketches[seq_id] = consumers[1].finish()
+        if progress is not None:
+            progress.update("kmers", records_done=index + 1, records=len(views))
+    check_cancelled()
+    stage_done("kmer_spectrum", complete=kmers_complete)
+    if progress is not None:
+        # What is still buffered, before a pool worker's copy is dropped
+        progress.flush()
+    completeness["kmer_spectrum"] = completeness["sketches"] = kmers_complete
+    if artifacts is not None:
+        artifacts["codon_usage"] = codon_usage.summary()
+        if kmers_complete:
+            artifacts["kmer_spectrum"] = kmer_counter.summary()
+            artifacts["sketches"] = sketches
+
+    features_list = [
+        feat
+        for found in record_features
+        for feature_type in DETECTORS
+        for feat in found[feature_type]
+    ]
     overall_gc_content = (total_gc / total_length * 100) if total_length > 0 else 0.0
     overall_at_content = (total_at / total_length * 100) if total_length > 0 else 0.0
     avg_seq_length = (total_length / len(sequences_info)) if sequences_info else 0
-    return {
+    result = {
         "sequence_length": total_length,
         "features": features_list,
         "sequences": sequences_info,
@@ -309,76 +795,551 @@ def process_fasta_content(fasta_content: str) -> dict:
             "total_at_bases": total_at,
         },
     }
+    if budgeted:
+        result["completeness"] = completeness
+    return result
+
+
+class FetchError(Exception):
+    """Downloading FASTA from a URL failed."""
+
 
+def fetch_fasta(
+    url: str,
+    cancel: CancelToken | None = None,
+    progress: ProgressReporter | None = None,
+) -> str:
+    """Download FASTA text from a URL, raising on HTTP errors. The body is
+    read in chunks, so a download for a cancelled request stops early, and
+    `progress` gets the bytes downloaded (and Content-Length, when sent)."""
+    import httpx
 
-DATA_CACHE = None
+    with httpx.stream("GET", url, timeout=20) as resp:
+        resp.raise_for_status()
+        total = resp.headers.get("Content-Length")
+        total = int(total) if total and total.isdigit() else None
+        chunks = []
+        for chunk in resp.iter_text():
+            if cancel is not None:
+                cancel.raise_if_cancelled()
+            chunks.append(chunk)
+            if progress is not None:
+                progress.update(
+                    "download", bytes=resp.num_bytes_downloaded, total=total
+                )
+    if progress is not None:
+        progress.event("download_done", bytes=resp.num_bytes_downloaded)
+        progress.flush()
+    return "".join(chunks)
+
+
+def count_feature_types(features: list) -> dict:
+    """Tally detected features by their type."""
+    feature_counts = {}
+    for feat in features:
+        feat_type = feat.get("type", "unknown")
+        feature_counts[feat_type] = feature_counts.get(feat_type, 0) + 1
+    return feature_counts
+
+
+def analyse_content(
+    fasta_content: str,
+    params: dict | None = None,
+    deadline: Deadline | None = None,
+    cancel: CancelToken | None = None,
+    progress: ProgressReporter | None = None,
+) -> tuple:
+    """Return (result, artifacts) for FASTA content. Top-level so it can run
+    in worker processes."""
+    artifacts = {}
+    result = process_fasta_content(
+        fasta_content, params, artifacts, deadline, cancel, progress
+    )
+    return result, artifacts
+
+
+def store_analysis(key: str, result: dict, artifacts: dict) -> tuple:
+    """(dataset_id, result) for a finished analysis, cached under `key`.
+
+    An anytime analysis that ran out of time is not cached, since its
+    features depend on how fast it ran: it gets dataset_id None, and the
+    coarsest skew track of each record inline, as no track endpoint can
+    serve them. One that finished is cached like any other analysis."""
+    completeness = result.pop("completeness", None)
+    if completeness is None or all(completeness.values()):
+        RESULT_CACHE.put(key, result, artifacts)
+        return key, result
+    tracks = {}
+    for seq_id, profile in artifacts.get("skew_profiles", {}).items():
+        tracks[seq_id] = {
+            "length": profile["length"],
+            "origin": profile["origin"],
+            "terminus": profile["terminus"],
+            "profile": profile["levels"][0] if profile["levels"] else None,
+        }
+    return None, {**result, "completeness": completeness, "skew_profiles": tracks}
+
+
+def coalesced(key: str, analyse) -> tuple:
+    """(dataset_id, result, cached) of `analyse()`, which runs once for
+    concurrent ingests with the same key in any worker process; the others
+    wait for it and get the result it stored, marked cached. If the request
+    running it is cancelled, the others run it themselves."""
+    outcome = {}
+    led = []
+
+    def lead():
+        led.append(True)
+        dataset_id, outcome["result"], outcome["cached"] = analyse()
+        return dataset_id
+
+    try:
+        dataset_id, _ = INGEST_FLIGHTS.do(key, lead)
+    except Cancelled:
+        if led:
+            raise
+        return analyse()
+    if outcome:
+        return dataset_id, outcome["result"], outcome["cached"]
+    result = RESULT_CACHE.get(dataset_id) if dataset_id else None
+    if result is None:
+        return analyse()
+    return dataset_id, result, True
+
+
+def _analyse_fasta(
+    key: str,
+    fasta_content: str,
+    params: dict | None,
+    deadline: Deadline | None,
+    cancel: CancelToken | None,
+    progress: ProgressReporter | None,
+) -> tuple:
+    result = RESULT_CACHE.get(key)
+    if result is not None:
+        return key, result, True
+    with ADMISSION.admit(estimate_cost(len(fasta_content))):
+        result, artifacts = analyse_content(
+            fasta_content, params, deadline, cancel, progress
+        )
+    return *store_analysis(key, result, artifacts), False
+
+
+def analyse_fasta(
+    fasta_content: str,
+    params: dict | None = None,
+    deadline: Deadline | None = None,
+    cancel: CancelToken | None = None,
+    progress: ProgressReporter | None = None,
+) -> tuple:
+    """Return (dataset_id, result, cached) for FASTA content, reusing the
+    per-genome result cache when the same content was processed before and
+    sharing one analysis between concurrent requests for it. With a
+    `deadline` the analysis is anytime (see `store_analysis`) and, being
+    bounded by its own budget, runs alone. Raises Cancelled once `cancel`
+    is cancelled. `progress` gets the progress of an analysis this request
+    runs, not of one it waits for."""
+    key = cache_key(fasta_content, params)
+    result = RESULT_CACHE.get(key)
+    if result is not None:
+        return key, result, True
+    analyse = partial(
+        _analyse_fasta, key, fasta_content, params, deadline, cancel, progress
+    )
+    if deadline is not None:
+        return analyse()
+    return coalesced(key, analyse)
+
+
+def _analyse_fasta_file(
+    key: str,
+    binary,
+    size: int,
+    params: dict | None,
+    deadline: Deadline | None,
+    cancel: CancelToken | None,
+    progress: ProgressReporter | None,
+) -> tuple:
+    result = RESULT_CACHE.get(key)
+    if result is not None:
+        return key, result, True
+    binary.seek(0)
+    artifacts = {}
+    with ADMISSION.admit(estimate_cost(size)):
+        result = process_fasta_handle(
+            open_text(binary), params, artifacts, deadline, cancel, progress
+        )
+    return *store_analysis(key, result, artifacts), False
+
+
+def analyse_fasta_file(
+    binary,
+    params: dict | None = None,
+    deadline: Deadline | None = None,
+    cancel: CancelToken | None = None,
+    progress: ProgressReporter | None = None,
+) -> tuple:
+    """`analyse_fasta` for a seekable binary file, optionally gzip, bz2 or xz
+    compressed. The file is read twice, once to compute the cache key and
+    its decompressed size, which the analysis is admitted on, and once (on a
+    miss) by the parser, but it is never loaded whole. Raises UploadTooLarge
+    if it decompresses to more than MAX_UPLOAD_BYTES."""
+    reader = CountingReader(open_decompressed(binary))
+    key = cache_key_from_chunks(stripped_chunks(reader), params)
+    result = RESULT_CACHE.get(key)
+    if result is not None:
+        return key, result, True
+    analyse = partial(
+        _analyse_fasta_file,
+        key,
+        binary,
+        reader.size,
+        params,
+        deadline,
+        cancel,
+        progress,
+    )
+    if deadline is not None:
+        return analyse()
+    return coalesced(key, analyse)
+
+
+def analyse_url(
+    url: str,
+    params: dict | None = None,
+    deadline: Deadline | None = None,
+    cancel: CancelToken | None = None,
+    progress: ProgressReporter | None = None,
+) -> tuple:
+    """`analyse_fasta` for FASTA downloaded from `url`; raises FetchError if
+    the download fails. Concurrent ingests of one URL with the same
+    parameters, in any worker process, share one download and analysis."""
+
+    def fetch_and_analyse():
+        try:
+            fasta_content = fetch_fasta(url, cancel, progress)
+        except Cancelled:
+            raise
+        except Exception as e:
+            raise FetchError(str(e)) from e
+        return analyse_fasta(fasta_content, params, deadline, cancel, progress)
+
+    if deadline is not None:
+        return fetch_and_analyse()
+    return coalesced("url:" + cache_key(url, params), fetch_and_analyse)
+
+
+def overloaded_response(error: Overloaded):
+    """Error response for an analysis the admission controller turned away."""
+    response = jsonify({"error": str(error)})
+    response.status_code = error.status
+    if error.retry_after is not None:
+        response.headers["Retry-After"] = str(error.retry_after)
+    return response
+
+
+def latest_dataset_id() -> str | None:
+    """Dataset id of the most recent /api/ingest in any server process."""
+    return RESULT_CACHE.latest()
+
+
+def genome_data_body(dataset_id: str, encoding: str | None) -> bytes | None:
+    """/api/genome_data JSON of a dataset in one content coding, serialised
+    and compressed the first time it is asked for and then kept with the
+    dataset; None if the dataset is unknown. Datasets never change under
+    their id, so the kept bytes need no invalidation: they go with it."""
+    name = GENOME_DATA_BODY + SUFFIXES[encoding]
+    body = RESULT_CACHE.response_body(dataset_id, name)
+    if body is not None:
+        return body
+    result = RESULT_CACHE.get(dataset_id)
+    if result is None:
+        return None
+    data = dumps_bytes({**result, "dataset_id": dataset_id})
+    body = compress(data, encoding, STORED_LEVELS)
+    RESULT_CACHE.put_response_body(dataset_id, name, body)
+    return body
 
 
 @bp.route("/api/genome_data", methods=["GET"])
 def get_genome_data():
-    if DATA_CACHE is None:
-        return jsonify({"message": "Data not yet loaded"}), 503
-    return jsonify(DATA_CACHE)
+    """The latest dataset's result, or any stored one with ?dataset_id=.
+
+    The body is sent in the best content coding the client accepts, from
+    bytes kept with the dataset. Dataset ids hash the content and analysis
+    parameters, so a dataset's body never changes: its id is the (weak,
+    being sent in several codings) ETag, and If-None-Match gets 304."""
+    dataset_id = request.args.get("dataset_id")
+    if dataset_id and dataset_id not in RESULT_CACHE:
+        return jsonify({"error": f"Unknown dataset_id '{dataset_id}'."}), 404
+    if not dataset_id:
+        dataset_id = latest_dataset_id()
+        if dataset_id is None:
+            return jsonify({"message": "Data not yet loaded"}), 503
+
+    if request.if_none_match.contains_weak(dataset_id):
+        response = Response(status=304)
+    else:
+        encoding = negotiate(request.headers.get("Accept-Encoding"))
+        body = genome_data_body(dataset_id, encoding)
+        if body is None:
+            # Pruned since it was looked up
+            return jsonify({"error": f"Unknown dataset_id '{dataset_id}'."}), 404
+        response = Response(body, mimetype="application/json")
+        if encoding is not None:
+            response.headers["Content-Encoding"] = encoding
+    response.set_etag(dataset_id, weak=True)
+    # Revalidate every time: without ?dataset_id= the latest dataset changes
+    response.headers["Cache-Control"] = "no-cache"
+    add_vary(response)
+    return response
+
+
+def ingest_response(
+    dataset_id: str | None,
+    cached_result: dict,
+    cached: bool,
+    include_interpretation: bool,
+    deadline: Deadline | None = None,
+) -> dict:
+    """Response body for an ingest: the result plus dataset_id and cached, and
+    the interpretation (or the job producing it) when requested. Also marks
+    the dataset as the latest one.
+
+    With a `deadline` it also has 'complete', 'time_budget_ms' and
+    'elapsed_ms'. An analysis that ran out of time (dataset_id None) is
+    returned as is: it is not the latest dataset and is not interpreted."""
+    # Copy so per-request fields never leak into the shared cache entry
+    result = {**cached_result, "dataset_id": dataset_id, "cached": cached}
+    if deadline is not None:
+        result["complete"] = dataset_id is not None
+        result["time_budget_ms"] = round(deadline.seconds * 1000)
+        result["elapsed_ms"] = deadline.elapsed_ms()
+    if dataset_id is None:
+        return result
+    RESULT_CACHE.set_latest(dataset_id)
+
+    if include_interpretation:
+        # The LLM call runs as a background job; poll the returned job
+        # unless the interpretation was already cached.
+        feature_counts = count_feature_types(result.get("features", []))
+        prompt = build_prompt(
+            result, feature_counts, RESULT_CACHE.get_artifacts(dataset_id) or {}
+        )
+        job = request_interpretation(prompt, dataset_id)
+        result["feature_counts"] = feature_counts
+        result["interpretation_job"] = job
+        if "interpretation" in job:
+            result["interpretation"] = job["interpretation"]
+        elif "error" in job:
+            result["interpretation_error"] = job["error"]
+    return result
 
 
 @bp.route("/api/ingest", methods=["POST"])
 def ingest_fasta():
+    """Accepts JSON with either 'fasta' (raw string) or 'url' to fetch.
+    Returns processed features, sequence data, and optional AI interpretation.
+
+    Optional: Set 'interpret': true in JSON body to request an AI interpretation.
+    It is included directly when cached; otherwise 'interpretation_job' names
+    the job to poll at /api/interpretation/<job_id>.
+
+    Optional: 'time_budget_ms' makes the analysis anytime. Composition comes
+    first and detectors refine it until the budget runs out; 'complete' and
+    'completeness' say which parts finished.
+
+    Optional: 'request_id' lets POST /api/ingest/cancel stop the download and
+    analysis, which then answers 499, and GET /api/ingest/<request_id>/events
+    stream its progress.
+
+    Analyses are admitted against the server's memory budget: 413 when the
+    genome can never fit it, 503 with Retry-After when the server is busy."""
+    if request.content_length:
+        try:
+            # Refuse a body that could never be analysed before reading it
+            ADMISSION.check(estimate_cost(request.content_length))
+        except Overloaded as e:
+            # The body is not read, so only a 'request_id' in the query
+            # string can hear of it
+            return reported(
+                rejection_progress(request.args.get("request_id")),
+                partial(overloaded_response, e),
+            )
     payload = request.get_json(silent=True) or {}
-    fasta_content = None
     include_interpretation = payload.get("interpret", False)
+    try:
+        params = analysis_params(payload)
+        deadline = request_deadline(payload)
+        cancel = request_cancel_token(payload)
+    except ValueError as e:
+        return rejected(payload.get("request_id"), str(e))
 
     if "fasta" in payload and isinstance(payload["fasta"], str):
-        fasta_content = payload["fasta"].strip()
+        source = partial(analyse_fasta, payload["fasta"].strip())
     elif "url" in payload and isinstance(payload["url"], str):
-        try:
-            resp = httpx.get(payload["url"], timeout=20)
-            resp.raise_for_status()
-            fasta_content = resp.text
-        except Exception as e:
-            return jsonify({"error": f"Failed to fetch URL: {e}"}), 400
+        source = partial(analyse_url, payload["url"])
     else:
-        return jsonify({"error": "Provide 'fasta' string or 'url' in JSON body."}), 400
+        return rejected(
+            payload.get("request_id"), "Provide 'fasta' string or 'url' in JSON body."
+        )
+
+    progress = request_progress(cancel)
+    analyse = partial(source, params, deadline, cancel, progress)
+    return reported(
+        progress,
+        partial(_ingest_response, analyse, cancel, deadline, include_interpretation),
+    )
+
 
+def _ingest_response(
+    analyse,
+    cancel: CancelToken | None,
+    deadline: Deadline | None,
+    include_interpretation: bool,
+):
     try:
-        result = process_fasta_content(fasta_content)
-        global DATA_CACHE
-        DATA_CACHE = result
-
-        if include_interpretation and gemini_client:
-            try:
-                summary = result.get("summary", {})
-                sequences = result.get("sequences", [])
-                features = result.get("features", [])
-                feature_counts = {}
-                for feat in features:
-                    feat_type = feat.get("type", "unknown")
-                    feature_counts[feat_type] = feature_counts.get(feat_type, 0) + 1
-                prompt = (
-                    "As a genomic analysis expert, please interpret the following genomic data and provide insights:\n\n"
-                    f"Total sequences: {summary.get('total_sequences', 0)}\n"
-                    f"Total bases: {summary.get('total_bases', 0):,} bp\n"
-                    f"Average sequence length: {summary.get('average_length', 0):.2f} bp\n"
-                    f"Overall GC content: {summary.get('overall_gc_content', 0):.2f}%\n"
-                    f"Overall AT content: {summary.get('overall_at_content', 0):.2f}%\n\n"
-                    + "Detected Features:\n"
-                    + "\n".join(
-                        [f"- {ft}: {cnt}" for ft, cnt in feature_counts.items()]
-                    )
-                )
-                response = gemini_client.models.generate_content(
-                    model="gemini-2.5-flash", contents=prompt
-                )
-                result["interpretation"] = response.text
-                result["feature_counts"] = feature_counts
-            except Exception as e:
-                result["interpretation_error"] = (
-                    f"Failed to generate interpretation: {str(e)}"
-                )
-        elif include_interpretation and not gemini_client:
-            result["interpretation_error"] = (
-                "Gemini AI is not configured. Please set GEMINI_API_KEY environment variable."
-            )
+        dataset_id, cached_result, cached = analyse()
+        if cancel is not None:
+            # Nobody is waiting for it, so start no interpretation either
+            cancel.raise_if_cancelled()
+        result = ingest_response(
+            dataset_id, cached_result, cached, include_interpretation, deadline
+        )
+        return jsonify(result), 200
+    except Cancelled as e:
+        return jsonify({"error": str(e)}), CANCELLED_STATUS
+    except FetchError as e:
+        return jsonify({"error": f"Failed to fetch URL: {e}"}), 400
+    except Overloaded as e:
+        return overloaded_response(e)
+    except Exception as e:
+        return jsonify({"error": f"Failed to process FASTA: {e}"}), 500
+
+
+@bp.route("/api/ingest/cancel", methods=["POST"])
+def cancel_ingest():
+    """Cancel the ingest or upload sent with JSON 'request_id', in whichever
+    server process runs it. It stops at its next record or chunk boundary,
+    within milliseconds, and frees its admission reservation and worker. A
+    cancellation that arrives first stops the request as soon as it starts."""
+    payload = request.get_json(silent=True) or {}
+    request_id = payload.get("request_id")
+    if not valid_request_id(request_id):
+        return jsonify({"error": "Provide a valid 'request_id' in JSON body."}), 400
+    CancelToken(request_id).cancel()
+    return jsonify({"request_id": request_id, "cancelled": True}), 202
+
+
+@bp.route("/api/ingest/<request_id>/events", methods=["GET"])
+def ingest_events(request_id: str):
+    """Server-sent events on the progress of the ingest or upload sent with
+    this 'request_id', from any server process: 'download' (bytes so far),
+    'parse' (records and bases parsed), 'detect' and 'kmers' (records done
+    by the running stage, with feature counts so far), 'stage' (a stage
+    finished, with its time) and finally 'done' (the response status).
+    Progress is written at most every PROGRESS_INTERVAL seconds. It may be
+    opened before the ingest is sent; a reconnecting client's
+    Last-Event-ID resumes after the events it has."""
+    if not valid_request_id(request_id):
+        return jsonify({"error": "Invalid request_id."}), 400
+    last_event_id = request.headers.get("Last-Event-ID", "0")
+    last_event_id = int(last_event_id) if last_event_id.isdigit() else 0
+    return Response(
+        stream_with_context(follow_events(request_id, last_event_id)),
+        mimetype="text/event-stream",
+        # Proxies must pass each event on as it comes
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@bp.route("/api/upload", methods=["POST"])
+def upload_fasta():
+    """Upload a FASTA file as multipart form data (field 'file') or as the raw
+    request body; gzip, bz2 and xz files are decompressed on the fly.
+    Optional form or query fields: 'kmer_k', 'orf_top_k', 'time_budget_ms',
+    'request_id', 'interpret'.
+
+    The upload is spooled to a temporary file and parsed record by record,
+    so the genome is never held as one string. Returns the same body as
+    /api/ingest, with the same admission errors."""
+    if request.content_length and request.content_length > MAX_UPLOAD_BYTES:
+        # Only the query string is read before refusing the body
+        return rejected(
+            request.args.get("request_id"),
+            f"Upload exceeds {MAX_UPLOAD_BYTES} bytes.",
+            413,
+        )
+    fields = {**request.args, **request.form}
+    request_id = fields.get("request_id")
+    include_interpretation = fields.get("interpret", "").lower() in ("1", "true", "yes")
+    try:
+        kmer_k = int(fields.get("kmer_k", DEFAULT_KMER_K))
+    except ValueError:
+        return rejected(request_id, "'kmer_k' must be an integer.")
+    try:
+        orf_top_k = int(fields.get("orf_top_k", DEFAULT_ORF_TOP_K))
+    except ValueError:
+        return rejected(request_id, "'orf_top_k' must be an integer.")
+    try:
+        budget = fields.get("time_budget_ms")
+        budget = None if budget is None else float(budget)
+    except ValueError:
+        return rejected(request_id, "'time_budget_ms' must be a number.")
+    try:
+        params = analysis_params({"kmer_k": kmer_k, "orf_top_k": orf_top_k})
+        deadline = request_deadline({"time_budget_ms": budget})
+        cancel = request_cancel_token({"request_id": request_id})
+    except ValueError as e:
+        return rejected(request_id, str(e))
+    progress = request_progress(cancel)
+    return reported(
+        progress,
+        partial(
+            _upload_response, params, deadline, cancel, progress, include_interpretation
+        ),
+    )
+
 
+def _upload_response(
+    params: dict,
+    deadline: Deadline | None,
+    cancel: CancelToken | None,
+    progress: ProgressReporter | None,
+    include_interpretation: bool,
+):
+    try:
+        if "file" in request.files:
+            # Werkzeug already spools multipart files over 500 KB to disk
+            binary = request.files["file"].stream
+        elif request.mimetype in ("multipart/form-data", "application/x-www-form-urlencoded"):
+            return jsonify({"error": "Provide the FASTA file in the 'file' field."}), 400
+        else:
+            binary = spool_stream(request.stream)
+    except UploadTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+
+    try:
+        with binary:
+            dataset_id, cached_result, cached = analyse_fasta_file(
+                binary, params, deadline, cancel, progress
+            )
+        if not cached_result["sequences"]:
+            return jsonify({"error": "No FASTA records found in upload."}), 400
+        if cancel is not None:
+            cancel.raise_if_cancelled()
+        result = ingest_response(
+            dataset_id, cached_result, cached, include_interpretation, deadline
+        )
         return jsonify(result), 200
+    except Cancelled as e:
+        return jsonify({"error": str(e)}), CANCELLED_STATUS
+    except Overloaded as e:
+        return overloaded_response(e)
+    except UploadTooLarge as e:
+        return jsonify({"error": str(e)}), 413
+    except (ValueError, EOFError, OSError) as e:
+        # Not FASTA, or a truncated/corrupt compressed file
+        return jsonify({"error": f"Invalid FASTA upload: {e}"}), 400
     except Exception as e:
         return jsonify({"error": f"Failed to process FASTA: {e}"}), 500
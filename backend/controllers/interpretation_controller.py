@@ -0,0 +1,72 @@
+from flask import Blueprint, jsonify, request
+
+from controllers.ingest_controller import count_feature_types, latest_dataset_id
+from services.interpretation import (
+    BREAKER,
+    CACHE,
+    build_prompt,
+    job_response,
+    request_interpretation,
+)
+from services.jobs import DONE, FAILED, JOBS
+from services.result_cache import RESULT_CACHE
+
+
+bp = Blueprint("interpretation", __name__)
+
+
+@bp.route("/api/interpret", methods=["POST"])
+def interpret_dataset():
+    """Start (or reuse) the AI interpretation of an ingested dataset.
+    JSON body: dataset_id (default latest). Returns 200 with the
+    interpretation when cached, otherwise 202 with the job to poll."""
+    payload = request.get_json(silent=True) or {}
+    dataset_id = payload.get("dataset_id") or latest_dataset_id()
+    if dataset_id is None:
+        return jsonify({"message": "Data not yet loaded"}), 503
+    result = RESULT_CACHE.get(dataset_id)
+    if result is None:
+        return jsonify({"error": f"Unknown dataset_id '{dataset_id}'."}), 404
+
+    prompt = build_prompt(
+        result,
+        count_feature_types(result.get("features", [])),
+        RESULT_CACHE.get_artifacts(dataset_id) or {},
+    )
+    job = request_interpretation(prompt, dataset_id)
+    if job["status"] == FAILED:
+        return jsonify(job), 503
+    return jsonify(job), 200 if job["status"] == DONE else 202
+
+
+@bp.route("/api/interpretation/<job_id>", methods=["GET"])
+def get_interpretation(job_id):
+    """Status of an interpretation job; includes the text once done.
+    Also accepts the interpretation key, which any server process can answer
+    from the persistent cache (jobs are tracked per process)."""
+    job = JOBS.snapshot(job_id)
+    if job is None or job["kind"] != "interpretation":
+        cached = CACHE.get(job_id)
+        if cached is not None:
+            return jsonify(
+                {
+                    "job_id": None,
+                    "key": job_id,
+                    "status": DONE,
+                    "interpretation": cached["interpretation"],
+                }
+            )
+        return jsonify({"error": f"Unknown job '{job_id}'."}), 404
+    return jsonify({**job_response(job), "breaker": BREAKER.state})
+
+
+@bp.route("/api/interpretation/<job_id>/cancel", methods=["POST"])
+def cancel_interpretation(job_id):
+    """Cancel an interpretation job of this process. A queued job never calls
+    Gemini; a running call finishes in the background (its text is still
+    cached) but the job reports 'cancelled'. A later request for the same
+    prompt starts a new job."""
+    job = JOBS.snapshot(job_id)
+    if job is None or job["kind"] != "interpretation":
+        return jsonify({"error": f"Unknown job '{job_id}'."}), 404
+    return jsonify(job_response(JOBS.cancel(job_id))), 200
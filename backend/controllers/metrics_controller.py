@@ -0,0 +1,30 @@
+from flask import Blueprint, jsonify
+import os
+
+from services.admission import ADMISSION
+from services.result_cache import RESULT_CACHE
+from services.single_flight import INGEST_FLIGHTS
+from services.workers import ANALYSIS_WORKERS
+
+
+bp = Blueprint("metrics", __name__)
+
+
+@bp.route("/api/metrics", methods=["GET"])
+def get_metrics():
+    """Load metrics of the server process that answers: admission control
+    (memory reserved, analyses running, queue depth, rejections by reason),
+    coalesced ingests and the in-memory result cache. With several workers each reports its
+    own; `pid` says which one answered."""
+    return jsonify(
+        {
+            "pid": os.getpid(),
+            "analysis_workers": ANALYSIS_WORKERS,
+            "admission": ADMISSION.metrics(),
+            "single_flight": INGEST_FLIGHTS.metrics(),
+            "result_cache": {
+                "entries": len(RESULT_CACHE),
+                "max_entries": RESULT_CACHE.max_entries,
+            },
+        }
+    )
@@ -0,0 +1,80 @@
+from flask import Blueprint, jsonify, request
+import time
+from functools import partial
+
+from services.motif_index import (
+    find_motif,
+    get_motif_index,
+    normalise_motif,
+    reverse_complement_motif,
+)
+from services.result_cache import RESULT_CACHE
+
+
+bp = Blueprint("search", __name__)
+
+DEFAULT_HIT_LIMIT = 1000
+
+
+@bp.route("/api/search", methods=["GET"])
+def search_motif():
+    """Find a motif (IUPAC codes allowed) on both strands of every loaded sequence.
+
+    Query: motif (required), dataset_ids (comma-separated, default all loaded),
+    limit (hits returned, default 1000; total_hits is always exact). Each
+    sequence's suffix-array index is built on its first search, stored with
+    the dataset and reused.
+    Minus-strand hits give the forward-strand coordinates of the reverse
+    complement match; palindromic motifs are only reported on '+'."""
+    started = time.perf_counter()
+    try:
+        motif = normalise_motif(request.args.get("motif", ""))
+        limit = max(0, int(request.args.get("limit", DEFAULT_HIT_LIMIT)))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    dataset_ids = request.args.get("dataset_ids")
+    dataset_ids = set(dataset_ids.split(",")) if dataset_ids else None
+
+    reverse = reverse_complement_motif(motif)
+    strands = [("+", motif)] if reverse == motif else [("+", motif), ("-", reverse)]
+    hits = []
+    total_hits = 0
+    methods = set()
+    searched = 0
+    for dataset_id, _, artifacts in RESULT_CACHE.entries():
+        if dataset_ids is not None and dataset_id not in dataset_ids:
+            continue
+        for seq_id, seq_str in artifacts.get("sequences", {}).items():
+            index = get_motif_index(
+                artifacts, seq_id, partial(RESULT_CACHE.save_suffix_array, dataset_id)
+            )
+            searched += 1
+            for strand, pattern in strands:
+                starts, method = find_motif(index, seq_str, pattern)
+                methods.add(method)
+                total_hits += len(starts)
+                for start in starts[: max(0, limit - len(hits))].tolist():
+                    hits.append(
+                        {
+                            "dataset_id": dataset_id,
+                            "seq_id": seq_id,
+                            "start": start,
+                            "end": start + len(motif),
+                            "strand": strand,
+                            "match": seq_str[start : start + len(motif)],
+                        }
+                    )
+
+    return jsonify(
+        {
+            "motif": motif,
+            "reverse_complement": reverse,
+            "palindromic": reverse == motif,
+            "methods": sorted(methods),
+            "sequences_searched": searched,
+            "total_hits": total_hits,
+            "truncated": total_hits > len(hits),
+            "hits": hits,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+    )
@@ -0,0 +1,138 @@
+from flask import Blueprint, jsonify, request
+
+from controllers.ingest_controller import latest_dataset_id
+from services.result_cache import RESULT_CACHE
+from services.skew import select_level
+from services.viewport import MAX_VIEW_BASES, sequence_window
+
+
+bp = Blueprint("tracks", __name__)
+
+
+def resolve_track_request():
+    """Return (dataset_id, artifacts, seq_id, error_response) for a track query.
+    Defaults to the latest ingested dataset and its first sequence."""
+    dataset_id = request.args.get("dataset_id") or latest_dataset_id()
+    if dataset_id is None:
+        return None, None, None, (jsonify({"message": "Data not yet loaded"}), 503)
+    artifacts = RESULT_CACHE.get_artifacts(dataset_id)
+    if artifacts is None:
+        return None, None, None, (
+            jsonify({"error": f"Unknown dataset_id '{dataset_id}'."}),
+            404,
+        )
+    seq_id = request.args.get("seq_id")
+    if seq_id is None:
+        result = RESULT_CACHE.get(dataset_id)
+        sequences = result.get("sequences", []) if result else []
+        seq_id = sequences[0]["id"] if sequences else None
+    return dataset_id, artifacts, seq_id, None
+
+
+@bp.route("/api/skew_profile", methods=["GET"])
+def get_skew_profile():
+    """Windowed and cumulative GC/AT skew for one sequence.
+    Query: dataset_id (default latest), seq_id (default first), bins (default 1024).
+    Serves the coarsest stored resolution with at least `bins` bins."""
+    dataset_id, artifacts, seq_id, error = resolve_track_request()
+    if error:
+        return error
+    profile = artifacts.get("skew_profiles", {}).get(seq_id)
+    if profile is None:
+        return jsonify({"error": f"Unknown seq_id '{seq_id}'."}), 404
+
+    try:
+        bins = max(1, int(request.args.get("bins", 1024)))
+    except ValueError:
+        return jsonify({"error": "'bins' must be an integer."}), 400
+
+    return jsonify(
+        {
+            "dataset_id": dataset_id,
+            "seq_id": seq_id,
+            "length": profile["length"],
+            "origin": profile["origin"],
+            "terminus": profile["terminus"],
+            "available_bins": [level["bins"] for level in profile["levels"]],
+            "profile": select_level(profile, bins),
+        }
+    )
+
+
+@bp.route("/api/kmer_spectrum", methods=["GET"])
+def get_kmer_spectrum():
+    """k-mer counts for a dataset, computed over all records at ingest.
+    Query: dataset_id (default latest), top (number of k-mers, default 50).
+    Pick k at ingest with 'kmer_k'; k above 12 is approximate (count-min)."""
+    dataset_id, artifacts, _, error = resolve_track_request()
+    if error:
+        return error
+    spectrum = artifacts.get("kmer_spectrum")
+    if spectrum is None:
+        return jsonify({"error": "No k-mer spectrum stored for this dataset."}), 404
+    try:
+        top = max(0, int(request.args.get("top", 50)))
+    except ValueError:
+        return jsonify({"error": "'top' must be an integer."}), 400
+    return jsonify(
+        {"dataset_id": dataset_id, **spectrum, "top": spectrum["top"][:top]}
+    )
+
+
+@bp.route("/api/codon_usage", methods=["GET"])
+def get_codon_usage():
+    """Codon usage table over the ORFs detected in a dataset.
+    Query: dataset_id (default latest)."""
+    dataset_id, artifacts, _, error = resolve_track_request()
+    if error:
+        return error
+    codon_usage = artifacts.get("codon_usage")
+    if codon_usage is None:
+        return jsonify({"error": "No codon usage stored for this dataset."}), 404
+    return jsonify({"dataset_id": dataset_id, **codon_usage})
+
+
+@bp.route("/api/sequence_view", methods=["GET"])
+def get_sequence_view():
+    """Compact sequence data for one viewport instead of per-base records.
+    Query: dataset_id (default latest), seq_id (default first), start/end
+    (0-based, end-exclusive, default whole sequence), bins (default 1000),
+    encoding ('text' or '2bit'), strand ('+' or '-', the strand the bases
+    are read along). Bases are included only for windows of at most
+    MAX_VIEW_BASES; per-bin counts and ambiguity runs always are, in forward
+    coordinates."""
+    dataset_id, artifacts, seq_id, error = resolve_track_request()
+    if error:
+        return error
+    seq_str = artifacts.get("sequences", {}).get(seq_id)
+    composition = artifacts.get("composition", {}).get(seq_id)
+    if seq_str is None or composition is None:
+        return jsonify({"error": f"Unknown seq_id '{seq_id}'."}), 404
+
+    try:
+        start = int(request.args.get("start", 0))
+        end = int(request.args.get("end", len(seq_str)))
+        bins = max(1, int(request.args.get("bins", 1000)))
+    except ValueError:
+        return jsonify({"error": "'start', 'end' and 'bins' must be integers."}), 400
+    start = min(max(0, start), len(seq_str))
+    end = min(max(start, end), len(seq_str))
+    encoding = request.args.get("encoding", "text")
+    if encoding not in ("text", "2bit"):
+        return jsonify({"error": "'encoding' must be 'text' or '2bit'."}), 400
+    # An unescaped '+' in a query string arrives as a space
+    strand = request.args.get("strand", "+").strip() or "+"
+    if strand not in ("+", "-"):
+        return jsonify({"error": "'strand' must be '+' or '-'."}), 400
+
+    return jsonify(
+        {
+            "dataset_id": dataset_id,
+            "seq_id": seq_id,
+            "length": len(seq_str),
+            "max_bases": MAX_VIEW_BASES,
+            **sequence_window(
+                seq_str, composition, start, end, bins, encoding, strand
+            ),
+        }
+    )
@@ -0,0 +1,28 @@
+"""Gunicorn settings for production serving: gunicorn -c gunicorn.conf.py wsgi:app
+
+Every setting can be overridden with the environment variable named next to it.
+Workers share ingested datasets through the on-disk dataset store
+(DATASET_DIR), so any worker can answer for a genome another one analysed."""
+import multiprocessing
+import os
+
+bind = os.getenv("BIND", "0.0.0.0:8000")
+# Analysis is CPU-bound, so one worker process per core by default
+workers = int(os.getenv("WEB_CONCURRENCY", "0")) or multiprocessing.cpu_count()
+# Split the cores between workers' batch analysis pools instead of giving
+# every worker a pool as large as the machine
+os.environ.setdefault("ANALYSIS_WORKERS", str(max(1, multiprocessing.cpu_count() // workers)))
+# Threads let a worker answer polls and track requests while another request
+# in the same worker is busy analysing a genome.
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "4"))
+# Large genomes can take minutes to analyse
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "300"))
+graceful_timeout = 30
+keepalive = 5
+# Import the app once in the master and fork workers from it
+preload_app = True
+# Recycle workers now and then so memory fragmentation cannot build up
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = 100
+accesslog = "-"
@@ -0,0 +1,223 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+from services.workers import ANALYSIS_WORKERS
+
+
+# Memory this server process may commit to analyses in flight, and how many
+# may run at once; requests past either limit wait in a bounded FIFO queue.
+ADMISSION_MEMORY_BUDGET = int(os.getenv("ADMISSION_MEMORY_MB", "2048")) * 1024**2
+ADMISSION_MAX_ANALYSES = int(os.getenv("ADMISSION_MAX_ANALYSES", "0")) or ANALYSIS_WORKERS
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "16"))
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv("ADMISSION_QUEUE_TIMEOUT", "60"))
+# Peak memory of an analysis per byte of uncompressed FASTA (about 24 traced
+# for a 3.8 Mb genome): the text, the record string and its upper-case and
+# reverse-complement copies, Biopython's record, the per-chunk k-mer arrays
+# and the stored artifacts.
+BYTES_PER_INPUT_BYTE = float(os.getenv("ADMISSION_BYTES_PER_INPUT_BYTE", "24"))
+
+
+class Overloaded(Exception):
+    """An analysis was not admitted: 413 when it can never fit the budget,
+    503 (retry later) when the queue is full or the wait timed out."""
+
+    def __init__(self, message: str, status: int = 503, retry_after: int | None = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def _wake(wakeup: asyncio.Future) -> None:
+    if not wakeup.done():
+        wakeup.set_result(None)
+
+
+def estimate_cost(input_bytes: int) -> int:
+    """Estimated peak memory (bytes) of analysing `input_bytes` of FASTA."""
+    return int(max(0, input_bytes) * BYTES_PER_INPUT_BYTE)
+
+
+class AdmissionController:
+    """Admits memory-heavy analyses against a RAM budget and a concurrency cap.
+
+    Each analysis reserves its estimated cost until it is released. Requests
+    that do not fit wait in arrival order, so a large genome is not starved
+    by a stream of small ones; past `max_queue` waiters or `timeout` seconds
+    they are rejected instead, and a request costing more than the whole
+    budget is rejected at once."""
+
+    def __init__(
+        self,
+        budget: int = ADMISSION_MEMORY_BUDGET,
+        max_active: int = ADMISSION_MAX_ANALYSES,
+        max_queue: int = ADMISSION_MAX_QUEUE,
+        timeout: float = ADMISSION_QUEUE_TIMEOUT,
+    ):
+        self.budget = budget
+        self.max_active = max(1, max_active)
+        self.max_queue = max(0, max_queue)
+        self.timeout = timeout
+        self._waiting = deque()
+        self._active = 0
+        self._reserved = 0
+        self._admitted = 0
+        self._rejected = {"too_large": 0, "queue_full": 0, "timeout": 0}
+        self._peak_queue = 0
+        self._peak_reserved = 0
+        self._wait_seconds = 0.0
+        self._condition = threading.Condition()
+        # (event loop, future) of each `acquire_async` waiting for a release
+        self._wakeups = []
+
+    def _fits(self, cost: int) -> bool:
+        return self._active < self.max_active and self._reserved + cost <= self.budget
+
+    def _grant(self, cost: int) -> None:
+        self._active += 1
+        self._reserved += cost
+        self._admitted += 1
+        self._peak_reserved = max(self._peak_reserved, self._reserved)
+
+    def check(self, cost: int) -> None:
+        """Raise Overloaded (413) if `cost` can never be admitted."""
+        if cost > self.budget:
+            with self._condition:
+                self._rejected["too_large"] += 1
+            raise Overloaded(
+                f"Estimated memory ({cost // 1024**2} MB) exceeds this server's "
+                f"analysis budget ({self.budget // 1024**2} MB).",
+                status=413,
+            )
+
+    def try_acquire(self, cost: int) -> bool:
+        """Reserve `cost` if it fits now and nobody is waiting, without blocking."""
+        with self._condition:
+            self.check(cost)
+            if self._waiting or not self._fits(cost):
+                return False
+            self._grant(cost)
+            return True
+
+    def _enqueue(self, cost: int):
+        """Under the lock: reserve `cost` and return None if it fits now and
+        nobody is waiting, else join the queue and return the ticket."""
+        self.check(cost)
+        if not self._waiting and self._fits(cost):
+            self._grant(cost)
+            return None
+        if len(self._waiting) >= self.max_queue:
+            self._rejected["queue_full"] += 1
+            raise Overloaded("Server is busy; too many analyses queued.", retry_after=5)
+        ticket = object()
+        self._waiting.append(ticket)
+        self._peak_queue = max(self._peak_queue, len(self._waiting))
+        return ticket
+
+    def _remaining(self, started: float) -> float:
+        """Under the lock: seconds a waiter that queued at `started` may
+        still wait; raises Overloaded once there are none."""
+        remaining = started + self.timeout - time.monotonic()
+        if remaining <= 0:
+            self._rejected["timeout"] += 1
+            raise Overloaded(
+                "Server is busy; timed out waiting for analysis capacity.",
+                retry_after=int(self.timeout),
+            )
+        return remaining
+
+    def _dequeue(self, ticket, started: float) -> None:
+        self._waiting.remove(ticket)
+        self._wait_seconds += time.monotonic() - started
+        self._notify()
+
+    def _notify(self) -> None:
+        """Under the lock: wake every waiter to check whether it fits."""
+        self._condition.notify_all()
+        for loop, wakeup in self._wakeups:
+            try:
+                loop.call_soon_threadsafe(_wake, wakeup)
+            except RuntimeError:
+                # Its event loop is closed
+                pass
+        self._wakeups.clear()
+
+    def acquire(self, cost: int) -> None:
+        """Reserve `cost`, waiting in line for capacity; raises Overloaded."""
+        with self._condition:
+            ticket = self._enqueue(cost)
+            if ticket is None:
+                return
+            started = time.monotonic()
+            try:
+                while not (self._waiting[0] is ticket and self._fits(cost)):
+                    self._condition.wait(self._remaining(started))
+                self._grant(cost)
+            finally:
+                self._dequeue(ticket, started)
+
+    async def acquire_async(self, cost: int) -> None:
+        """`acquire` for the event loop. It waits without holding a thread,
+        and a wait cancelled (e.g. by a client disconnecting) leaves its
+        place in the queue with nothing reserved."""
+        loop = asyncio.get_running_loop()
+        with self._condition:
+            ticket = self._enqueue(cost)
+            if ticket is None:
+                return
+            started = time.monotonic()
+        try:
+            while True:
+                with self._condition:
+                    if self._waiting[0] is ticket and self._fits(cost):
+                        # Granted with no await after it, so a cancellation
+                        # cannot come between the grant and the caller
+                        self._grant(cost)
+                        return
+                    remaining = self._remaining(started)
+                    wakeup = loop.create_future()
+                    self._wakeups.append((loop, wakeup))
+                try:
+                    await asyncio.wait_for(wakeup, remaining)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            with self._condition:
+                self._dequeue(ticket, started)
+
+    def release(self, cost: int) -> None:
+        with self._condition:
+            self._active -= 1
+            self._reserved -= cost
+            self._notify()
+
+    @contextmanager
+    def admit(self, cost: int):
+        self.acquire(cost)
+        try:
+            yield
+        finally:
+            self.release(cost)
+
+    def metrics(self) -> dict:
+        with self._condition:
+            return {
+                "memory_budget_bytes": self.budget,
+                "memory_reserved_bytes": self._reserved,
+                "peak_memory_reserved_bytes": self._peak_reserved,
+                "max_active": self.max_active,
+                "active": self._active,
+                "queue_depth": len(self._waiting),
+                "peak_queue_depth": self._peak_queue,
+                "max_queue": self.max_queue,
+                "admitted": self._admitted,
+                "rejected": dict(self._rejected),
+                "rejected_total": sum(self._rejected.values()),
+                "total_wait_seconds": round(self._wait_seconds, 3),
+            }
+
+
+ADMISSION = AdmissionController()
@@ -0,0 +1,69 @@
+import re
+import time
+import uuid
+from pathlib import Path
+
+from services.dataset_store import DATASET_DIR
+
+
+# Flag files older than this are deleted, every PRUNE_INTERVAL cancellations.
+# Only a request still running after that long could miss its cancellation.
+CANCEL_FLAG_TTL = 3600
+PRUNE_INTERVAL = 64
+# Longest a cancelled wait on another process (e.g. a pooled chunk scan)
+# blocks before it notices
+CANCEL_POLL_INTERVAL = 0.05
+
+_REQUEST_ID = re.compile(r"[A-Za-z0-9_-]{1,64}")
+_cancellations = 0
+
+
+class Cancelled(Exception):
+    """The request an analysis was running for was cancelled."""
+
+
+def valid_request_id(request_id) -> bool:
+    return isinstance(request_id, str) and _REQUEST_ID.fullmatch(request_id) is not None
+
+
+class CancelToken:
+    """Cancellation flag of one request, visible to every process.
+
+    Cancelling creates a flag file named after the request id in
+    `flag_dir`, so a cancel request answered by any server worker reaches
+    the analysis, and pool workers holding a pickled copy of the token see
+    it too. Once seen, the flag is remembered without touching the disk
+    again. Flags are left for the workers still to notice them and pruned
+    once stale, so a request id must not be reused."""
+
+    def __init__(self, request_id: str | None = None, flag_dir: Path | None = None):
+        self.request_id = request_id or uuid.uuid4().hex
+        self._path = Path(flag_dir or DATASET_DIR / ".cancelled") / self.request_id
+        self._cancelled = False
+
+    def cancel(self) -> None:
+        global _cancellations
+        self._cancelled = True
+        self._path.parent.mkdir(parents=True, exist_ok=True)
+        self._path.touch()
+        _cancellations += 1
+        if _cancellations % PRUNE_INTERVAL == 0:
+            self._prune()
+
+    def cancelled(self) -> bool:
+        if not self._cancelled and self._path.exists():
+            self._cancelled = True
+        return self._cancelled
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled():
+            raise Cancelled(f"Request '{self.request_id}' was cancelled.")
+
+    def _prune(self) -> None:
+        cutoff = time.time() - CANCEL_FLAG_TTL
+        try:
+            for path in self._path.parent.iterdir():
+                if path.stat().st_mtime < cutoff:
+                    path.unlink(missing_ok=True)
+        except OSError:
+            pass
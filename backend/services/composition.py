@@ -0,0 +1,98 @@
+import numpy as np
+
+
+# Base codes used by every vectorised track: A, C, G, T, then anything else
+# (N and IUPAC ambiguity codes).
+BASE_CODES = "ACGT"
+OTHER_CODE = 4
+NUM_CODES = 5
+
+_CODE_TABLE = np.full(256, OTHER_CODE, dtype=np.uint8)
+for _code, _base in enumerate(BASE_CODES):
+    _CODE_TABLE[ord(_base)] = _code
+    _CODE_TABLE[ord(_base.lower())] = _code
+
+# Prefix sums are kept per block rather than per base so a 10 Mb chromosome
+# needs a few MB instead of hundreds.
+MAX_BLOCKS = 65536
+CHUNK_SIZE = 1 << 20
+# Chunks fed to k-mer counters and sketches on their own pass: small enough to
+# stay in cache (about twice as fast as CHUNK_SIZE) and to check a deadline
+# every few milliseconds
+FEED_CHUNK_SIZE = 1 << 16
+
+
+def encode_sequence(seq_str: str) -> np.ndarray:
+    """Map a sequence to uint8 base codes (A=0, C=1, G=2, T=3, other=4)."""
+    raw = np.frombuffer(seq_str.encode("ascii", "replace"), dtype=np.uint8)
+    return _CODE_TABLE[raw]
+
+
+def block_size_for(seq_len: int) -> int:
+    return max(1, -(-seq_len // MAX_BLOCKS))
+
+
+def scan_composition(seq_str: str, block_size: int, consumers=()) -> np.ndarray:
+    """Single chunked pass over a sequence returning block-level prefix sums.
+
+    Row i holds the counts of each code in seq_str[: i * block_size] (the last
+    row covers the whole sequence), so any block-aligned window is two row
+    lookups. Each encoded chunk is also passed to every consumer's `update`
+    (e.g. k-mer counters) so they share the pass; only one chunk is ever
+    encoded at a time."""
+    seq_len = len(seq_str)
+    num_blocks = -(-seq_len // block_size)
+    counts = np.zeros((num_blocks, NUM_CODES), dtype=np.int64)
+    chunk = max(block_size, CHUNK_SIZE // block_size * block_size)
+    for start in range(0, seq_len, chunk):
+        sub = encode_sequence(seq_str[start : start + chunk])
+        for consumer in consumers:
+            consumer.update(sub)
+        first_block = start // block_size
+        block_idx = np.arange(len(sub)) // block_size
+        flat = np.bincount(block_idx * NUM_CODES + sub)
+        flat = np.pad(flat, (0, -len(flat) % NUM_CODES))
+        sub_counts = flat.reshape(-1, NUM_CODES)
+        counts[first_block : first_block + len(sub_counts)] += sub_counts
+    prefix = np.zeros((num_blocks + 1, NUM_CODES), dtype=np.int64)
+    np.cumsum(counts, axis=0, out=prefix[1:])
+    return prefix
+
+
+def feed_consumers(
+    seq_str: str, consumers, deadline=None, chunk_size: int = FEED_CHUNK_SIZE
+) -> bool:
+    """Pass each encoded chunk of a sequence, in order, to every consumer's
+    `update`, as `scan_composition` does, stopping early once `deadline`
+    passes. Returns whether the whole sequence was passed."""
+    for start in range(0, len(seq_str), chunk_size):
+        if deadline is not None and deadline.expired():
+            return False
+        sub = encode_sequence(seq_str[start : start + chunk_size])
+        for consumer in consumers:
+            consumer.update(sub)
+    return True
+
+
+def block_positions(seq_len: int, block_size: int) -> np.ndarray:
+    """Sequence coordinate of each prefix-sum row."""
+    positions = np.arange(0, seq_len + block_size, block_size, dtype=np.int64)
+    positions = positions[: -(-seq_len // block_size) + 1]
+    positions[-1] = seq_len
+    return positions
+
+
+def pack_codes(codes: np.ndarray) -> np.ndarray:
+    """Pack base codes four per byte (A=0, C=1, G=2, T=3, first base in the
+    high bits). Other bases pack as A, so their positions must be kept apart."""
+    codes = np.where(codes > 3, 0, codes).astype(np.uint8)
+    codes = np.pad(codes, (0, -len(codes) % 4))
+    quads = codes.reshape(-1, 4)
+    return (quads[:, 0] << 6) | (quads[:, 1] << 4) | (quads[:, 2] << 2) | quads[:, 3]
+
+
+def unpack_codes(packed: np.ndarray, length: int) -> np.ndarray:
+    """Inverse of `pack_codes` for the first `length` bases."""
+    shifts = np.array([6, 4, 2, 0], dtype=np.uint8)
+    codes = (np.asarray(packed, dtype=np.uint8)[:, None] >> shifts) & np.uint8(3)
+    return codes.reshape(-1)[:length]
@@ -0,0 +1,533 @@
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from collections.abc import Mapping
+from pathlib import Path
+
+import numpy as np
+
+from services.composition import encode_sequence, pack_codes, unpack_codes
+from services.summary_table import summary_row
+
+
+# Processed datasets on disk, shared by every server process (e.g. gunicorn
+# workers). The oldest are removed once more than DATASET_STORE_SIZE are kept.
+DATASET_DIR = Path(
+    os.getenv(
+        "DATASET_DIR", Path(__file__).resolve().parent.parent / "data" / "datasets"
+    )
+)
+DATASET_STORE_SIZE = int(os.getenv("DATASET_STORE_SIZE", "1000"))
+
+FORMAT_VERSION = 2
+# Dataset ids are result cache keys (see services/result_cache.py)
+_KEY = re.compile(r"[0-9a-f]{32}")
+_BASE_LETTERS = np.frombuffer(b"ACGT", dtype=np.uint8)
+
+
+def valid_key(key) -> bool:
+    return isinstance(key, str) and _KEY.fullmatch(key) is not None
+
+
+def _temp_name(name: str) -> str:
+    return f".{name}.{os.getpid()}.{threading.get_ident()}.tmp"
+
+
+def _save_array(path: Path, array) -> None:
+    np.save(path, np.asarray(array), allow_pickle=False)
+
+
+def _load_array(path: Path) -> np.ndarray:
+    return np.load(path, mmap_mode="r", allow_pickle=False)
+
+
+def _write_json(path: Path, value) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(value, f)
+
+
+def _read_json(path: Path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _code_points(seq_str: str) -> np.ndarray:
+    if seq_str.isascii():
+        return np.frombuffer(seq_str.encode("ascii"), dtype=np.uint8)
+    return np.frombuffer(seq_str.encode("utf-32-le"), dtype=np.uint32)
+
+
+def pack_sequence(seq_str: str) -> tuple:
+    """(packed, exceptions): the sequence 2 bits per base plus every run of
+    one repeated non-ACGT character as a [start, length, code point] row."""
+    codes = encode_sequence(seq_str)
+    other = np.flatnonzero(codes > 3)
+    if len(other):
+        points = _code_points(seq_str)[other]
+        continues = np.r_[False, (np.diff(other) == 1) & (points[1:] == points[:-1])]
+        run_ids = np.cumsum(~continues) - 1
+        exceptions = np.column_stack(
+            [other[~continues], np.bincount(run_ids), points[~continues]]
+        ).astype(np.int64)
+    else:
+        exceptions = np.empty((0, 3), dtype=np.int64)
+    return pack_codes(codes), exceptions
+
+
+def unpack_sequence(packed: np.ndarray, exceptions: np.ndarray, length: int) -> str:
+    """Inverse of `pack_sequence`."""
+    letters = _BASE_LETTERS[unpack_codes(packed, length)]
+    if not len(exceptions):
+        return letters.tobytes().decode("ascii")
+    starts, lengths, points = (np.asarray(column) for column in exceptions.T)
+    if points.max() > 127:
+        letters = letters.astype(np.uint32)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    letters[np.repeat(starts, lengths) + offsets] = np.repeat(points, lengths)
+    if letters.dtype == np.uint8:
+        return letters.tobytes().decode("ascii")
+    return letters.tobytes().decode("utf-32-le")
+
+
+def _column_kind(values: list) -> str:
+    for kind, value_type in (("int", int), ("float", float), ("str", str)):
+        if all(type(value) is value_type for value in values):
+            return kind
+    return "json"
+
+
+def write_table(directory: Path, records: list) -> None:
+    """Store a list of flat dicts column by column: one .npy per int, float
+    or string column, so columns can be memory-mapped and read on their own,
+    plus columns.json with the column order and rows missing each key."""
+    directory.mkdir()
+    names = list(dict.fromkeys(name for record in records for name in record))
+    columns = []
+    for name in names:
+        missing = [row for row, record in enumerate(records) if name not in record]
+        kind = _column_kind([record[name] for record in records if name in record])
+        column = {"name": name, "kind": kind, "missing": missing}
+        if kind == "json":
+            column["values"] = [record.get(name) for record in records]
+        else:
+            fill = {"int": 0, "float": 0.0, "str": ""}[kind]
+            _save_array(
+                directory / f"{len(columns)}.npy",
+                [record.get(name, fill) for record in records],
+            )
+        columns.append(column)
+    _write_json(directory / "columns.json", {"rows": len(records), "columns": columns})
+
+
+def read_table(directory: Path) -> list:
+    """Records written by `write_table`."""
+    layout = _read_json(directory / "columns.json")
+    records = [{} for _ in range(layout["rows"])]
+    for index, column in enumerate(layout["columns"]):
+        if column["kind"] == "json":
+            values = column["values"]
+        else:
+            values = _load_array(directory / f"{index}.npy").tolist()
+        missing = set(column["missing"])
+        for row, value in enumerate(values):
+            if row not in missing:
+                records[row][column["name"]] = value
+    return records
+
+
+class StoredSequences(Mapping):
+    """Sequences of a stored dataset, unpacked from their memory-mapped
+    2-bit files on first access and then kept as strings."""
+
+    def __init__(self, directory: Path, sequences: list):
+        self._files = {
+            entry["id"]: (directory / entry["file"], entry["length"]) for entry in sequences
+        }
+        self._unpacked = {}
+
+    def __getitem__(self, seq_id: str) -> str:
+        seq_str = self._unpacked.get(seq_id)
+        if seq_str is None:
+            stem, length = self._files[seq_id]
+            seq_str = unpack_sequence(
+                _load_array(stem.with_suffix(".2bit.npy")),
+                _load_array(stem.with_suffix(".exceptions.npy")),
+                length,
+            )
+            self._unpacked[seq_id] = seq_str
+        return seq_str
+
+    def __iter__(self):
+        return iter(self._files)
+
+    def __len__(self) -> int:
+        return len(self._files)
+
+
+class DatasetStore:
+    """One directory per dataset id, in a columnar format loaded by mmap.
+
+    Each dataset directory holds:
+
+    - manifest.json: format version, creation time, catalog summary and the
+      sequences with the file stem of their per-sequence arrays
+    - summary.json: the analysis result without its features
+    - features/: the feature table, one column per file (see `write_table`)
+    - tracks.json: skew profiles (the multi-resolution window pyramid),
+      k-mer spectrum and codon usage
+    - seqN.2bit.npy and seqN.exceptions.npy: the packed sequence
+    - seqN.prefix.npy: block prefix sums of base composition, from which
+      any bin of any zoom level is two row lookups
+    - seqN.hashes.npy and seqN.signature.npy: the FracMinHash sketch
+    - seqN.sa.npy: the suffix array, once a motif search has built it
+    - responses/: serialised (and compressed) response bodies, written the
+      first time each is asked for
+
+    Next to the datasets, .records/ maps the key of each stored record (its
+    sequence and detector parameters) to the dataset and sequence id it was
+    stored under, so an identical record in a later analysis reuses its
+    features.
+
+    Arrays are memory-mapped on load and sequences unpacked on first use,
+    so loading a dataset reads little more than its JSON. Datasets are
+    written to a temporary directory and renamed into place, so readers in
+    other processes only ever see complete datasets."""
+
+    def __init__(self, directory: Path = DATASET_DIR, max_datasets: int = DATASET_STORE_SIZE):
+        self.directory = Path(directory)
+        self.max_datasets = max(1, max_datasets)
+        # Creation time of each dataset whose manifest has been read; it
+        # never changes, and `keys` would otherwise reread every manifest
+        self._created = {}
+
+    def _path(self, key: str) -> Path:
+        # Ids come from clients: anything else could name a path outside
+        # the store (e.g. '../x')
+        if not valid_key(key):
+            raise KeyError(f"Invalid dataset id {key!r}.")
+        return self.directory / key
+
+    def save(self, key: str, result: dict, artifacts: dict | None = None) -> None:
+        if key in self:
+            return
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.directory / _temp_name(key)
+        tmp.mkdir()
+        try:
+            self._write(tmp, key, result, artifacts or {})
+            os.replace(tmp, self._path(key))
+        except OSError:
+            # Another process stored the same dataset first
+            if key not in self:
+                raise
+        finally:
+            shutil.rmtree(tmp, ignore_errors=True)
+        self._index_records(key, (artifacts or {}).get("record_keys", {}))
+        self._prune()
+
+    def _index_records(self, key: str, record_keys: dict) -> None:
+        directory = self.directory / ".records"
+        try:
+            directory.mkdir(exist_ok=True)
+            for seq_id, record_key in record_keys.items():
+                tmp = directory / _temp_name(record_key)
+                _write_json(tmp, [key, seq_id])
+                os.replace(tmp, directory / record_key)
+        except OSError:
+            pass
+
+    def record_source(self, record_key: str) -> tuple | None:
+        """(dataset id, sequence id) of a stored record with this key, or
+        None."""
+        try:
+            key, seq_id = _read_json(self.directory / ".records" / record_key)
+        except (OSError, ValueError):
+            return None
+        return (key, seq_id) if key in self else None
+
+    def _write(self, path: Path, key: str, result: dict, artifacts: dict) -> None:
+        sequences = artifacts.get("sequences", {})
+        composition = artifacts.get("composition", {})
+        sketches = artifacts.get("sketches", {})
+        entries = []
+        for index, (seq_id, seq_str) in enumerate(sequences.items()):
+            stem = f"seq{index}"
+            entry = {"id": seq_id, "file": stem, "length": len(seq_str)}
+            if seq_id in artifacts.get("record_keys", {}):
+                entry["record_key"] = artifacts["record_keys"][seq_id]
+            packed, exceptions = pack_sequence(seq_str)
+            _save_array(path / f"{stem}.2bit.npy", packed)
+            _save_array(path / f"{stem}.exceptions.npy", exceptions)
+            if seq_id in composition:
+                entry["block_size"] = composition[seq_id]["block_size"]
+                _save_array(path / f"{stem}.prefix.npy", composition[seq_id]["prefix"])
+            if seq_id in sketches:
+                sketch = sketches[seq_id]
+                entry["sketch"] = {"k": sketch["k"], "scaled": sketch["scaled"]}
+                _save_array(path / f"{stem}.hashes.npy", sketch["hashes"])
+                _save_array(path / f"{stem}.signature.npy", sketch["signature"])
+            entries.append(entry)
+
+        write_table(path / "features", result.get("features", []))
+        _write_json(
+            path / "summary.json",
+            {name: value for name, value in result.items() if name != "features"},
+        )
+        _write_json(
+            path / "tracks.json",
+            {
+                name: artifacts[name]
+                for name in ("skew_profiles", "kmer_spectrum", "codon_usage")
+                if name in artifacts
+            },
+        )
+        summary = result.get("summary", {})
+        created_at = time.time()
+        _write_json(
+            path / "manifest.json",
+            {
+                "format": FORMAT_VERSION,
+                "dataset_id": key,
+                "created_at": created_at,
+                "sequences": entries,
+                "summary_row": summary_row(key, result, artifacts, created_at),
+                "catalog": {
+                    "total_sequences": summary.get("total_sequences", len(entries)),
+                    "total_bases": summary.get("total_bases", 0),
+                    "overall_gc_content": summary.get("overall_gc_content"),
+                    "features": len(result.get("features", [])),
+                    "sequences": [
+                        {
+                            "id": info.get("id"),
+                            "description": info.get("description"),
+                            "length": info.get("length"),
+                        }
+                        for info in result.get("sequences", [])
+                    ],
+                },
+            },
+        )
+
+    def load(self, key: str) -> tuple | None:
+        """(result, artifacts) for a stored dataset, or None."""
+        if not valid_key(key):
+            return None
+        path = self._path(key)
+        try:
+            manifest = _read_json(path / "manifest.json")
+        except (OSError, ValueError):
+            return None
+        if manifest.get("format") != FORMAT_VERSION:
+            return None
+        try:
+            result = _read_json(path / "summary.json")
+            result["features"] = read_table(path / "features")
+            artifacts = _read_json(path / "tracks.json")
+            artifacts["sequences"] = StoredSequences(path, manifest["sequences"])
+            composition = artifacts["composition"] = {}
+            sketches = artifacts["sketches"] = {}
+            suffix_arrays = artifacts["suffix_arrays"] = {}
+            for entry in manifest["sequences"]:
+                seq_id, stem = entry["id"], path / entry["file"]
+                if "block_size" in entry:
+                    composition[seq_id] = {
+                        "block_size": entry["block_size"],
+                        "prefix": _load_array(stem.with_suffix(".prefix.npy")),
+                    }
+                if "sketch" in entry:
+                    sketches[seq_id] = {
+                        **entry["sketch"],
+                        "hashes": _load_array(stem.with_suffix(".hashes.npy")),
+                        "signature": _load_array(stem.with_suffix(".signature.npy")),
+                    }
+                if stem.with_suffix(".sa.npy").is_file():
+                    suffix_arrays[seq_id] = _load_array(stem.with_suffix(".sa.npy"))
+        except (OSError, ValueError, KeyError):
+            return None
+        return result, artifacts
+
+    def sketches(self, key: str) -> list:
+        """(sequence id, length, sketch) of each sketched sequence of a
+        stored dataset, read from its manifest and memory-mapped sketch
+        arrays without loading the rest of it."""
+        if not valid_key(key):
+            return []
+        path = self._path(key)
+        try:
+            manifest = _read_json(path / "manifest.json")
+        except (OSError, ValueError):
+            return []
+        if manifest.get("format") != FORMAT_VERSION:
+            return []
+        sketches = []
+        try:
+            for entry in manifest["sequences"]:
+                if "sketch" not in entry:
+                    continue
+                stem = path / entry["file"]
+                sketch = {
+                    **entry["sketch"],
+                    "hashes": _load_array(stem.with_suffix(".hashes.npy")),
+                    "signature": _load_array(stem.with_suffix(".signature.npy")),
+                }
+                sketches.append((entry["id"], entry["length"], sketch))
+        except (OSError, ValueError, KeyError):
+            # Pruned by another process meanwhile
+            return []
+        return sketches
+
+    def save_suffix_array(self, key: str, seq_id: str, suffix_array: np.ndarray) -> None:
+        """Add a motif search index to a stored dataset, if it is still kept."""
+        if not valid_key(key):
+            return
+        path = self._path(key)
+        try:
+            manifest = _read_json(path / "manifest.json")
+        except (OSError, ValueError):
+            return
+        for entry in manifest.get("sequences", []):
+            if entry["id"] == seq_id:
+                target = path / f"{entry['file']}.sa.npy"
+                tmp = path / _temp_name(target.name)
+                try:
+                    with open(tmp, "wb") as f:
+                        np.save(f, suffix_array, allow_pickle=False)
+                    os.replace(tmp, target)
+                except OSError:
+                    tmp.unlink(missing_ok=True)
+                return
+
+    def response_body(self, key: str, name: str) -> bytes | None:
+        """A response body kept for a dataset by `save_response_body`."""
+        if not valid_key(key):
+            return None
+        try:
+            return (self._path(key) / "responses" / name).read_bytes()
+        except OSError:
+            return None
+
+    def save_response_body(self, key: str, name: str, data: bytes) -> None:
+        """Keep a serialised response body with a stored dataset, so later
+        requests in any process send it as is."""
+        if key not in self:
+            return
+        directory = self._path(key) / "responses"
+        try:
+            directory.mkdir(exist_ok=True)
+            tmp = directory / _temp_name(name)
+            tmp.write_bytes(data)
+            os.replace(tmp, directory / name)
+        except OSError:
+            # The dataset was pruned meanwhile
+            pass
+
+    def summary_row(self, key: str) -> dict | None:
+        """The comparison row written into a dataset's manifest at ingest."""
+        if not valid_key(key):
+            return None
+        try:
+            return _read_json(self._path(key) / "manifest.json").get("summary_row")
+        except (OSError, ValueError):
+            return None
+
+    def created_at(self, key: str) -> float:
+        if not valid_key(key):
+            return 0.0
+        if key in self._created:
+            return self._created[key]
+        try:
+            created_at = _read_json(self._path(key) / "manifest.json")["created_at"]
+        except (OSError, ValueError, KeyError):
+            pass
+        else:
+            self._created[key] = created_at
+            return created_at
+        try:
+            return self._path(key).stat().st_mtime
+        except OSError:
+            return 0.0
+
+    def catalog(self) -> list:
+        """Catalog entry of every stored dataset, newest first, read from
+        the manifests alone."""
+        entries = []
+        for key in reversed(self.keys()):
+            try:
+                manifest = _read_json(self._path(key) / "manifest.json")
+            except (OSError, ValueError):
+                continue
+            entries.append(
+                {
+                    "dataset_id": key,
+                    "created_at": manifest.get("created_at"),
+                    "motif_indexed": sum(
+                        (self._path(key) / f"{entry['file']}.sa.npy").is_file()
+                        for entry in manifest.get("sequences", [])
+                    ),
+                    **manifest.get("catalog", {}),
+                }
+            )
+        return entries
+
+    def keys(self) -> list:
+        """Stored dataset ids, oldest first by `created_at`. Directory
+        mtimes change as indexes and response bodies are added, so they
+        only order directories without a readable manifest."""
+        try:
+            # scandir knows which entries are directories without a stat each
+            with os.scandir(self.directory) as entries:
+                keys = [
+                    entry.name
+                    for entry in entries
+                    if valid_key(entry.name) and entry.is_dir()
+                ]
+        except OSError:
+            return []
+        created = {key: self.created_at(key) for key in keys}
+        return sorted(created, key=created.get)
+
+    def __contains__(self, key: str) -> bool:
+        if not valid_key(key):
+            return False
+        path = self._path(key)
+        return (path / "manifest.json").is_file()
+
+    def set_latest(self, key: str) -> None:
+        """Record the most recently ingested dataset for all processes."""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        tmp = self.directory / _temp_name("LATEST")
+        tmp.write_text(key, encoding="utf-8")
+        os.replace(tmp, self.directory / "LATEST")
+
+    def latest(self) -> str | None:
+        try:
+            key = (self.directory / "LATEST").read_text(encoding="utf-8").strip()
+        except OSError:
+            return None
+        return key if key in self else None
+
+    def _prune(self) -> None:
+        keys = self.keys()
+        latest = self.latest()
+        for key in keys[: max(0, len(keys) - self.max_datasets)]:
+            if key != latest:
+                self._unindex_records(key)
+                shutil.rmtree(self._path(key), ignore_errors=True)
+                self._created.pop(key, None)
+
+    def _unindex_records(self, key: str) -> None:
+        try:
+            manifest = _read_json(self._path(key) / "manifest.json")
+        except (OSError, ValueError):
+            return
+        for entry in manifest.get("sequences", []):
+            record_key = entry.get("record_key")
+            # Unless a later dataset has indexed the record since
+            if record_key and self.record_source(record_key) in (
+                None,
+                (key, entry["id"]),
+            ):
+                (self.directory / ".records" / record_key).unlink(missing_ok=True)
@@ -0,0 +1,55 @@
+import copy
+import time
+
+from services.cancellation import CANCEL_POLL_INTERVAL, CancelToken
+
+
+# Largest time budget a client may give an anytime analysis
+MAX_TIME_BUDGET_MS = 600_000
+
+
+class Deadline:
+    """Wall-clock budget of an anytime analysis, running from creation.
+
+    Without `seconds` it never expires. It uses the monotonic clock, which is
+    shared by every process on the machine, so it can be pickled to a pool
+    worker and still expire at the same moment. With a `cancel` token it
+    also expires as soon as the token is cancelled."""
+
+    def __init__(self, seconds: float | None = None, cancel: CancelToken | None = None):
+        self.seconds = seconds
+        self.started = time.monotonic()
+        self.expires = None if seconds is None else self.started + seconds
+        self.cancel = cancel
+
+    def with_cancel(self, cancel: CancelToken | None) -> "Deadline":
+        """This budget, also expiring once `cancel` is cancelled."""
+        bound = copy.copy(self)
+        bound.cancel = cancel
+        return bound
+
+    def expired(self) -> bool:
+        if self.cancel is not None and self.cancel.cancelled():
+            return True
+        return self.expires is not None and time.monotonic() >= self.expires
+
+    def remaining(self) -> float | None:
+        """Seconds left (never negative), or None without a budget."""
+        if self.cancel is not None and self.cancel.cancelled():
+            return 0.0
+        if self.expires is None:
+            return None
+        return max(0.0, self.expires - time.monotonic())
+
+    def poll_interval(self) -> float | None:
+        """How long to block on other work before checking `expired` again:
+        the time remaining, at most CANCEL_POLL_INTERVAL with a token."""
+        remaining = self.remaining()
+        if self.cancel is None:
+            return remaining
+        return CANCEL_POLL_INTERVAL if remaining is None else min(
+            remaining, CANCEL_POLL_INTERVAL
+        )
+
+    def elapsed_ms(self) -> int:
+        return round((time.monotonic() - self.started) * 1000)
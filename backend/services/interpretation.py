@@ -0,0 +1,355 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+from services.jobs import CANCELLED, DONE, FAILED, JOBS
+
+
+# Interpretations run as background jobs, at most INTERPRETATION_CONCURRENCY
+# LLM calls at a time, each bounded by INTERPRETATION_TIMEOUT seconds.
+INTERPRETATION_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.5-flash")
+INTERPRETATION_TIMEOUT = float(os.getenv("INTERPRETATION_TIMEOUT", "30"))
+INTERPRETATION_CONCURRENCY = int(os.getenv("INTERPRETATION_CONCURRENCY", "2"))
+# After BREAKER_FAILURES consecutive failures no calls are made for
+# BREAKER_RESET seconds; then a single trial call decides whether to resume.
+BREAKER_FAILURES = int(os.getenv("INTERPRETATION_BREAKER_FAILURES", "3"))
+BREAKER_RESET = float(os.getenv("INTERPRETATION_BREAKER_RESET", "60"))
+INTERPRETATION_CACHE_DIR = Path(
+    os.getenv(
+        "INTERPRETATION_CACHE_DIR",
+        Path(__file__).resolve().parent.parent / "data" / "interpretations",
+    )
+)
+
+
+class InterpretationUnavailable(Exception):
+    """No client is configured or the circuit breaker is open."""
+
+
+def composition_signature_lines(artifacts: dict) -> list:
+    """Top k-mers and codons as prompt lines for the interpretation."""
+    lines = []
+    spectrum = artifacts.get("kmer_spectrum")
+    if spectrum and spectrum["top"]:
+        top = ", ".join(f"{kmer} ({count})" for kmer, count in spectrum["top"][:5])
+        lines.append(f"- Most frequent {spectrum['k']}-mers: {top}")
+    codons = artifacts.get("codon_usage")
+    if codons and codons["total_codons"]:
+        ranked = sorted(codons["table"], key=lambda row: -row["count"])[:5]
+        top = ", ".join(
+            f"{row['codon']}/{row['amino_acid']} ({row['per_thousand']}‰)"
+            for row in ranked
+        )
+        lines.append(f"- Most used codons over {codons['orfs']} ORFs: {top}")
+    return lines
+
+
+def build_prompt(result: dict, feature_counts: dict, artifacts: dict) -> str:
+    """Interpretation prompt from summary statistics, feature counts and
+    composition signatures. Identical genomes give identical prompts."""
+    summary = result.get("summary", {})
+    sequences = result.get("sequences", [])
+    signatures = composition_signature_lines(artifacts)
+    return f"""As a genomic analysis expert, please interpret the following genomic data and provide insights:
+
+**Summary Statistics:**
+- Total sequences: {summary.get('total_sequences', 0)}
+- Total bases: {summary.get('total_bases', 0):,} bp
+- Average sequence length: {summary.get('average_length', 0):.2f} bp
+- Overall GC content: {summary.get('overall_gc_content', 0):.2f}%
+- Overall AT content: {summary.get('overall_at_content', 0):.2f}%
+
+**Detected Features:**
+{chr(10).join([f'- {feat_type}: {count}' for feat_type, count in feature_counts.items()])}
+
+**Composition Signatures:**
+{chr(10).join(signatures) or '- Not available'}
+
+**Sequence Details (first 3):**
+{chr(10).join([f"- {seq['id']}: {seq['length']} bp, GC: {seq.get('gc_content', 0):.2f}%, AT skew: {seq.get('at_skew', 0):.4f}" for seq in sequences[:3]])}
+
+Please provide:
+1. Overall interpretation of the genomic composition
+2. Significance of the GC content and what it suggests about the organism
+3. Analysis of detected features (genes, ORFs, CDS, regulatory regions)
+4. Any notable patterns or characteristics
+5. Potential biological implications
+
+Keep the response concise but informative (max 500 words)."""
+
+
+def prompt_key(prompt: str, model: str = INTERPRETATION_MODEL) -> str:
+    digest = hashlib.sha256()
+    digest.update(model.encode("utf-8"))
+    digest.update(b"\0")
+    digest.update(prompt.encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+class InterpretationCache:
+    """Interpretations on disk, one JSON file per prompt key, so they survive
+    restarts and are shared by every server process."""
+
+    def __init__(self, directory: Path = INTERPRETATION_CACHE_DIR):
+        self.directory = Path(directory)
+
+    def _path(self, key: str) -> Path:
+        return self.directory / f"{key}.json"
+
+    def get(self, key: str) -> dict | None:
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key: str, entry: dict) -> None:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        # Write then rename so readers never see a partial file
+        tmp = self._path(key).with_suffix(f".{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(entry, f)
+        os.replace(tmp, self._path(key))
+
+
+class CircuitBreaker:
+    """Stops calling a failing service: closed -> open after `failures`
+    consecutive errors, half-open (one trial call) after `reset_after` seconds."""
+
+    def __init__(self, failures: int = BREAKER_FAILURES, reset_after: float = BREAKER_RESET):
+        self.failures = max(1, failures)
+        self.reset_after = reset_after
+        self._consecutive = 0
+        self._opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state()
+
+    def _state(self) -> str:
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at >= self.reset_after:
+            return "half_open"
+        return "open"
+
+    def retry_after(self) -> float:
+        with self._lock:
+            if self._opened_at is None:
+                return 0.0
+            return max(0.0, self.reset_after - (time.monotonic() - self._opened_at))
+
+    def allow(self) -> bool:
+        with self._lock:
+            state = self._state()
+            if state == "closed":
+                return True
+            if state == "half_open" and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._consecutive = 0
+            self._opened_at = None
+            self._trial = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._consecutive += 1
+            if self._trial or self._consecutive >= self.failures:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+
+class GeminiClient:
+    """Interpretation client backed by the Gemini API."""
+
+    def __init__(self, model: str = INTERPRETATION_MODEL):
+        from google import genai
+        from google.genai import types
+
+        self.model = model
+        self._types = types
+        self._client = genai.Client()
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        response = self._client.models.generate_content(
+            model=self.model,
+            contents=prompt,
+            config=self._types.GenerateContentConfig(
+                http_options=self._types.HttpOptions(timeout=int(timeout * 1000))
+            ),
+        )
+        return response.text
+
+
+class StubClient:
+    """Local stand-in for testing: answers after `delay` seconds (or times
+    out like a real client), optionally failing every call."""
+
+    model = "stub"
+
+    def __init__(self, delay: float = 0.0, fail: bool = False):
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    def generate(self, prompt: str, timeout: float) -> str:
+        self.calls += 1
+        time.sleep(min(self.delay, timeout))
+        if self.delay > timeout:
+            raise TimeoutError(f"Stub interpretation timed out after {timeout}s")
+        if self.fail:
+            raise RuntimeError("Stub interpretation failure")
+        return f"Stub interpretation of a {len(prompt)}-character prompt."
+
+
+def default_client():
+    """Client chosen by the environment: INTERPRETATION_CLIENT=stub for the
+    local stub, otherwise Gemini when GEMINI_API_KEY is set."""
+    if os.getenv("INTERPRETATION_CLIENT", "").lower() == "stub":
+        return StubClient(delay=float(os.getenv("INTERPRETATION_STUB_DELAY", "0")))
+    if os.getenv("GEMINI_API_KEY"):
+        return GeminiClient()
+    return None
+
+
+_client = None
+_client_ready = False
+_client_lock = threading.Lock()
+CACHE = InterpretationCache()
+BREAKER = CircuitBreaker()
+_inflight = {}
+_inflight_lock = threading.Lock()
+
+
+def client_configured() -> bool:
+    """Whether interpretations can run, without importing google.genai."""
+    if _client_ready:
+        return _client is not None
+    return (
+        os.getenv("INTERPRETATION_CLIENT", "").lower() == "stub"
+        or bool(os.getenv("GEMINI_API_KEY"))
+    )
+
+
+def get_client():
+    """The interpretation client, built on first use so the Gemini SDK is
+    only imported by processes that actually call it."""
+    global _client, _client_ready
+    if not _client_ready:
+        with _client_lock:
+            if not _client_ready:
+                _client = default_client()
+                _client_ready = True
+    return _client
+
+
+def set_client(client) -> None:
+    """Swap the interpretation client (e.g. for a StubClient in tests)."""
+    global _client, _client_ready
+    with _client_lock:
+        _client = client
+        _client_ready = True
+
+
+def interpret(prompt: str, key: str) -> dict:
+    """Run one interpretation, consulting the persistent cache first."""
+    try:
+        cached = CACHE.get(key)
+        if cached is not None:
+            return cached
+        client = get_client()
+        if client is None:
+            raise InterpretationUnavailable(
+                "Gemini AI is not configured. Please set GEMINI_API_KEY environment variable."
+            )
+        if not BREAKER.allow():
+            raise InterpretationUnavailable(
+                f"Interpretation service unavailable, retry in {BREAKER.retry_after():.0f}s."
+            )
+        started = time.perf_counter()
+        try:
+            text = client.generate(prompt, INTERPRETATION_TIMEOUT)
+        except Exception:
+            BREAKER.record_failure()
+            raise
+        BREAKER.record_success()
+        entry = {
+            "key": key,
+            "model": client.model,
+            "interpretation": text,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 2),
+            "created_at": time.time(),
+        }
+        CACHE.put(key, entry)
+        return entry
+    finally:
+        with _inflight_lock:
+            _inflight.pop(key, None)
+
+
+def job_response(job: dict) -> dict:
+    """Client-facing view of an interpretation job."""
+    response = {
+        "job_id": job["id"],
+        "key": job.get("key"),
+        "dataset_id": job.get("dataset_id"),
+        "status": job["status"],
+    }
+    if job["status"] == DONE:
+        response["interpretation"] = job["result"]["interpretation"]
+    elif job["status"] == FAILED:
+        response["error"] = f"Failed to generate interpretation: {job['error']}"
+    return response
+
+
+def request_interpretation(prompt: str, dataset_id: str | None = None) -> dict:
+    """Return a cached interpretation immediately, otherwise the job that
+    produces it. Requests for a prompt already being interpreted share one job."""
+    key = prompt_key(prompt)
+    cached = CACHE.get(key)
+    if cached is not None:
+        return {
+            "job_id": None,
+            "key": key,
+            "dataset_id": dataset_id,
+            "status": DONE,
+            "cached": True,
+            "interpretation": cached["interpretation"],
+        }
+    error = None
+    if not client_configured():
+        error = "Gemini AI is not configured. Please set GEMINI_API_KEY environment variable."
+    elif BREAKER.state == "open":
+        error = f"Interpretation service unavailable, retry in {BREAKER.retry_after():.0f}s."
+    if error:
+        return {
+            "job_id": None,
+            "key": key,
+            "dataset_id": dataset_id,
+            "status": FAILED,
+            "error": error,
+        }
+    with _inflight_lock:
+        job = JOBS.snapshot(_inflight[key]) if key in _inflight else None
+        if job is None or job["status"] == CANCELLED:
+            job = JOBS.submit(
+                "interpretation",
+                interpret,
+                prompt,
+                key,
+                workers=INTERPRETATION_CONCURRENCY,
+                key=key,
+                dataset_id=dataset_id,
+            )
+            _inflight[key] = job["id"]
+    return {**job_response(job), "cached": False}
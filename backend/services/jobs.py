@@ -0,0 +1,106 @@
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+# Finished jobs kept for polling before the oldest are forgotten.
+MAX_FINISHED_JOBS = int(os.getenv("MAX_FINISHED_JOBS", "1000"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+CANCELLED = "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+
+class JobRegistry:
+    """Background jobs polled by id.
+
+    Each kind of job runs on its own thread pool, so the pool size is that
+    kind's concurrency limit. Jobs are plain dicts (id, kind, status, result,
+    error, timestamps); `snapshot` returns a copy safe to serialise."""
+
+    def __init__(self, max_finished: int = MAX_FINISHED_JOBS):
+        self.max_finished = max(1, max_finished)
+        self._jobs = OrderedDict()
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def _pool(self, kind: str, workers: int) -> ThreadPoolExecutor:
+        with self._lock:
+            if kind not in self._pools:
+                self._pools[kind] = ThreadPoolExecutor(
+                    max_workers=max(1, workers), thread_name_prefix=f"job-{kind}"
+                )
+            return self._pools[kind]
+
+    def submit(self, kind: str, fn, *args, workers: int = 1, **fields) -> dict:
+        """Queue `fn(*args)` and return the new job's snapshot. Extra fields
+        are stored on the job for clients (e.g. the dataset it belongs to)."""
+        job = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "status": QUEUED,
+            "result": None,
+            "error": None,
+            "created_at": time.time(),
+            "finished_at": None,
+            **fields,
+        }
+        with self._lock:
+            self._jobs[job["id"]] = job
+            self._evict()
+        self._pool(kind, workers).submit(self._run, job["id"], fn, args)
+        return self.snapshot(job["id"])
+
+    def _run(self, job_id: str, fn, args) -> None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None or job["status"] == CANCELLED:
+                # Cancelled while queued: free the slot for the next job
+                return
+            job["status"] = RUNNING
+        try:
+            result = fn(*args)
+        except Exception as e:
+            self.update(job_id, status=FAILED, error=str(e), finished_at=time.time())
+        else:
+            self.update(job_id, status=DONE, result=result, finished_at=time.time())
+
+    def update(self, job_id: str, **fields) -> None:
+        """Update a job's fields, unless it was cancelled."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is not None and job["status"] != CANCELLED:
+                job.update(fields)
+
+    def cancel(self, job_id: str) -> dict | None:
+        """Cancel a job and return its snapshot, None if unknown. A queued job
+        never runs. A running one cannot be interrupted, since it may be
+        blocked in a call to another service, but its outcome is dropped.
+        Finished jobs are left as they are."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            if job["status"] not in FINISHED:
+                job.update(status=CANCELLED, finished_at=time.time())
+            return dict(job)
+
+    def snapshot(self, job_id: str) -> dict | None:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def _evict(self) -> None:
+        finished = [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job["status"] in FINISHED
+        ]
+        for job_id in finished[: max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+
+JOBS = JobRegistry()
@@ -0,0 +1,213 @@
+import os
+
+import numpy as np
+
+from services.composition import OTHER_CODE, encode_sequence
+from services.sequence_view import SequenceView
+
+
+# Memory available to one k-mer counter. Dense tables need 4 bytes * 4^k, so
+# the default budget holds every k up to 12; larger k fall back to a
+# count-min sketch of the same size.
+KMER_MEMORY_BUDGET = int(os.getenv("KMER_MEMORY_BUDGET", str(64 * 1024 * 1024)))
+DEFAULT_KMER_K = 6
+MAX_DENSE_K = 12
+MAX_KMER_K = 31  # 2-bit codes must fit in a uint64
+KMER_TOP_STORED = 200
+CMS_DEPTH = 4
+CMS_CANDIDATES = 1024
+SPECTRUM_MAX_MULTIPLICITY = 1000
+
+_MIX = np.array(
+    [0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9, 0xD6E8FEB86659FD93],
+    dtype=np.uint64,
+)
+
+
+def decode_kmer(value: int, k: int) -> str:
+    return "".join("ACGT"[(value >> (2 * (k - 1 - i))) & 3] for i in range(k))
+
+
+def kmer_values(codes: np.ndarray, k: int, canonical: bool = False) -> np.ndarray:
+    """2-bit packed values of every k-mer in `codes` that contains only ACGT.
+    With `canonical`, each k-mer is the smaller of itself and its reverse
+    complement, so both strands of a genome give the same values."""
+    num = len(codes) - k + 1
+    if num <= 0:
+        return np.empty(0, dtype=np.uint64)
+    bad = np.zeros(len(codes) + 1, dtype=np.int32)
+    np.cumsum(codes == OTHER_CODE, out=bad[1:])
+    valid = (bad[k:] - bad[:num]) == 0
+    values = np.zeros(num, dtype=np.uint64)
+    for offset in range(k):
+        values <<= np.uint64(2)
+        values |= codes[offset : offset + num].astype(np.uint64) & np.uint64(3)
+    if canonical:
+        reverse = np.zeros(num, dtype=np.uint64)
+        for offset in range(k):
+            complement = np.uint64(3) - (codes[offset : offset + num].astype(np.uint64) & np.uint64(3))
+            reverse |= complement << np.uint64(2 * offset)
+        np.minimum(values, reverse, out=values)
+    return values[valid]
+
+
+class KmerCounter:
+    """Streaming k-mer counter with a fixed memory budget.
+
+    Feed it encoded chunks in order with `update`; the last k - 1 codes are
+    carried over so k-mers spanning chunk boundaries are counted once. Small k
+    use a dense 4^k table; otherwise a count-min sketch with a bounded set of
+    heavy-hitter candidates gives approximate counts."""
+
+    def __init__(self, k: int = DEFAULT_KMER_K, memory_budget: int = KMER_MEMORY_BUDGET):
+        if not 1 <= k <= MAX_KMER_K:
+            raise ValueError(f"k must be between 1 and {MAX_KMER_K}.")
+        self.k = k
+        self.total = 0
+        self._tail = np.empty(0, dtype=np.uint8)
+        dense_bytes = 4 * (4**k)
+        if k <= MAX_DENSE_K and dense_bytes <= memory_budget:
+            self.method = "dense"
+            self._counts = np.zeros(4**k, dtype=np.uint32)
+        else:
+            self.method = "count_min"
+            width = max(1024, memory_budget // (4 * CMS_DEPTH))
+            self._width_bits = int(width).bit_length() - 1
+            self._table = np.zeros((CMS_DEPTH, 1 << self._width_bits), dtype=np.uint32)
+            self._candidates = {}
+
+    def reset_carry(self) -> None:
+        """Call between records so k-mers never span two sequences."""
+        self._tail = np.empty(0, dtype=np.uint8)
+
+    def update(self, codes: np.ndarray) -> None:
+        if len(self._tail):
+            codes = np.concatenate([self._tail, codes])
+        self._tail = codes[len(codes) - (self.k - 1) :] if self.k > 1 else codes[:0]
+        values = kmer_values(codes, self.k)
+        if not len(values):
+            return
+        self.total += len(values)
+        if self.method == "dense":
+            if len(values) >= len(self._counts):
+                self._counts += np.bincount(
+                    values.astype(np.int64), minlength=len(self._counts)
+                ).astype(np.uint32)
+            else:
+                unique, counts = np.unique(values, return_counts=True)
+                self._counts[unique.astype(np.int64)] += counts.astype(np.uint32)
+            return
+
+        unique, counts = np.unique(values, return_counts=True)
+        for row, index in enumerate(self._hash(unique)):
+            np.add.at(self._table[row], index, counts.astype(np.uint32))
+        self._refresh_candidates(unique)
+
+    def update_sequence(self, seq_str: str) -> None:
+        self.reset_carry()
+        self.update(encode_sequence(seq_str))
+        self.reset_carry()
+
+    def _hash(self, values: np.ndarray) -> list:
+        shift = np.uint64(64 - self._width_bits)
+        return [((values * mix) >> shift).astype(np.int64) for mix in _MIX[:CMS_DEPTH]]
+
+    def estimate(self, values: np.ndarray) -> np.ndarray:
+        """Count-min estimate (never an undercount) for packed k-mer values."""
+        if self.method == "dense":
+            return self._counts[values.astype(np.int64)].astype(np.int64)
+        rows = [self._table[row][index] for row, index in enumerate(self._hash(values))]
+        return np.min(np.stack(rows), axis=0).astype(np.int64)
+
+    def _refresh_candidates(self, unique: np.ndarray) -> None:
+        # Values already tracked may reappear in `unique`; the dict keeps one copy
+        pool = np.concatenate(
+            [unique, np.fromiter(self._candidates, dtype=np.uint64, count=len(self._candidates))]
+        )
+        estimates = self.estimate(pool)
+        if len(pool) > CMS_CANDIDATES:
+            keep = np.argpartition(estimates, len(pool) - CMS_CANDIDATES)[-CMS_CANDIDATES:]
+        else:
+            keep = np.arange(len(pool))
+        self._candidates = {int(pool[i]): int(estimates[i]) for i in keep}
+
+    def top(self, n: int = KMER_TOP_STORED) -> list:
+        """Most frequent k-mers as [kmer, count] pairs."""
+        if self.method == "dense":
+            nonzero = np.flatnonzero(self._counts)
+            order = nonzero[np.argsort(self._counts[nonzero], kind="stable")[::-1][:n]]
+            return [[decode_kmer(int(v), self.k), int(self._counts[v])] for v in order]
+        ranked = sorted(self._candidates.items(), key=lambda item: -item[1])[:n]
+        return [[decode_kmer(v, self.k), c] for v, c in ranked]
+
+    def spectrum(self) -> list | None:
+        """k-mer spectrum as [multiplicity, number of distinct k-mers] pairs.
+        Multiplicities above SPECTRUM_MAX_MULTIPLICITY are pooled into the last
+        bin. Only available for dense tables."""
+        if self.method != "dense":
+            return None
+        counts = self._counts[self._counts > 0]
+        histogram = np.bincount(np.minimum(counts, SPECTRUM_MAX_MULTIPLICITY))
+        return [[int(m), int(n)] for m, n in enumerate(histogram) if n]
+
+    def summary(self) -> dict:
+        distinct = int(np.count_nonzero(self._counts)) if self.method == "dense" else None
+        return {
+            "k": self.k,
+            "method": self.method,
+            "total_kmers": self.total,
+            "distinct_kmers": distinct,
+            "top": self.top(),
+            "spectrum": self.spectrum(),
+        }
+
+
+# Standard genetic code, indexed by 16 * first + 4 * second + third base code
+_AMINO_ACIDS = "KNKNTTTTRSRSIIMIQHQHPPPPRRRRLLLLEDEDAAAAGGGGVVVV*Y*YSSSS*CWCLFLF"
+CODONS = [a + b + c for a in "ACGT" for b in "ACGT" for c in "ACGT"]
+
+
+def orf_codon_counts(view: SequenceView, start: int, end: int, strand: str) -> np.ndarray:
+    """Counts of the 64 codons read in frame over [start, end) on `strand`."""
+    region = view.region_codes(start, end, strand)
+    region = region[: len(region) // 3 * 3].reshape(-1, 3).astype(np.int64)
+    region = region[(region < OTHER_CODE).all(axis=1)]
+    index = region[:, 0] * 16 + region[:, 1] * 4 + region[:, 2]
+    return np.bincount(index, minlength=64)
+
+
+class CodonUsage:
+    """Accumulates codon counts over ORFs from any number of records."""
+
+    def __init__(self):
+        self.counts = np.zeros(64, dtype=np.int64)
+        self.orfs = 0
+
+    def add_orfs(self, view: SequenceView, orfs: list) -> None:
+        for orf in orfs:
+            self.counts += orf_codon_counts(view, orf["start"], orf["end"], orf["strand"])
+            self.orfs += 1
+
+    def summary(self) -> dict:
+        total = int(self.counts.sum())
+        per_amino_acid = {}
+        for index, count in enumerate(self.counts):
+            aa = _AMINO_ACIDS[index]
+            per_amino_acid[aa] = per_amino_acid.get(aa, 0) + int(count)
+        table = []
+        for index, codon in enumerate(CODONS):
+            count = int(self.counts[index])
+            aa = _AMINO_ACIDS[index]
+            table.append(
+                {
+                    "codon": codon,
+                    "amino_acid": aa,
+                    "count": count,
+                    "per_thousand": round(count * 1000 / total, 2) if total else 0.0,
+                    "fraction": round(count / per_amino_acid[aa], 3)
+                    if per_amino_acid[aa]
+                    else 0.0,
+                }
+            )
+        return {"orfs": self.orfs, "total_codons": total, "table": table}
+
@@ -0,0 +1,209 @@
+import itertools
+import re
+import threading
+
+import numpy as np
+
+from services.composition import encode_sequence
+from services.sequence_view import reverse_complement
+
+
+# Suffix array symbols are the composition codes shifted up by one: 0 marks
+# the end of the text, so shorter suffixes sort first, then A, C, G, T (1-4)
+# and any other base (5), which never matches a query.
+_SYMBOLS = {"A": 1, "C": 2, "G": 3, "T": 4}
+_INITIAL_PREFIX = 21  # symbols packed 3 bits each into the first sort key
+
+IUPAC = {
+    "A": "A",
+    "C": "C",
+    "G": "G",
+    "T": "T",
+    "U": "T",
+    "R": "AG",
+    "Y": "CT",
+    "S": "CG",
+    "W": "AT",
+    "K": "GT",
+    "M": "AC",
+    "B": "CGT",
+    "D": "AGT",
+    "H": "ACT",
+    "V": "ACG",
+    "N": "ACGT",
+}
+MAX_EXPANSIONS = 256
+MIN_ANCHOR = 4
+MAX_MOTIF_LENGTH = 1000
+
+
+def reverse_complement_motif(motif: str) -> str:
+    return reverse_complement(motif)
+
+
+def normalise_motif(motif: str) -> str:
+    """Upper-case an IUPAC motif, raising ValueError for anything else."""
+    motif = "".join(motif.split()).upper()
+    if not motif:
+        raise ValueError("Motif must not be empty.")
+    if len(motif) > MAX_MOTIF_LENGTH:
+        raise ValueError(f"Motif must be at most {MAX_MOTIF_LENGTH} bases.")
+    invalid = set(motif) - set(IUPAC)
+    if invalid:
+        raise ValueError(f"Invalid IUPAC symbols in motif: {''.join(sorted(invalid))}")
+    return motif.replace("U", "T")
+
+
+def _symbols(seq_str: str) -> np.ndarray:
+    return encode_sequence(seq_str) + np.uint8(1)
+
+
+def build_suffix_array(seq_str: str) -> np.ndarray:
+    """Suffix array by prefix doubling.
+
+    The first sort uses the leading 21 symbols packed into one uint64, which
+    already separates almost every suffix of a genome; later rounds re-sort
+    only the suffixes that are still tied (repeats), with group-start ranks so
+    settled suffixes never move."""
+    n = len(seq_str)
+    if n == 0:
+        return np.empty(0, dtype=np.int32)
+    symbols = _symbols(seq_str).astype(np.uint64)
+    padded = np.concatenate([symbols, np.zeros(_INITIAL_PREFIX, dtype=np.uint64)])
+    key = np.zeros(n, dtype=np.uint64)
+    for offset in range(_INITIAL_PREFIX):
+        key <<= np.uint64(3)
+        key |= padded[offset : offset + n]
+
+    sa = np.argsort(key, kind="stable").astype(np.int64)
+    sorted_key = key[sa]
+    del key, padded
+    starts = np.r_[True, sorted_key[1:] != sorted_key[:-1]]
+    rank = np.empty(n, dtype=np.int64)
+    rank[sa] = np.maximum.accumulate(np.where(starts, np.arange(n), 0))
+
+    h = _INITIAL_PREFIX
+    while True:
+        group_rank = rank[sa]
+        starts = np.r_[True, group_rank[1:] != group_rank[:-1]]
+        group_id = np.cumsum(starts) - 1
+        tied = np.bincount(group_id)[group_id] > 1
+        if not tied.any() or h >= n:
+            break
+        idx = np.flatnonzero(tied)
+        suffixes = sa[idx]
+        first = rank[suffixes]
+        following = suffixes + h
+        second = np.full(len(suffixes), -1, dtype=np.int64)
+        in_text = following < n
+        second[in_text] = rank[following[in_text]]
+        order = np.lexsort((second, first))
+        first, second, suffixes = first[order], second[order], suffixes[order]
+        new_start = np.r_[True, (first[1:] != first[:-1]) | (second[1:] != second[:-1])]
+        sa[idx] = suffixes
+        rank[suffixes] = np.maximum.accumulate(np.where(new_start, idx, 0))
+        h *= 2
+    return sa.astype(np.int32)
+
+
+class MotifIndex:
+    """Suffix array over one sequence answering exact queries in O(m log n)."""
+
+    def __init__(self, seq_str: str, suffix_array: np.ndarray | None = None):
+        self.text = _symbols(seq_str).tobytes()
+        self.suffix_array = (
+            suffix_array if suffix_array is not None else build_suffix_array(seq_str)
+        )
+
+    def _bound(self, pattern: bytes, upper: bool) -> int:
+        sa, text, m = self.suffix_array, self.text, len(pattern)
+        lo, hi = 0, len(sa)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = int(sa[mid])
+            window = text[start : start + m]
+            if window < pattern or (upper and window == pattern):
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def find(self, pattern: str) -> np.ndarray:
+        """Sorted start positions of an exact (ACGT) pattern."""
+        encoded = bytes(_SYMBOLS[base] for base in pattern)
+        lo = self._bound(encoded, upper=False)
+        hi = self._bound(encoded, upper=True)
+        return np.sort(self.suffix_array[lo:hi]).astype(np.int64)
+
+
+def _anchor(motif: str) -> tuple:
+    """Longest run of concrete bases in a motif as (offset, run)."""
+    best = (0, "")
+    for match in re.finditer(r"[ACGT]+", motif):
+        if len(match.group()) > len(best[1]):
+            best = (match.start(), match.group())
+    return best
+
+
+def _motif_regex(motif: str) -> re.Pattern:
+    return re.compile(
+        "".join(f"[{IUPAC[base]}]" if len(IUPAC[base]) > 1 else base for base in motif)
+    )
+
+
+def find_motif(index: MotifIndex, seq_str: str, motif: str) -> tuple:
+    """Start positions of an IUPAC motif on one strand, plus the method used.
+
+    Motifs with few concrete expansions are answered purely from the index.
+    Highly degenerate ones look up their longest concrete run and verify each
+    candidate; only motifs without a usable anchor fall back to a scan."""
+    expansions = 1
+    for base in motif:
+        expansions *= len(IUPAC[base])
+    if expansions <= MAX_EXPANSIONS:
+        hits = [
+            index.find("".join(bases))
+            for bases in itertools.product(*(IUPAC[base] for base in motif))
+        ]
+        return np.unique(np.concatenate(hits)), "index"
+
+    pattern = _motif_regex(motif)
+    offset, anchor = _anchor(motif)
+    if len(anchor) >= MIN_ANCHOR:
+        candidates = index.find(anchor) - offset
+        candidates = candidates[(candidates >= 0) & (candidates + len(motif) <= len(seq_str))]
+        hits = [int(c) for c in candidates if pattern.fullmatch(seq_str, c, c + len(motif))]
+        return np.array(hits, dtype=np.int64), "anchored_index"
+
+    lookahead = re.compile(f"(?=({pattern.pattern}))")
+    hits = [match.start() for match in lookahead.finditer(seq_str)]
+    return np.array(hits, dtype=np.int64), "scan"
+
+
+# Guards creating the per-sequence build locks, which live in each dataset's
+# artifacts and so are freed with them
+_build_locks_guard = threading.Lock()
+
+
+def get_motif_index(artifacts: dict, seq_id: str, on_build=None) -> MotifIndex | None:
+    """Motif index for a stored sequence, kept in the dataset's artifacts so
+    later queries reuse it. A suffix array loaded with the dataset is used
+    as is; otherwise it is built on first use and passed to
+    `on_build(seq_id, suffix_array)`, e.g. to persist it."""
+    indexes = artifacts.setdefault("motif_indexes", {})
+    if seq_id in indexes:
+        return indexes[seq_id]
+    seq_str = artifacts.get("sequences", {}).get(seq_id)
+    if seq_str is None:
+        return None
+    with _build_locks_guard:
+        locks = artifacts.setdefault("motif_build_locks", {})
+        lock = locks.setdefault(seq_id, threading.Lock())
+    with lock:
+        if seq_id not in indexes:
+            stored = artifacts.get("suffix_arrays", {}).get(seq_id)
+            index = MotifIndex(seq_str, stored)
+            if stored is None and on_build is not None:
+                on_build(seq_id, index.suffix_array)
+            indexes[seq_id] = index
+    return indexes[seq_id]
@@ -0,0 +1,297 @@
+import heapq
+import os
+from concurrent.futures import wait
+
+import numpy as np
+
+from services.composition import CHUNK_SIZE, NUM_CODES, encode_sequence
+from services.deadline import Deadline
+from services.sequence_view import SequenceView, reverse_complement_codes
+from services.shared_sequences import SequenceHandle, SharedSequence, read_shared
+from services.work_queue import result_before
+
+
+# ORFs reported per record by default, and the most a request may ask for.
+DEFAULT_ORF_TOP_K = int(os.getenv("DEFAULT_ORF_TOP_K", "50"))
+MAX_ORF_TOP_K = 5000
+MIN_ORF_LENGTH = 300
+
+# Codons as base-5 numbers of their composition codes, so N never matches
+_START = 0 * 25 + 3 * 5 + 2  # ATG
+_STOPS = (3 * 25 + 0 * 5 + 0, 3 * 25 + 0 * 5 + 2, 3 * 25 + 2 * 5 + 0)  # TAA TAG TGA
+_NONE = np.empty(0, dtype=np.int64)
+
+
+def _codons(codes: np.ndarray) -> np.ndarray:
+    """Base-5 codon number at every position that starts a full codon."""
+    codes = codes.astype(np.int16)
+    return codes[:-2] * NUM_CODES**2 + codes[1:-1] * NUM_CODES + codes[2:]
+
+
+class TopOrfs:
+    """Bounded min-heap keeping the `k` longest ORFs offered to it.
+
+    The shortest kept ORF is at the root, so a candidate is compared with it
+    in O(1) and inserted in O(log k); ties keep the ORF offered first."""
+
+    def __init__(self, k: int):
+        self.k = k
+        self._heap = []
+        self._offered = 0
+
+    @property
+    def threshold(self) -> int:
+        """Length a new ORF must exceed to be kept."""
+        return self._heap[0][0] if len(self._heap) >= self.k else -1
+
+    def offer(self, length: int, orf: dict) -> None:
+        if self.k <= 0:
+            return
+        entry = (length, -self._offered, orf)
+        self._offered += 1
+        if len(self._heap) < self.k:
+            heapq.heappush(self._heap, entry)
+        elif length > self._heap[0][0]:
+            heapq.heapreplace(self._heap, entry)
+
+    def longest(self) -> list:
+        """Kept ORFs, longest first."""
+        return [orf for _, _, orf in sorted(self._heap, reverse=True)]
+
+
+def _longest_in_order(starts: np.ndarray, ends: np.ndarray, k: int) -> tuple:
+    """The `k` longest of the given ORFs, still in position order; ties keep
+    the earliest, as the heap does."""
+    lengths = ends - starts
+    if len(lengths) <= k:
+        return starts, ends
+    if k <= 0:
+        return starts[:0], ends[:0]
+    cut = np.partition(lengths, len(lengths) - k)[len(lengths) - k]
+    keep = lengths > cut
+    keep[np.flatnonzero(lengths == cut)[: k - int(keep.sum())]] = True
+    return starts[keep], ends[keep]
+
+
+def scan_chunk(
+    codes: np.ndarray, chunk_start: int, k: int, min_length: int = MIN_ORF_LENGTH
+) -> list:
+    """Per-frame summary of the codons starting in one chunk of a strand.
+
+    `codes` covers the chunk plus the two bases after it, from strand position
+    `chunk_start`. For each frame (position % 3) the summary is
+    (head_start, head_stop, starts, ends, tail_start): the first in-frame stop
+    and the first ATG before it, whose ORF may have started in an earlier
+    chunk; the `k` longest ORFs of at least `min_length` closed by the later
+    stops (ATG start to the first base after the stop); and the first ATG
+    after the last stop, still open at the end of the chunk. Each stop closes
+    one ORF, from the first ATG after the previous in-frame stop; nested ATGs
+    only give shorter ORFs with the same stop, so they are not reported.
+    Chunks are independent, so they can be scanned in any process."""
+    codons = _codons(codes)
+    summary = []
+    for frame in range(3):
+        offset = (frame - chunk_start) % 3
+        frame_codons = codons[offset::3]
+        positions = chunk_start + offset + 3 * np.arange(len(frame_codons))
+        starts = positions[frame_codons == _START]
+        stops = positions[np.isin(frame_codons, _STOPS)]
+        first_start = int(starts[0]) if len(starts) else None
+        if not len(stops):
+            summary.append((first_start, None, _NONE, _NONE, first_start))
+            continue
+        head_start = first_start if len(starts) and starts[0] < stops[0] else None
+        first = np.searchsorted(starts, stops[:-1], side="right")
+        found = first < len(starts)
+        orf_starts = np.full(len(stops) - 1, -1, dtype=np.int64)
+        orf_starts[found] = starts[first[found]]
+        closed = found & (orf_starts < stops[1:])
+        orf_starts, orf_ends = orf_starts[closed], stops[1:][closed] + 3
+        long_enough = orf_ends - orf_starts >= min_length
+        orf_starts, orf_ends = _longest_in_order(
+            orf_starts[long_enough], orf_ends[long_enough], k
+        )
+        after = np.searchsorted(starts, stops[-1], side="right")
+        tail_start = int(starts[after]) if after < len(starts) else None
+        summary.append((head_start, int(stops[0]), orf_starts, orf_ends, tail_start))
+    return summary
+
+
+def strand_chunks(strand_length: int, chunk_size: int = CHUNK_SIZE):
+    """(start, end) of each chunk of codon start positions on a strand; a
+    chunk is scanned from the codes of [start, end + 2)."""
+    last_codon = strand_length - 3
+    for chunk_start in range(0, last_codon + 1, chunk_size):
+        yield chunk_start, min(chunk_start + chunk_size, last_codon + 1)
+
+
+def _merge_chunk(
+    top: TopOrfs,
+    open_start: list,
+    summary: list,
+    strand: str,
+    seq_len: int,
+    min_length: int,
+) -> None:
+    """Offer the ORFs of one chunk summary to `top`, joining each frame's ATG
+    still open from earlier chunks of the strand (`open_start`, updated) to
+    its first stop. Only lengths that could still enter the heap become ORF
+    records."""
+    for frame, (head_start, head_stop, starts, ends, tail_start) in enumerate(summary):
+        if head_stop is None:
+            if open_start[frame] is None:
+                open_start[frame] = tail_start
+            continue
+        start = open_start[frame] if open_start[frame] is not None else head_start
+        if start is not None:
+            starts, ends = np.r_[start, starts], np.r_[head_stop + 3, ends]
+        open_start[frame] = tail_start
+        lengths = ends - starts
+        keep = lengths >= max(min_length, top.threshold + 1)
+        for start, end, length in zip(
+            starts[keep].tolist(), ends[keep].tolist(), lengths[keep].tolist()
+        ):
+            if strand == "-":
+                start, end = seq_len - end, seq_len - start
+            top.offer(
+                length,
+                {
+                    "start": start,
+                    "end": end,
+                    "strand": strand,
+                    "length": length,
+                    "frame": frame,
+                },
+            )
+
+
+def _scan_shared_chunk(codes, strand, chunk_start, k, min_length):
+    if strand == "-":
+        codes = reverse_complement_codes(codes)
+    return scan_chunk(codes, chunk_start, k, min_length)
+
+
+def scan_shared_chunk(
+    handle: SequenceHandle, strand: str, chunk_start: int, k: int, min_length: int
+) -> list:
+    """`scan_chunk` for a chunk given as a handle to its forward-strand codes
+    in shared memory. Top-level so it can run in worker processes."""
+    return read_shared(handle, _scan_shared_chunk, strand, chunk_start, k, min_length)
+
+
+def merge_chunk_scans(
+    scans: list,
+    seq_len: int,
+    k: int,
+    min_length: int = MIN_ORF_LENGTH,
+    deadline: Deadline | None = None,
+) -> tuple:
+    """`longest_orfs`'s result from the futures of a record's chunk scans,
+    as (strand, future) in chunk order with the strands in step. Merging
+    stops, with the ORFs merged so far, once `deadline` passes."""
+    top = TopOrfs(k)
+    open_starts = {"+": [None, None, None], "-": [None, None, None]}
+    for strand, future in scans:
+        summary = result_before(future, deadline)
+        if summary is None:
+            return top.longest(), False
+        _merge_chunk(top, open_starts[strand], summary, strand, seq_len, min_length)
+    return top.longest(), True
+
+
+def submit_chunk_scans(
+    queue,
+    view: SequenceView,
+    k: int,
+    min_length: int = MIN_ORF_LENGTH,
+    chunk_size: int = CHUNK_SIZE,
+) -> list:
+    """Submit the scan of every chunk of both strands of a record to a work
+    queue whose workers may be on other machines, each task carrying its own
+    codes; returns the scans for `merge_chunk_scans`."""
+    seq_len = len(view)
+    if k <= 0 or seq_len < 3:
+        return []
+    return [
+        (
+            strand,
+            queue.submit(
+                scan_chunk,
+                encode_sequence(view.forward[start : end + 2])
+                if strand == "+"
+                else view.region_codes(seq_len - end - 2, seq_len - start, "-"),
+                start,
+                k,
+                min_length,
+            ),
+        )
+        for start, end in strand_chunks(seq_len, chunk_size)
+        for strand in ("+", "-")
+    ]
+
+
+def longest_orfs(
+    view: SequenceView,
+    k: int,
+    min_length: int = MIN_ORF_LENGTH,
+    pool=None,
+    chunk_size: int = CHUNK_SIZE,
+    deadline: Deadline | None = None,
+) -> tuple:
+    """(the `k` longest ORFs of at least `min_length` bases over all six
+    frames of a record, longest first; whether the whole record was scanned).
+
+    Both strands are scanned chunk by chunk, in step; minus-strand chunks are
+    reverse complemented on the fly, so no full reverse-complement copy is
+    made. With a process `pool`, the record is encoded once into shared
+    memory and every chunk is scanned by a worker that is handed only its
+    handle; the result is the same as scanning here. Once `deadline` passes
+    (or its token is cancelled), the ORFs of the chunks scanned so far are
+    returned."""
+    seq_len = len(view)
+    top = TopOrfs(k)
+    if k <= 0 or seq_len < 3:
+        return [], True
+    deadline = deadline or Deadline()
+    chunks = list(strand_chunks(seq_len, chunk_size))
+    open_starts = {"+": [None, None, None], "-": [None, None, None]}
+    if pool is None:
+        for start, end in chunks:
+            for strand in ("+", "-"):
+                if deadline.expired():
+                    return top.longest(), False
+                if strand == "+":
+                    codes = encode_sequence(view.forward[start : end + 2])
+                else:
+                    codes = view.region_codes(seq_len - end - 2, seq_len - start, "-")
+                summary = scan_chunk(codes, start, k, min_length)
+                _merge_chunk(
+                    top, open_starts[strand], summary, strand, seq_len, min_length
+                )
+        return top.longest(), True
+
+    with SharedSequence(view.forward) as shared:
+        futures = [
+            (
+                strand,
+                pool.submit(
+                    scan_shared_chunk,
+                    shared.handle.region(start, end + 2)
+                    if strand == "+"
+                    else shared.handle.region(seq_len - end - 2, seq_len - start),
+                    strand,
+                    start,
+                    k,
+                    min_length,
+                ),
+            )
+            for start, end in chunks
+            for strand in ("+", "-")
+        ]
+        try:
+            return merge_chunk_scans(futures, seq_len, k, min_length, deadline)
+        finally:
+            # The block is unlinked on exit; no task may still be reading it
+            for _, future in futures:
+                future.cancel()
+            wait([future for _, future in futures])
@@ -0,0 +1,160 @@
+import json
+import os
+import time
+from pathlib import Path
+
+from services.dataset_store import DATASET_DIR
+
+
+# Seconds between writes of buffered progress, and between reads of it by
+# an event stream
+PROGRESS_INTERVAL = float(os.getenv("PROGRESS_INTERVAL", "0.1"))
+# Seconds between keep-alive comments of an idle event stream, and without
+# any event before it gives up
+PROGRESS_HEARTBEAT = 15.0
+PROGRESS_IDLE_TIMEOUT = 600.0
+# Seconds an event stream waits for its request to start: streams are opened
+# before the request is sent, and one never sent must not hold a server
+# thread for PROGRESS_IDLE_TIMEOUT
+PROGRESS_START_TIMEOUT = float(os.getenv("PROGRESS_START_TIMEOUT", "30"))
+# Progress files older than this are deleted, every PRUNE_INTERVAL requests
+PROGRESS_FILE_TTL = 3600
+PRUNE_INTERVAL = 64
+
+PROGRESS_DIR = DATASET_DIR / ".progress"
+_reporters = 0
+
+
+class ProgressReporter:
+    """Progress events of one request, read by GET /api/ingest/<id>/events.
+
+    Events are appended to a file named after the request id, one JSON line
+    each, so any server process can stream them and pool workers holding a
+    pickled copy can report too. Writes are batched: events wait in memory
+    until PROGRESS_INTERVAL has passed since the last write. `update`
+    events of one kind (e.g. bytes downloaded) replace each other while
+    they wait, so frequent progress costs one line per interval at most.
+    Every event carries `ms`, the time since the request started, from the
+    monotonic clock shared by the machine's processes."""
+
+    def __init__(self, request_id: str, directory: Path | None = None):
+        global _reporters
+        self.request_id = request_id
+        self.path = Path(directory or PROGRESS_DIR) / request_id
+        self.started = time.monotonic()
+        self._pending = []
+        self._latest = {}
+        self._written = self.started
+        _reporters += 1
+        if _reporters % PRUNE_INTERVAL == 0:
+            self._prune()
+
+    def _record(self, kind: str, data: dict) -> dict:
+        elapsed_ms = round((time.monotonic() - self.started) * 1000)
+        return {"event": kind, "ms": elapsed_ms, **data}
+
+    def event(self, kind: str, **data) -> None:
+        """Report something that happened once, e.g. a stage finishing."""
+        self._pending.append(self._record(kind, data))
+        self._maybe_flush()
+
+    def update(self, kind: str, **data) -> None:
+        """Report the current state of something ongoing; only the latest
+        update of each kind since the last write is kept."""
+        self._latest[kind] = self._record(kind, data)
+        self._maybe_flush()
+
+    def _maybe_flush(self) -> None:
+        if time.monotonic() - self._written >= PROGRESS_INTERVAL:
+            self.flush()
+
+    def flush(self) -> None:
+        records = sorted([*self._latest.values(), *self._pending], key=lambda r: r["ms"])
+        self._latest, self._pending = {}, []
+        self._written = time.monotonic()
+        if not records:
+            return
+        lines = "".join(json.dumps(record) + "\n" for record in records)
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            # One append per batch, so lines from several processes never mix
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(lines)
+        except OSError:
+            pass
+
+    def finish(self, **data) -> None:
+        """Report the outcome as the final 'done' event and write it now."""
+        self._pending.append(self._record("done", data))
+        self.flush()
+
+    def __getstate__(self):
+        # A worker's copy starts with nothing buffered
+        return {**self.__dict__, "_pending": [], "_latest": {}}
+
+    def _prune(self) -> None:
+        cutoff = time.time() - PROGRESS_FILE_TTL
+        try:
+            for path in self.path.parent.iterdir():
+                if path.stat().st_mtime < cutoff:
+                    path.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+
+def follow_events(
+    request_id: str, last_event_id: int = 0, directory: Path | None = None
+):
+    """Yield the progress events of a request as server-sent events, from
+    after `last_event_id` (an event's position in the request's file), as
+    they are written. The request may not have started yet. Ends after its
+    'done' event, or once nothing was written for PROGRESS_IDLE_TIMEOUT;
+    a keep-alive comment is sent when idle, so a disconnected client is
+    noticed. A request that has not started within PROGRESS_START_TIMEOUT
+    ends it with a 'done' event of status 404, so the client closes it
+    rather than reconnecting."""
+    path = Path(directory or PROGRESS_DIR) / request_id
+    offset = 0
+    event_id = 0
+    opened = last_activity = last_sent = time.monotonic()
+    while True:
+        chunk = b""
+        try:
+            with open(path, "rb") as f:
+                f.seek(offset)
+                chunk = f.read()
+        except OSError:
+            pass
+        # Only whole lines; a batch still being appended is read next time
+        chunk = chunk[: chunk.rfind(b"\n") + 1]
+        offset += len(chunk)
+        messages = []
+        done = False
+        for line in chunk.splitlines():
+            event_id += 1
+            kind = json.loads(line).get("event", "progress")
+            done = done or kind == "done"
+            if event_id > last_event_id:
+                messages.append(
+                    f"id: {event_id}\nevent: {kind}\ndata: {line.decode('utf-8')}\n\n"
+                )
+        now = time.monotonic()
+        if chunk:
+            last_activity = now
+        if messages:
+            yield "".join(messages)
+            last_sent = now
+        if done:
+            return
+        if not offset and now - opened >= PROGRESS_START_TIMEOUT:
+            line = json.dumps(
+                {"event": "done", "status": 404, "error": "The request never started."}
+            )
+            yield f"event: done\ndata: {line}\n\n"
+            return
+        if now - last_activity >= PROGRESS_IDLE_TIMEOUT:
+            return
+        if now - last_sent >= PROGRESS_HEARTBEAT:
+            yield ": keep-alive\n\n"
+            last_sent = now
+        time.sleep(PROGRESS_INTERVAL)
@@ -0,0 +1,183 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from services.dataset_store import DatasetStore
+
+
+# Number of analysed genomes kept in memory before the oldest is evicted.
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "64"))
+
+
+def cache_key(fasta_content: str, params: dict | None = None) -> str:
+    """Key a result by the FASTA content and the analysis parameters used."""
+    return cache_key_from_chunks([fasta_content.encode("utf-8")], params)
+
+
+def cache_key_from_chunks(chunks, params: dict | None = None) -> str:
+    """`cache_key` of content given as consecutive byte chunks, so a file can
+    be keyed without loading it whole."""
+    digest = hashlib.sha256()
+    for chunk in chunks:
+        digest.update(chunk)
+    digest.update(b"\0")
+    digest.update(json.dumps(params or {}, sort_keys=True).encode("utf-8"))
+    return digest.hexdigest()[:32]
+
+
+class ResultCache:
+    """Thread-safe LRU cache of processed genomes, keyed by `cache_key`.
+
+    Each entry holds the JSON-ready result plus its artifacts: per-sequence
+    tracks that are served by their own endpoints rather than with the result.
+    With a `store`, entries are also written to disk and misses are loaded
+    from it, so every server process sees every ingested dataset."""
+
+    def __init__(self, max_entries: int = RESULT_CACHE_SIZE, store=None):
+        self.max_entries = max(1, max_entries)
+        self.store = store
+        self._entries = OrderedDict()
+        self._latest = None
+        self._lock = threading.Lock()
+
+    def _entry(self, key: str) -> dict | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        if self.store is None:
+            return None
+        loaded = self.store.load(key)
+        if loaded is None:
+            return None
+        return self._insert(key, *loaded)
+
+    def _insert(self, key: str, result: dict, artifacts: dict | None) -> dict:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                entry = {"result": result, "artifacts": artifacts or {}}
+                self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            return entry
+
+    def get(self, key: str) -> dict | None:
+        entry = self._entry(key)
+        return entry["result"] if entry is not None else None
+
+    def get_artifacts(self, key: str) -> dict | None:
+        entry = self._entry(key)
+        return entry["artifacts"] if entry is not None else None
+
+    def put(self, key: str, result: dict, artifacts: dict | None = None) -> None:
+        with self._lock:
+            self._entries[key] = {"result": result, "artifacts": artifacts or {}}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        if self.store is not None:
+            self.store.save(key, result, artifacts)
+
+    def response_body(self, key: str, name: str) -> bytes | None:
+        """A serialised response body kept for a dataset, e.g. its
+        /api/genome_data JSON compressed with one content coding."""
+        with self._lock:
+            entry = self._entries.get(key)
+            body = entry.get("bodies", {}).get(name) if entry is not None else None
+        if body is None and self.store is not None:
+            body = self.store.response_body(key, name)
+            if body is not None:
+                self._keep_body(key, name, body)
+        return body
+
+    def put_response_body(self, key: str, name: str, data: bytes) -> None:
+        self._keep_body(key, name, data)
+        if self.store is not None:
+            self.store.save_response_body(key, name, data)
+
+    def _keep_body(self, key: str, name: str, data: bytes) -> None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                entry.setdefault("bodies", {})[name] = data
+
+    def record_source(self, record_key: str) -> tuple | None:
+        """(dataset id, sequence id) of a stored record with this key, from
+        the analysis that stored it; None if there is none, or no store."""
+        if self.store is None:
+            return None
+        return self.store.record_source(record_key)
+
+    def save_suffix_array(self, key: str, seq_id: str, suffix_array) -> None:
+        """Persist a motif index built for a dataset, so restarts and other
+        processes load it instead of rebuilding it."""
+        if self.store is not None:
+            self.store.save_suffix_array(key, seq_id, suffix_array)
+
+    def catalog(self) -> list:
+        """Every stored dataset (or, without a store, every cached one),
+        newest first, without loading any of them."""
+        if self.store is not None:
+            return self.store.catalog()
+        with self._lock:
+            entries = list(self._entries.items())
+        return [
+            {"dataset_id": key, **entry["result"].get("summary", {})}
+            for key, entry in reversed(entries)
+        ]
+
+    def set_latest(self, key: str) -> None:
+        """Mark the dataset served by default (e.g. /api/genome_data)."""
+        with self._lock:
+            self._latest = key
+        if self.store is not None:
+            self.store.set_latest(key)
+
+    def latest(self) -> str | None:
+        if self.store is not None:
+            return self.store.latest()
+        with self._lock:
+            return self._latest
+
+    def entries(self) -> list:
+        """Snapshot of (key, result, artifacts), oldest first, without
+        refreshing recency. Also loads datasets stored by other processes,
+        at most the cache size of them."""
+        with self._lock:
+            snapshot = [
+                (key, entry["result"], entry["artifacts"])
+                for key, entry in self._entries.items()
+            ]
+        if self.store is None:
+            return snapshot
+        known = {key for key, _, _ in snapshot}
+        missing = [key for key in self.store.keys() if key not in known]
+        stored = []
+        for key in missing[-self.max_entries :]:
+            loaded = self.store.load(key)
+            if loaded is not None:
+                entry = self._insert(key, *loaded)
+                stored.append((key, entry["result"], entry["artifacts"]))
+        return stored + snapshot
+
+    def keys(self) -> list:
+        with self._lock:
+            return list(self._entries.keys())
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            if key in self._entries:
+                return True
+        return self.store is not None and key in self.store
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+
+RESULT_CACHE = ResultCache(store=DatasetStore())
@@ -0,0 +1,110 @@
+import bz2
+import gzip
+import io
+import lzma
+import os
+import tempfile
+
+
+# Largest accepted upload (bytes), both as sent and once decompressed.
+MAX_UPLOAD_BYTES = int(os.getenv("MAX_UPLOAD_BYTES", str(1024**3)))
+READ_CHUNK = 1 << 20
+
+_MAGIC = (
+    (b"\x1f\x8b", "gzip", lambda binary: gzip.GzipFile(fileobj=binary, mode="rb")),
+    (b"BZh", "bz2", lambda binary: bz2.BZ2File(binary, mode="rb")),
+    (b"\xfd7zXZ\x00", "xz", lambda binary: lzma.LZMAFile(binary, mode="rb")),
+)
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+def spool_stream(stream, max_bytes: int = MAX_UPLOAD_BYTES):
+    """Copy a request body to an anonymous temporary file in chunks and
+    return it rewound, raising UploadTooLarge past `max_bytes`."""
+    spooled = tempfile.TemporaryFile()
+    copied = 0
+    while True:
+        chunk = stream.read(READ_CHUNK)
+        if not chunk:
+            break
+        copied += len(chunk)
+        if copied > max_bytes:
+            spooled.close()
+            raise UploadTooLarge(f"Upload exceeds {max_bytes} bytes.")
+        spooled.write(chunk)
+    spooled.seek(0)
+    return spooled
+
+
+def detect_compression(binary) -> str | None:
+    """'gzip', 'bz2', 'xz' or None, from the magic bytes of a seekable file."""
+    position = binary.tell()
+    head = binary.read(6)
+    binary.seek(position)
+    for magic, name, _ in _MAGIC:
+        if head.startswith(magic):
+            return name
+    return None
+
+
+def open_decompressed(binary):
+    """Binary reader over the decompressed content of a seekable file."""
+    compression = detect_compression(binary)
+    for _, name, opener in _MAGIC:
+        if name == compression:
+            return opener(binary)
+    return binary
+
+
+def open_text(binary) -> io.TextIOWrapper:
+    """Text handle over a (possibly compressed) sequence file for SeqIO."""
+    return io.TextIOWrapper(
+        open_decompressed(binary), encoding="utf-8", errors="replace"
+    )
+
+
+class CountingReader:
+    """Binary reader that counts the bytes read through it into `size` and
+    raises UploadTooLarge once they pass `max_bytes`, so a small compressed
+    upload cannot expand without bound."""
+
+    def __init__(self, reader, max_bytes: int = MAX_UPLOAD_BYTES):
+        self.reader = reader
+        self.max_bytes = max_bytes
+        self.size = 0
+
+    def read(self, size: int = -1) -> bytes:
+        chunk = self.reader.read(size)
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge(
+                f"Upload exceeds {self.max_bytes} bytes once decompressed."
+            )
+        return chunk
+
+
+def stripped_chunks(reader, size: int = READ_CHUNK):
+    """Yield the bytes of a reader without leading or trailing whitespace,
+    matching the str.strip() applied to FASTA sent as JSON, so identical
+    genomes get the same cache key either way."""
+    started = False
+    pending = b""
+    while True:
+        chunk = reader.read(size)
+        if not chunk:
+            return
+        if not started:
+            chunk = chunk.lstrip()
+            if not chunk:
+                continue
+            started = True
+        body = chunk.rstrip()
+        if body:
+            yield pending + body
+            pending = chunk[len(body) :]
+        else:
+            pending += chunk
+
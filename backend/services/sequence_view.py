@@ -0,0 +1,61 @@
+import numpy as np
+
+from services.composition import OTHER_CODE, encode_sequence
+
+
+# IUPAC complement, upper and lower case, matching Bio.Seq.reverse_complement;
+# anything else (gaps, X, '*') is left as is.
+_COMPLEMENT_TABLE = str.maketrans(
+    "ACGTURYSWKMBDHVNacgturyswkmbdhvn", "TGCAAYRSWMKVHDBNtgcaayrswmkvhdbn"
+)
+# Same, on composition codes (A=0, C=1, G=2, T=3, other=4)
+_CODE_COMPLEMENT = np.array([3, 2, 1, 0, OTHER_CODE], dtype=np.uint8)
+
+
+def reverse_complement(seq_str: str) -> str:
+    return seq_str.translate(_COMPLEMENT_TABLE)[::-1]
+
+
+def reverse_complement_codes(codes: np.ndarray) -> np.ndarray:
+    return _CODE_COMPLEMENT[codes[::-1]]
+
+
+class SequenceView:
+    """Strand-aware access to one record's sequence.
+
+    The full reverse complement is built at most once, on first use, and then
+    shared by every minus-strand detector. Region queries on the minus strand
+    slice it if it already exists and otherwise complement only the region, so
+    they never copy the whole record."""
+
+    def __init__(self, seq_str: str):
+        self.forward = seq_str
+        self._reverse = None
+
+    def __len__(self) -> int:
+        return len(self.forward)
+
+    @property
+    def reverse(self) -> str:
+        """Reverse complement of the whole record, read 5' to 3'."""
+        if self._reverse is None:
+            self._reverse = reverse_complement(self.forward)
+        return self._reverse
+
+    def strand(self, strand: str) -> str:
+        return self.reverse if strand == "-" else self.forward
+
+    def region(self, start: int, end: int, strand: str = "+") -> str:
+        """Bases of forward coordinates [start, end) read along `strand`."""
+        length = len(self.forward)
+        start, end = min(max(0, start), length), min(max(0, end), length)
+        if strand != "-":
+            return self.forward[start:end]
+        if self._reverse is not None:
+            return self._reverse[length - end : length - start] if start < end else ""
+        return reverse_complement(self.forward[start:end])
+
+    def region_codes(self, start: int, end: int, strand: str = "+") -> np.ndarray:
+        """`region` as composition codes."""
+        codes = encode_sequence(self.forward[start:end])
+        return reverse_complement_codes(codes) if strand == "-" else codes
@@ -0,0 +1,74 @@
+from multiprocessing import shared_memory
+from typing import NamedTuple
+
+import numpy as np
+
+from services.composition import CHUNK_SIZE, encode_sequence
+
+
+class SequenceHandle(NamedTuple):
+    """Where a run of composition codes lives: the name of a shared-memory
+    block, an offset and a length in bases (one byte each). Pickles to a few
+    dozen bytes whatever the length."""
+
+    name: str
+    offset: int
+    length: int
+
+    def region(self, start: int, end: int) -> "SequenceHandle":
+        """Handle of bases [start, end) of this run, clamped to it."""
+        start = min(max(start, 0), self.length)
+        end = min(max(end, start), self.length)
+        return SequenceHandle(self.name, self.offset + start, end - start)
+
+
+class SharedSequence:
+    """Composition codes of one record in a shared-memory block.
+
+    The record is encoded once, chunk by chunk, by the process that owns it;
+    worker processes are handed `SequenceHandle`s and map the block instead
+    of receiving the sequence, so fanning a record out to many tasks costs no
+    serialisation. The owner unlinks the block on `close`."""
+
+    def __init__(self, seq_str: str, chunk_size: int = CHUNK_SIZE):
+        length = len(seq_str)
+        self._shm = shared_memory.SharedMemory(create=True, size=max(1, length))
+        codes = np.ndarray((length,), dtype=np.uint8, buffer=self._shm.buf)
+        for start in range(0, length, chunk_size):
+            codes[start : start + chunk_size] = encode_sequence(
+                seq_str[start : start + chunk_size]
+            )
+        del codes
+        self.handle = SequenceHandle(self._shm.name, 0, length)
+
+    def close(self) -> None:
+        if self._shm is not None:
+            self._shm.close()
+            self._shm.unlink()
+            self._shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def read_shared(handle: SequenceHandle, fn, *args):
+    """Return fn(codes, *args) for the codes behind `handle`, mapped without
+    copying. `fn` must not keep or return views of `codes`."""
+    shm = shared_memory.SharedMemory(name=handle.name)
+    try:
+        return fn(
+            np.ndarray(
+                (handle.length,), dtype=np.uint8, buffer=shm.buf, offset=handle.offset
+            ),
+            *args,
+        )
+    finally:
+        try:
+            shm.close()
+        except BufferError:
+            # A failed call's traceback still holds a view; the mapping is
+            # released with it.
+            pass
@@ -0,0 +1,206 @@
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+
+try:
+    import fcntl
+except ImportError:  # Windows: calls are only coalesced within a process
+    fcntl = None
+
+from services.dataset_store import DATASET_DIR
+
+
+# Lock files untouched for this long are deleted, every PRUNE_INTERVAL calls
+# led. A call racing the deletion at worst runs alongside another one
+# instead of sharing its value.
+LOCK_FILE_TTL = 3600
+PRUNE_INTERVAL = 256
+
+_MISSING = object()
+
+
+def _release_acquired(acquiring: asyncio.Future) -> None:
+    if not acquiring.cancelled() and acquiring.exception() is None:
+        lock, _ = acquiring.result()
+        if lock is not None:
+            lock.release()
+
+
+class _ProcessLock:
+    """Exclusive lock on one key's file, shared by every process on the
+    machine, that also carries the value of the last call that held it."""
+
+    def __init__(self, path: Path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = open(path, "a+")
+
+    def acquire(self, since: float):
+        """Block until the lock is held. Returns the value written by a call
+        that finished after `since` (wall-clock), i.e. one that was already
+        running while this caller waited, else _MISSING."""
+        fcntl.flock(self._file, fcntl.LOCK_EX)
+        self._file.seek(0)
+        try:
+            record = json.loads(self._file.read() or "null")
+        except ValueError:
+            record = None
+        if isinstance(record, dict) and record.get("finished_at", 0) >= since:
+            return record["value"]
+        return _MISSING
+
+    def release(self, value=_MISSING) -> None:
+        try:
+            if value is not _MISSING:
+                self._file.seek(0)
+                self._file.truncate()
+                json.dump({"value": value, "finished_at": time.time()}, self._file)
+                self._file.flush()
+            fcntl.flock(self._file, fcntl.LOCK_UN)
+        finally:
+            self._file.close()
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into one computation.
+
+    Within a process the first caller (the leader) runs the function, and
+    later callers with the same key wait on its future and share its return
+    value or exception. Across processes, leaders hold a lock on a per-key
+    file in `lock_dir` while they run and leave the value in it; a leader
+    that had to wait for the lock takes a value finished after it started
+    waiting instead of running again. Values must therefore be small and
+    JSON-serialisable, e.g. a dataset id. Without fcntl (Windows), or
+    without `lock_dir`, only callers in one process are coalesced."""
+
+    def __init__(self, lock_dir: Path | None = None):
+        self.lock_dir = Path(lock_dir) if lock_dir is not None else None
+        self._flights = {}
+        self._lock = threading.Lock()
+        self._led = 0
+        self._joined = 0
+        self._shared_across_processes = 0
+
+    def _join(self, key: str) -> tuple:
+        """(future of the key's flight, whether this caller leads it)."""
+        with self._lock:
+            future = self._flights.get(key)
+            if future is not None:
+                self._joined += 1
+                return future, False
+            future = self._flights[key] = Future()
+            self._led += 1
+            prune = self._led % PRUNE_INTERVAL == 0
+        if prune:
+            self._prune_lock_files()
+        return future, True
+
+    def _prune_lock_files(self) -> None:
+        if self.lock_dir is None:
+            return
+        cutoff = time.time() - LOCK_FILE_TTL
+        try:
+            for path in self.lock_dir.glob("*.lock"):
+                if path.stat().st_mtime < cutoff:
+                    path.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    def _land(self, key: str, future: Future, value=_MISSING, error=None) -> None:
+        with self._lock:
+            del self._flights[key]
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(value)
+
+    def _process_lock(self, key: str) -> _ProcessLock | None:
+        if self.lock_dir is None or fcntl is None:
+            return None
+        name = hashlib.sha256(key.encode("utf-8")).hexdigest()[:32]
+        return _ProcessLock(self.lock_dir / f"{name}.lock")
+
+    def _acquire(self, key: str) -> tuple:
+        """(process lock or None, value shared by another process or _MISSING)."""
+        since = time.time()
+        lock = self._process_lock(key)
+        if lock is None:
+            return None, _MISSING
+        value = lock.acquire(since)
+        if value is not _MISSING:
+            with self._lock:
+                self._shared_across_processes += 1
+        return lock, value
+
+    async def _acquire_async(self, key: str) -> tuple:
+        """`_acquire` in a thread. If the caller is cancelled while the thread
+        waits for the lock, the lock is released as soon as it is taken."""
+        acquiring = asyncio.ensure_future(asyncio.to_thread(self._acquire, key))
+        try:
+            return await asyncio.shield(acquiring)
+        except asyncio.CancelledError:
+            acquiring.add_done_callback(_release_acquired)
+            raise
+
+    def do(self, key: str, fn) -> tuple:
+        """(fn() or the value of a concurrent call with the same key, whether
+        the value was shared)."""
+        future, leader = self._join(key)
+        if not leader:
+            return future.result(), True
+        try:
+            lock, value = self._acquire(key)
+            shared = value is not _MISSING
+            try:
+                if not shared:
+                    value = fn()
+            finally:
+                if lock is not None:
+                    lock.release(_MISSING if shared else value)
+        except BaseException as e:
+            self._land(key, future, error=e)
+            raise
+        self._land(key, future, value)
+        return value, shared
+
+    async def do_async(self, key: str, fn) -> tuple:
+        """`do` for a coroutine function on the event loop. Followers await
+        the leader's future without holding a thread; only a leader waiting
+        for another process's lock does. A cancelled follower leaves the
+        flight running; a cancelled leader lands it with CancelledError."""
+        future, leader = self._join(key)
+        if not leader:
+            return await asyncio.shield(asyncio.wrap_future(future)), True
+        try:
+            lock, value = await self._acquire_async(key)
+            shared = value is not _MISSING
+            try:
+                if not shared:
+                    value = await fn()
+            finally:
+                if lock is not None:
+                    await asyncio.to_thread(
+                        lock.release, _MISSING if shared else value
+                    )
+        except BaseException as e:
+            self._land(key, future, error=e)
+            raise
+        self._land(key, future, value)
+        return value, shared
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "in_flight": len(self._flights),
+                "led": self._led,
+                "joined": self._joined,
+                "shared_across_processes": self._shared_across_processes,
+            }
+
+
+# Ingests in flight, keyed by content or URL hash plus analysis parameters;
+# lock files live next to the datasets, hidden from the store's listing.
+INGEST_FLIGHTS = SingleFlight(DATASET_DIR / ".flights")
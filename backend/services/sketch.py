@@ -0,0 +1,212 @@
+import math
+import os
+import threading
+
+import numpy as np
+
+from services.kmers import kmer_values
+
+
+# FracMinHash parameters: canonical k-mers whose hash falls in the lowest
+# 1/scaled of the hash space are kept, so sketch size grows with genome size
+# and sketches of any two genomes are directly comparable.
+SKETCH_K = int(os.getenv("SKETCH_K", "21"))
+SKETCH_SCALED = int(os.getenv("SKETCH_SCALED", "1000"))
+# Fixed-width signature used for all-vs-all screening.
+SIGNATURE_BINS = 256
+
+_EMPTY_BIN = np.uint16(0xFFFF)
+
+
+def mix64(values: np.ndarray) -> np.ndarray:
+    """MurmurHash3 64-bit finaliser, applied element-wise."""
+    values = values.copy()
+    values ^= values >> np.uint64(33)
+    values *= np.uint64(0xFF51AFD7ED558CCD)
+    values ^= values >> np.uint64(33)
+    values *= np.uint64(0xC4CEB9FE1A85EC53)
+    values ^= values >> np.uint64(33)
+    return values
+
+
+class SketchBuilder:
+    """Streaming FracMinHash sketch of one sequence; feed encoded chunks in
+    order with `update` (the scan consumer protocol) and call `finish`."""
+
+    def __init__(self, k: int = SKETCH_K, scaled: int = SKETCH_SCALED):
+        self.k = k
+        self.scaled = scaled
+        self.max_hash = np.uint64((1 << 64) // scaled - 1)
+        self._tail = np.empty(0, dtype=np.uint8)
+        self._parts = []
+
+    def update(self, codes: np.ndarray) -> None:
+        if len(self._tail):
+            codes = np.concatenate([self._tail, codes])
+        self._tail = codes[len(codes) - (self.k - 1) :]
+        hashes = mix64(kmer_values(codes, self.k, canonical=True))
+        self._parts.append(np.unique(hashes[hashes <= self.max_hash]))
+
+    def finish(self) -> dict:
+        hashes = (
+            np.unique(np.concatenate(self._parts))
+            if self._parts
+            else np.empty(0, dtype=np.uint64)
+        )
+        return {
+            "k": self.k,
+            "scaled": self.scaled,
+            "hashes": hashes,
+            "signature": signature(hashes, self.max_hash),
+        }
+
+
+def signature(hashes: np.ndarray, max_hash: np.uint64) -> np.ndarray:
+    """One-permutation MinHash signature derived from a FracMinHash sketch:
+    the hash range is split into SIGNATURE_BINS bins and each bin keeps the
+    low 16 bits of its minimum hash (or an empty marker). Chance collisions
+    between different minima (1 in 65535) are negligible for screening."""
+    result = np.full(SIGNATURE_BINS, _EMPTY_BIN, dtype=np.uint16)
+    if not len(hashes):
+        return result
+    width = int(max_hash) // SIGNATURE_BINS + 1
+    bins = (hashes // np.uint64(width)).astype(np.int64)
+    # Hashes are sorted, so the first hash of each bin is its minimum
+    first = np.r_[True, bins[1:] != bins[:-1]]
+    result[bins[first]] = (hashes[first] % np.uint64(0xFFFF)).astype(np.uint16)
+    return result
+
+
+def mash_ani(jaccard, k: int):
+    """ANI estimate from Jaccard via the Mash distance; element-wise for an
+    array of Jaccards."""
+    if np.ndim(jaccard) == 0:
+        if jaccard <= 0:
+            return 0.0
+        distance = -math.log(2 * jaccard / (1 + jaccard)) / k
+        return max(0.0, 1.0 - distance)
+    jaccard = np.asarray(jaccard, dtype=np.float64)
+    with np.errstate(divide="ignore"):
+        distance = -np.log(2 * jaccard / (1 + jaccard)) / k
+    return np.where(jaccard > 0, np.maximum(0.0, 1.0 - distance), 0.0)
+
+
+def signature_jaccard(
+    signatures: np.ndarray, others: np.ndarray | None = None, block: int = 16
+) -> np.ndarray:
+    """Jaccard estimates of every stacked signature (N x bins) against every
+    one of `others` (M x bins; default the signatures themselves, N x N).
+
+    Equal bins are counted with blocked broadcast comparisons and bins empty
+    in both sketches are removed with one matrix product, so it costs
+    O(N * M * bins) vectorised work and no Python-level pair loop. Against
+    themselves only the upper triangle is compared and then mirrored."""
+    symmetric = others is None
+    others = signatures if symmetric else others
+    bins = signatures.shape[1]
+    both_empty = (signatures == _EMPTY_BIN).astype(np.float32) @ (
+        others == _EMPTY_BIN
+    ).astype(np.float32).T
+    equal = np.empty((len(signatures), len(others)), dtype=np.float32)
+    for start in range(0, len(signatures), block):
+        first = start if symmetric else 0
+        equal[start : start + block, first:] = (
+            signatures[start : start + block, None, :] == others[None, first:, :]
+        ).sum(axis=2, dtype=np.uint16)
+    if symmetric:
+        lower = np.tril_indices(len(signatures), k=-1)
+        equal[lower] = equal.T[lower]
+    union = bins - both_empty
+    return np.divide(
+        equal - both_empty,
+        union,
+        out=np.zeros_like(equal),
+        where=union > 0,
+    )
+
+
+def compare_sketches(a: dict, b: dict) -> dict:
+    """Exact FracMinHash Jaccard and containments for two sketches."""
+    shared = len(np.intersect1d(a["hashes"], b["hashes"], assume_unique=True))
+    size_a, size_b = len(a["hashes"]), len(b["hashes"])
+    union = size_a + size_b - shared
+    jaccard = shared / union if union else 0.0
+    return {
+        "shared_hashes": shared,
+        "jaccard": round(jaccard, 4),
+        "containment_a_in_b": round(shared / size_a, 4) if size_a else 0.0,
+        "containment_b_in_a": round(shared / size_b, 4) if size_b else 0.0,
+        "ani": round(mash_ani(jaccard, a["k"]), 4),
+    }
+
+
+class SketchMatrix:
+    """Stacked signatures of every stored sketch, and their all-vs-all
+    Jaccard estimates, for similarity queries.
+
+    Like the summary table it follows the store's key set: only the sketches
+    of datasets it has not seen are read, and only their rows of estimates
+    are computed (against every kept signature), while pruned datasets are
+    dropped. A query with no new datasets reads no manifests and compares
+    nothing. The estimates cost 4 bytes per pair of sequences."""
+
+    def __init__(self, store, k: int = SKETCH_K, scaled: int = SKETCH_SCALED):
+        self.store = store
+        self.k = k
+        self.scaled = scaled
+        self._keys = frozenset()
+        self._genomes = []
+        self._signatures = np.empty((0, SIGNATURE_BINS), dtype=np.uint16)
+        self._estimates = np.empty((0, 0), dtype=np.float32)
+        self._lock = threading.Lock()
+
+    def snapshot(self) -> tuple:
+        """(genomes, estimates): every stored sequence sketched with this
+        k and scale, oldest dataset first, as dicts with dataset_id, seq_id,
+        length and sketch, and their N x N Jaccard estimates. Both are
+        replaced, never changed, when the store changes."""
+        keys = self.store.keys()
+        with self._lock:
+            if self._keys == frozenset(keys):
+                return self._genomes, self._estimates
+            known = set(keys)
+            kept = [
+                index
+                for index, genome in enumerate(self._genomes)
+                if genome["dataset_id"] in known
+            ]
+            added = [
+                {
+                    "dataset_id": key,
+                    "seq_id": seq_id,
+                    "length": length,
+                    "sketch": sketch,
+                }
+                for key in keys
+                if key not in self._keys
+                for seq_id, length, sketch in self.store.sketches(key)
+                if sketch["k"] == self.k and sketch["scaled"] == self.scaled
+            ]
+            genomes = [self._genomes[index] for index in kept] + added
+            signatures = np.concatenate(
+                [
+                    self._signatures[kept],
+                    np.array(
+                        [genome["sketch"]["signature"] for genome in added],
+                        dtype=np.uint16,
+                    ).reshape(-1, SIGNATURE_BINS),
+                ]
+            )
+            estimates = np.empty((len(genomes), len(genomes)), dtype=np.float32)
+            estimates[: len(kept), : len(kept)] = self._estimates[np.ix_(kept, kept)]
+            if added and not kept:
+                estimates = signature_jaccard(signatures)
+            elif added:
+                fresh = signature_jaccard(signatures[len(kept) :], signatures)
+                estimates[len(kept) :] = fresh
+                estimates[: len(kept), len(kept) :] = fresh[:, : len(kept)].T
+            self._keys = frozenset(keys)
+            self._genomes = genomes
+            self._signatures = signatures
+            self._estimates = estimates
+            return genomes, estimates
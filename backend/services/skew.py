@@ -0,0 +1,90 @@
+import numpy as np
+
+from services.composition import block_positions, block_size_for, scan_composition
+
+
+# Bin counts stored per sequence; clients pick the coarsest level that still
+# fills their plot, so a 10 Mb chromosome never ships more than 8192 points.
+SKEW_RESOLUTIONS = (256, 1024, 4096, 8192)
+
+A, C, G, T = 0, 1, 2, 3
+
+
+def _skew(plus: np.ndarray, minus: np.ndarray) -> np.ndarray:
+    total = plus + minus
+    return np.divide(
+        plus - minus,
+        total,
+        out=np.zeros(len(total), dtype=np.float64),
+        where=total > 0,
+    )
+
+
+def _level(prefix: np.ndarray, positions: np.ndarray, bins: int) -> dict:
+    """Windowed and cumulative skews for `bins` block-aligned windows."""
+    num_blocks = len(prefix) - 1
+    edges = np.unique(np.linspace(0, num_blocks, bins + 1).round().astype(np.int64))
+    window_counts = prefix[edges[1:]] - prefix[edges[:-1]]
+    gc_skew = _skew(window_counts[:, G], window_counts[:, C])
+    at_skew = _skew(window_counts[:, A], window_counts[:, T])
+    return {
+        "bins": len(edges) - 1,
+        "starts": positions[edges[:-1]].tolist(),
+        "ends": positions[edges[1:]].tolist(),
+        "gc_skew": np.round(gc_skew, 4).tolist(),
+        "at_skew": np.round(at_skew, 4).tolist(),
+        "cumulative_gc_skew": np.round(np.cumsum(gc_skew), 4).tolist(),
+        "cumulative_at_skew": np.round(np.cumsum(at_skew), 4).tolist(),
+    }
+
+
+def compute_skew_profile(seq_str: str, resolutions=SKEW_RESOLUTIONS) -> dict:
+    """Multi-resolution GC/AT skew profile for a sequence."""
+    block_size = block_size_for(len(seq_str))
+    prefix = scan_composition(seq_str, block_size)
+    return skew_profile_from_prefix(prefix, len(seq_str), block_size, resolutions)
+
+
+def skew_profile_from_prefix(
+    prefix: np.ndarray, seq_len: int, block_size: int, resolutions=SKEW_RESOLUTIONS
+) -> dict:
+    """Multi-resolution GC/AT skew profile with replication origin/terminus.
+
+    All levels come from the same block prefix sums, so the cost is O(n)
+    regardless of how many resolutions are stored. The origin is estimated at
+    the minimum of the cumulative G - C count and the terminus at its maximum."""
+    if seq_len == 0:
+        return {
+            "length": 0,
+            "block_size": 1,
+            "origin": None,
+            "terminus": None,
+            "levels": [],
+        }
+
+    positions = block_positions(seq_len, block_size)
+    cumulative_gc = prefix[:, G] - prefix[:, C]
+
+    num_blocks = len(prefix) - 1
+    levels = []
+    for bins in sorted(set(min(bins, num_blocks) for bins in resolutions)):
+        level = _level(prefix, positions, bins)
+        if not levels or level["bins"] > levels[-1]["bins"]:
+            levels.append(level)
+
+    return {
+        "length": seq_len,
+        "block_size": block_size,
+        "origin": int(positions[np.argmin(cumulative_gc)]),
+        "terminus": int(positions[np.argmax(cumulative_gc)]),
+        "levels": levels,
+    }
+
+
+def select_level(profile: dict, bins: int) -> dict | None:
+    """Coarsest stored level with at least `bins` bins, else the finest one."""
+    levels = profile.get("levels", [])
+    for level in levels:
+        if level["bins"] >= bins:
+            return level
+    return levels[-1] if levels else None
@@ -0,0 +1,300 @@
+import os
+import threading
+from collections import Counter
+
+import numpy as np
+
+
+# Feature types always present as columns in comparison tables
+FEATURE_TYPES = [
+    "gene",
+    "CDS",
+    "ORF",
+    "GC_rich_region",
+    "tandem_repeat",
+    "CpG_island",
+]
+
+TEXT_COLUMNS = ["dataset_id", "name", "genus", "species"]
+NUMERIC_COLUMNS = [
+    "created_at",
+    "total_sequences",
+    "length",
+    "gc_content",
+    "at_content",
+    "gc_skew",
+    "at_skew",
+    "skew_amplitude",
+    "ori_ter_separation",
+    "features",
+    "features_per_mb",
+    "orfs_per_mb",
+    *FEATURE_TYPES,
+]
+# Columns summarised over the whole selection in every response
+SUMMARY_STATISTICS = [
+    "length",
+    "gc_content",
+    "gc_skew",
+    "skew_amplitude",
+    "ori_ter_separation",
+    "features_per_mb",
+    "orfs_per_mb",
+]
+GROUP_KEYS = ("genus", "species", "gc_band", "size_band")
+GC_BAND_WIDTH = 5
+
+_SNAPSHOT = "summary_table.npz"
+
+
+def _skew_statistics(profile: dict | None) -> tuple:
+    """(amplitude of the cumulative GC skew at the coarsest level, circular
+    origin-terminus distance as a fraction of the sequence)."""
+    if not profile or not profile.get("levels") or not profile.get("length"):
+        return 0.0, 0.0
+    cumulative = profile["levels"][0]["cumulative_gc_skew"]
+    distance = abs(profile["origin"] - profile["terminus"]) / profile["length"]
+    return (
+        round(max(cumulative) - min(cumulative), 4),
+        round(min(distance, 1 - distance), 4),
+    )
+
+
+def summary_row(
+    dataset_id: str, result: dict, artifacts: dict, created_at: float
+) -> dict:
+    """One comparison row per dataset: composition, feature density and
+    skew statistics of the whole genome, taxonomy from the description of
+    its longest record. Skews use base counts summed over records."""
+    sequences = result.get("sequences", [])
+    summary = result.get("summary", {})
+    counts = Counter()
+    for seq in sequences:
+        counts.update(seq.get("nucleotide_counts", {}))
+    gc = counts["G"] + counts["C"]
+    at = counts["A"] + counts["T"]
+    longest = max(sequences, key=lambda seq: seq.get("length", 0), default={})
+    words = longest.get("description", "").split()
+    if words and words[0] == longest.get("id"):
+        words = words[1:]
+    amplitude, separation = _skew_statistics(
+        artifacts.get("skew_profiles", {}).get(longest.get("id"))
+    )
+    feature_counts = Counter(feat.get("type") for feat in result.get("features", []))
+    length = summary.get("total_bases", 0)
+    megabases = length / 1e6
+    # Every ORF is also reported as a gene or CDS feature
+    orfs = feature_counts["ORF"]
+    features = sum(feature_counts.values())
+    return {
+        "dataset_id": dataset_id,
+        "name": " ".join(words),
+        "genus": words[0] if words else "",
+        "species": " ".join(words[:2]),
+        "created_at": created_at,
+        "total_sequences": summary.get("total_sequences", len(sequences)),
+        "length": length,
+        "gc_content": summary.get("overall_gc_content", 0.0),
+        "at_content": summary.get("overall_at_content", 0.0),
+        "gc_skew": round((counts["G"] - counts["C"]) / gc, 4) if gc else 0.0,
+        "at_skew": round((counts["A"] - counts["T"]) / at, 4) if at else 0.0,
+        "skew_amplitude": amplitude,
+        "ori_ter_separation": separation,
+        "features": features,
+        "features_per_mb": round(features / megabases, 2) if megabases else 0.0,
+        "orfs_per_mb": round(orfs / megabases, 2) if megabases else 0.0,
+        **{feat_type: feature_counts[feat_type] for feat_type in FEATURE_TYPES},
+    }
+
+
+def _statistics(values: np.ndarray) -> dict:
+    if not len(values):
+        return {"min": None, "max": None, "mean": None, "median": None, "std": None}
+    return {
+        "min": round(float(values.min()), 4),
+        "max": round(float(values.max()), 4),
+        "mean": round(float(values.mean()), 4),
+        "median": round(float(np.median(values)), 4),
+        "std": round(float(values.std()), 4),
+    }
+
+
+class SummaryTable:
+    """Columnar table of one `summary_row` per stored dataset.
+
+    Rows are written into each dataset's manifest at ingest; the table only
+    reads the manifests of datasets it has not seen yet and drops pruned
+    ones, so a query over thousands of genomes never loads their results or
+    feature lists. The columns are saved next to the datasets as an .npz
+    snapshot after every change, so a restarted process starts from it."""
+
+    def __init__(self, store):
+        self.store = store
+        self._rows = None
+        self._columns = None
+        self._lock = threading.Lock()
+
+    def _snapshot_path(self):
+        return self.store.directory / _SNAPSHOT
+
+    def _load_snapshot(self) -> dict:
+        try:
+            with np.load(self._snapshot_path(), allow_pickle=False) as snapshot:
+                if set(snapshot.files) != set(TEXT_COLUMNS + NUMERIC_COLUMNS):
+                    return {}
+                columns = {name: snapshot[name].tolist() for name in snapshot.files}
+        except (OSError, ValueError):
+            return {}
+        return {
+            key: {name: values[row] for name, values in columns.items()}
+            for row, key in enumerate(columns["dataset_id"])
+        }
+
+    def _save_snapshot(self, columns: dict) -> None:
+        path = self._snapshot_path()
+        tmp = path.with_name(f".{_SNAPSHOT}.{os.getpid()}.{threading.get_ident()}.tmp")
+        try:
+            with open(tmp, "wb") as f:
+                np.savez(f, **columns)
+            os.replace(tmp, path)
+        except OSError:
+            tmp.unlink(missing_ok=True)
+
+    def _row(self, key: str) -> dict | None:
+        row = self.store.summary_row(key)
+        if row is None or set(row) != set(TEXT_COLUMNS + NUMERIC_COLUMNS):
+            loaded = self.store.load(key)
+            if loaded is None:
+                return None
+            row = summary_row(key, *loaded, self.store.created_at(key))
+        return row
+
+    def columns(self) -> dict:
+        """Current columns (name -> array, oldest dataset first), after
+        adding rows for new datasets and dropping pruned ones."""
+        keys = self.store.keys()
+        with self._lock:
+            if self._rows is None:
+                self._rows = self._load_snapshot()
+            known = set(keys)
+            stale = [key for key in self._rows if key not in known]
+            for key in stale:
+                del self._rows[key]
+            added = 0
+            for key in keys:
+                if key not in self._rows:
+                    row = self._row(key)
+                    if row is not None:
+                        self._rows[key] = row
+                        added += 1
+            if self._columns is not None and not stale and not added:
+                return self._columns
+            ordered = sorted(self._rows.values(), key=lambda row: row["created_at"])
+            columns = {
+                name: np.array([row[name] for row in ordered], dtype=np.str_)
+                for name in TEXT_COLUMNS
+            }
+            columns.update(
+                {
+                    name: np.array([row[name] for row in ordered], dtype=np.float64)
+                    for name in NUMERIC_COLUMNS
+                }
+            )
+            self._columns = columns
+            if stale or added:
+                self._save_snapshot(columns)
+            return columns
+
+
+def group_labels(columns: dict, group_by: str) -> np.ndarray:
+    """Group of every row: a text column, or a 5% GC or 1 Mb length band."""
+    if group_by == "gc_band":
+        bands = np.floor(columns["gc_content"] / GC_BAND_WIDTH).astype(np.int64)
+        return np.array(
+            [f"{band * GC_BAND_WIDTH}-{(band + 1) * GC_BAND_WIDTH}%" for band in bands.tolist()]
+        )
+    if group_by == "size_band":
+        bands = np.floor(columns["length"] / 1e6).astype(np.int64)
+        return np.array([f"{band}-{band + 1} Mb" for band in bands.tolist()])
+    return columns[group_by]
+
+
+def query_summary(
+    columns: dict,
+    dataset_ids: set | None = None,
+    group_by: str | None = None,
+    sort: str | None = None,
+    descending: bool = True,
+    limit: int = 100,
+    offset: int = 0,
+) -> dict:
+    """Rows, or per-group aggregates, of the selected datasets sorted by one
+    column, plus whole-selection statistics and the GC distribution."""
+    selected = np.ones(len(columns["dataset_id"]), dtype=bool)
+    if dataset_ids is not None:
+        selected = np.isin(columns["dataset_id"], list(dataset_ids))
+    columns = {name: values[selected] for name, values in columns.items()}
+    count = len(columns["dataset_id"])
+
+    gc = columns["gc_content"]
+    edges = np.arange(
+        np.floor(gc.min()) if count else 0, (np.floor(gc.max()) if count else 0) + 2
+    )
+    histogram, _ = np.histogram(gc, bins=edges)
+    response = {
+        "datasets": count,
+        "statistics": {name: _statistics(columns[name]) for name in SUMMARY_STATISTICS},
+        "gc_distribution": {"edges": edges.tolist(), "counts": histogram.tolist()},
+    }
+
+    if group_by is None:
+        sort = sort or "created_at"
+        order = np.argsort(columns[sort], kind="stable")
+        if descending:
+            order = order[::-1]
+        page = order[offset : offset + limit]
+        response["columns"] = TEXT_COLUMNS + NUMERIC_COLUMNS
+        response["rows"] = [
+            {
+                name: (
+                    columns[name][row].item()
+                    if name in TEXT_COLUMNS
+                    else _number(columns[name][row])
+                )
+                for name in TEXT_COLUMNS + NUMERIC_COLUMNS
+            }
+            for row in page.tolist()
+        ]
+        return response
+
+    labels, inverse, sizes = np.unique(
+        group_labels(columns, group_by), return_inverse=True, return_counts=True
+    )
+    groups = []
+    for index, label in enumerate(labels.tolist()):
+        members = inverse == index
+        groups.append(
+            {
+                "group": label,
+                "count": int(sizes[index]),
+                **{
+                    name: _statistics(columns[name][members])
+                    for name in NUMERIC_COLUMNS
+                    if name != "created_at"
+                },
+            }
+        )
+    sort = sort or "count"
+    groups.sort(
+        key=lambda group: group[sort] if sort == "count" else group[sort]["mean"],
+        reverse=descending,
+    )
+    response["group_by"] = group_by
+    response["total_groups"] = len(groups)
+    response["groups"] = groups[offset : offset + limit]
+    return response
+
+
+def _number(value) -> int | float:
+    value = float(value)
+    return int(value) if value.is_integer() else value
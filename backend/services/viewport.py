@@ -0,0 +1,117 @@
+import base64
+import re
+
+import numpy as np
+
+from services.composition import BASE_CODES, NUM_CODES, encode_sequence, pack_codes
+from services.sequence_view import SequenceView
+
+
+# Base-level data is only sent for windows up to this many bases; wider
+# viewports get per-bin counts only, so a response is bounded by the screen.
+MAX_VIEW_BASES = 20000
+MAX_VIEW_BINS = 8192
+MAX_AMBIGUITY_RUNS = 10000
+COUNT_LABELS = BASE_CODES + "N"
+
+_AMBIGUOUS_RUN = re.compile(r"([^ACGT])\1*")
+
+
+def counts_at(seq_str: str, prefix: np.ndarray, block_size: int, positions) -> np.ndarray:
+    """Cumulative base-code counts of seq_str[:p] for each position p.
+
+    The stored block prefix sums give whole blocks; only the partial block
+    before each position is encoded, so the cost depends on the number of
+    positions, not on how far apart they are."""
+    positions = np.asarray(positions, dtype=np.int64)
+    rows = positions // block_size
+    counts = prefix[rows].astype(np.int64)
+    partial = positions - rows * block_size
+    if partial.any():
+        pieces = [
+            seq_str[row * block_size : position]
+            for row, position in zip(rows.tolist(), positions.tolist())
+        ]
+        codes = encode_sequence("".join(pieces))
+        owner = np.repeat(np.arange(len(positions)), partial)
+        flat = np.bincount(owner * NUM_CODES + codes, minlength=len(positions) * NUM_CODES)
+        counts += flat.reshape(-1, NUM_CODES)
+    return counts
+
+
+def binned_counts(
+    seq_str: str, prefix: np.ndarray, block_size: int, start: int, end: int, bins: int
+) -> dict:
+    """A, C, G, T and other-base counts in `bins` equal windows of [start, end)."""
+    bins = max(1, min(bins, end - start, MAX_VIEW_BINS))
+    edges = np.unique(np.linspace(start, end, bins + 1).round().astype(np.int64))
+    cumulative = counts_at(seq_str, prefix, block_size, edges)
+    window_counts = np.diff(cumulative, axis=0)
+    acgt = window_counts[:, :4].sum(axis=1)
+    gc = np.divide(
+        window_counts[:, 1] + window_counts[:, 2],
+        acgt,
+        out=np.zeros(len(acgt), dtype=np.float64),
+        where=acgt > 0,
+    )
+    return {
+        "bins": len(edges) - 1,
+        "edges": edges.tolist(),
+        "counts": {
+            label: window_counts[:, code].tolist()
+            for code, label in enumerate(COUNT_LABELS)
+        },
+        "gc_content": np.round(gc * 100, 2).tolist(),
+    }
+
+
+def ambiguity_runs(seq_str: str, start: int, end: int, limit: int = MAX_AMBIGUITY_RUNS) -> tuple:
+    """Run-length encoded non-ACGT stretches in [start, end) as
+    [start, length, base] triples, plus whether the list was cut at `limit`."""
+    runs = []
+    for match in _AMBIGUOUS_RUN.finditer(seq_str, start, end):
+        if len(runs) == limit:
+            return runs, True
+        runs.append([match.start(), match.end() - match.start(), match.group(1)])
+    return runs, False
+
+
+def pack_2bit(bases: str) -> str:
+    """Base64 of the bases packed four per byte (A=0, C=1, G=2, T=3, first
+    base in the high bits). Other bases pack as A; `ambiguity_runs` says
+    where they are."""
+    packed = pack_codes(encode_sequence(bases))
+    return base64.b64encode(packed.tobytes()).decode("ascii")
+
+
+def sequence_window(
+    seq_str: str,
+    composition: dict,
+    start: int,
+    end: int,
+    bins: int,
+    encoding: str = "text",
+    strand: str = "+",
+) -> dict:
+    """Compact view of seq_str[start:end] for a viewport: per-bin counts,
+    run-length encoded ambiguity runs and, for windows of at most
+    MAX_VIEW_BASES, the bases themselves ('text' or '2bit') read along
+    `strand`; only the window is reverse complemented for '-'."""
+    runs, truncated = ambiguity_runs(seq_str, start, end)
+    window = {
+        "start": start,
+        "end": end,
+        "strand": strand,
+        "binned": binned_counts(
+            seq_str, composition["prefix"], composition["block_size"], start, end, bins
+        ),
+        "ambiguity_runs": runs,
+        "ambiguity_runs_truncated": truncated,
+        "encoding": None,
+        "bases": None,
+    }
+    if end - start <= MAX_VIEW_BASES:
+        bases = SequenceView(seq_str).region(start, end, strand)
+        window["encoding"] = encoding
+        window["bases"] = pack_2bit(bases) if encoding == "2bit" else bases
+    return window
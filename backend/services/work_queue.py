@@ -0,0 +1,351 @@
+import os
+import pickle
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, wait
+
+from services.deadline import Deadline
+
+
+# Where the detector tasks of large analyses go: unset to run them here as
+# before, "local" for the in-process queue, or "sqlite:<path>" for a queue
+# database that `python worker.py` processes on any node consume
+WORK_QUEUE = os.getenv("WORK_QUEUE", "")
+# Analyses of fewer bases run here even with a queue, as its round trips
+# would cost more than they save
+QUEUE_MIN_LENGTH = int(os.getenv("QUEUE_MIN_LENGTH", str(4 * 1024**2)))
+# Seconds between polls for new tasks (workers) and finished ones (the
+# coordinator)
+QUEUE_POLL_INTERVAL = float(os.getenv("QUEUE_POLL_INTERVAL", "0.05"))
+# A task claimed this long ago is presumed lost with its worker and handed
+# to another, up to MAX_TASK_ATTEMPTS claims in all
+TASK_LEASE = float(os.getenv("TASK_LEASE", "300"))
+MAX_TASK_ATTEMPTS = 3
+# A task no worker has claimed this long after it was queued (or after its
+# lease ran out) is taken back and run by the coordinator itself, so an
+# analysis finishes even with no worker consuming the queue
+QUEUE_CLAIM_TIMEOUT = float(os.getenv("QUEUE_CLAIM_TIMEOUT", "10"))
+# Rows older than this belong to a coordinator that went away and are
+# deleted, every PRUNE_INTERVAL collector polls
+TASK_ROW_TTL = 24 * 3600
+PRUNE_INTERVAL = 1200
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+_queue = None
+_queue_lock = threading.Lock()
+
+
+class TaskFailed(Exception):
+    """A queued task raised, or its workers kept dying, on a worker node."""
+
+
+class InProcessQueue(ThreadPoolExecutor):
+    """Work queue whose tasks run on threads of this process. Tasks go
+    through the same submit and reduce steps as on a distributed queue, so
+    it stands in for one on a single node and in development."""
+
+    def __init__(self, workers: int | None = None):
+        super().__init__(max_workers=workers, thread_name_prefix="work-queue")
+
+
+class SQLiteQueue(Executor):
+    """Work queue in a SQLite database that worker processes on any node
+    with access to it consume (see `serve` and worker.py).
+
+    `submit` stores the task as a pickled (fn, args) row and returns a
+    Future; a collector thread polls the rows this queue submitted and
+    resolves their futures as workers finish them. Cancelling a future
+    deletes its row, so a queued task never runs. Tasks carry their data
+    and `fn` must be importable by the workers, which run the same code.
+    Workers unpickle what they are given, so only trusted processes may
+    write to the database.
+
+    Tasks left unclaimed for `claim_timeout` seconds (or that long past an
+    expired lease) are deleted and run on a thread of this process instead,
+    so a future never waits on workers that are not there."""
+
+    def __init__(
+        self,
+        path: str,
+        poll_interval: float = QUEUE_POLL_INTERVAL,
+        claim_timeout: float = QUEUE_CLAIM_TIMEOUT,
+    ):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.claim_timeout = claim_timeout
+        # Tells this queue's rows apart from other coordinators'
+        self.owner = uuid.uuid4().hex
+        self._local = threading.local()
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._collector = None
+        self._local_runner = None
+        self._closed = False
+        self._db().executescript(
+            """
+            CREATE TABLE IF NOT EXISTS tasks (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                owner TEXT NOT NULL,
+                status TEXT NOT NULL,
+                payload BLOB,
+                result BLOB,
+                worker TEXT,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at REAL NOT NULL,
+                claimed_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, id);
+            CREATE INDEX IF NOT EXISTS tasks_owner ON tasks (owner, status);
+            """
+        )
+
+    def _db(self) -> sqlite3.Connection:
+        db = getattr(self._local, "db", None)
+        if db is None:
+            # Autocommit; claims take the write lock with BEGIN IMMEDIATE
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            self._local.db = db
+        return db
+
+    def submit(self, fn, /, *args, **kwargs) -> Future:
+        if self._closed:
+            raise RuntimeError("Cannot submit to a shut down work queue.")
+        payload = pickle.dumps(
+            (fn, args, kwargs), protocol=pickle.HIGHEST_PROTOCOL
+        )
+        task_id = self._db().execute(
+            "INSERT INTO tasks (owner, status, payload, created_at)"
+            " VALUES (?, ?, ?, ?)",
+            (self.owner, QUEUED, payload, time.time()),
+        ).lastrowid
+        future = Future()
+        future.add_done_callback(lambda f: self._forget(task_id, f))
+        with self._lock:
+            self._futures[task_id] = future
+            if self._collector is None:
+                self._collector = threading.Thread(
+                    target=self._collect, name="work-queue-collector", daemon=True
+                )
+                self._collector.start()
+        return future
+
+    def _forget(self, task_id: int, future: Future) -> None:
+        if future.cancelled():
+            with self._lock:
+                self._futures.pop(task_id, None)
+            # A worker still running it finds its row gone and drops the result
+            self._db().execute("DELETE FROM tasks WHERE id = ?", (task_id,))
+
+    def _collect(self) -> None:
+        polls = 0
+        while not self._closed:
+            time.sleep(self.poll_interval)
+            with self._lock:
+                if not self._futures:
+                    continue
+            polls += 1
+            try:
+                self._collect_finished()
+                self._take_back_unclaimed()
+                if polls % PRUNE_INTERVAL == 0:
+                    self._db().execute(
+                        "DELETE FROM tasks WHERE created_at < ?",
+                        (time.time() - TASK_ROW_TTL,),
+                    )
+            except sqlite3.Error:
+                # e.g. busy for longer than the timeout; try again next poll
+                pass
+
+    def _collect_finished(self) -> None:
+        db = self._db()
+        rows = db.execute(
+            "SELECT id, status, result FROM tasks"
+            " WHERE owner = ? AND status IN (?, ?)",
+            (self.owner, DONE, FAILED),
+        ).fetchall()
+        if not rows:
+            return
+        db.executemany(
+            "DELETE FROM tasks WHERE id = ?", [(task_id,) for task_id, _, _ in rows]
+        )
+        for task_id, status, result in rows:
+            with self._lock:
+                future = self._futures.pop(task_id, None)
+            if future is None or not future.set_running_or_notify_cancel():
+                continue
+            try:
+                value = pickle.loads(result)
+            except Exception as e:
+                future.set_exception(TaskFailed(f"Unreadable task result: {e}"))
+                continue
+            if status == DONE:
+                future.set_result(value)
+            else:
+                future.set_exception(value)
+
+    def _take_back_unclaimed(self) -> None:
+        db = self._db()
+        now = time.time()
+        rows = db.execute(
+            "SELECT id, payload FROM tasks WHERE owner = ?"
+            " AND ((status = ? AND created_at < ?) OR (status = ? AND claimed_at < ?))",
+            (
+                self.owner,
+                QUEUED,
+                now - self.claim_timeout,
+                RUNNING,
+                now - TASK_LEASE - self.claim_timeout,
+            ),
+        ).fetchall()
+        for task_id, payload in rows:
+            # Unless a worker claimed (or renewed) it since; a worker still
+            # running it finds its row gone and drops the result
+            taken = db.execute(
+                "DELETE FROM tasks WHERE id = ? AND (status = ? OR claimed_at < ?)",
+                (task_id, QUEUED, now - TASK_LEASE - self.claim_timeout),
+            ).rowcount
+            with self._lock:
+                future = self._futures.pop(task_id, None) if taken else None
+            if future is None or not future.set_running_or_notify_cancel():
+                continue
+            if self._local_runner is None:
+                self._local_runner = ThreadPoolExecutor(
+                    thread_name_prefix="work-queue-local"
+                )
+            self._local_runner.submit(_run_into, future, payload)
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        if cancel_futures:
+            with self._lock:
+                futures = list(self._futures.values())
+            for future in futures:
+                future.cancel()
+        self._closed = True
+        if self._local_runner is not None:
+            self._local_runner.shutdown(wait=wait)
+
+    def claim(self, worker: str, lease: float = TASK_LEASE):
+        """(task id, pickled (fn, args, kwargs)) of the oldest queued task,
+        or of one whose lease ran out, now claimed by `worker`; None if
+        there is none. A task claimed MAX_TASK_ATTEMPTS times fails
+        instead."""
+        db = self._db()
+        now = time.time()
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            row = db.execute(
+                "SELECT id, payload, attempts FROM tasks"
+                " WHERE status = ? OR (status = ? AND claimed_at < ?)"
+                " ORDER BY id LIMIT 1",
+                (QUEUED, RUNNING, now - lease),
+            ).fetchone()
+            if row is None:
+                db.execute("COMMIT")
+                return None
+            task_id, payload, attempts = row
+            if attempts >= MAX_TASK_ATTEMPTS:
+                error = TaskFailed(f"Task {task_id} was lost by {attempts} workers.")
+                db.execute(
+                    "UPDATE tasks SET status = ?, result = ?, payload = NULL"
+                    " WHERE id = ?",
+                    (FAILED, pickle.dumps(error), task_id),
+                )
+                db.execute("COMMIT")
+                return self.claim(worker, lease)
+            db.execute(
+                "UPDATE tasks SET status = ?, worker = ?, claimed_at = ?,"
+                " attempts = attempts + 1 WHERE id = ?",
+                (RUNNING, worker, now, task_id),
+            )
+            db.execute("COMMIT")
+        except BaseException:
+            db.execute("ROLLBACK")
+            raise
+        return task_id, payload
+
+    def finish(self, task_id: int, worker: str, value, failed: bool = False) -> None:
+        """Store what a claimed task returned (or, `failed`, raised), unless
+        it was cancelled or handed to another worker meanwhile."""
+        try:
+            result = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            failed = True
+            result = pickle.dumps(TaskFailed(repr(value)))
+        self._db().execute(
+            "UPDATE tasks SET status = ?, result = ?, payload = NULL"
+            " WHERE id = ? AND status = ? AND worker = ?",
+            (FAILED if failed else DONE, result, task_id, RUNNING, worker),
+        )
+
+
+def _run_into(future: Future, payload: bytes) -> None:
+    """Run a pickled task taken back from the queue and resolve its future."""
+    try:
+        fn, args, kwargs = pickle.loads(payload)
+        value = fn(*args, **kwargs)
+    except Exception as e:
+        future.set_exception(e)
+    else:
+        future.set_result(value)
+
+
+def serve(queue: SQLiteQueue, stop: threading.Event | None = None) -> None:
+    """Run tasks from `queue` until `stop` is set: the loop of a worker
+    process."""
+    worker = f"{socket.gethostname()}:{os.getpid()}"
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        task = queue.claim(worker)
+        if task is None:
+            stop.wait(queue.poll_interval)
+            continue
+        task_id, payload = task
+        try:
+            fn, args, kwargs = pickle.loads(payload)
+            value = fn(*args, **kwargs)
+        except Exception as e:
+            try:
+                pickle.dumps(e)
+            except Exception:
+                e = TaskFailed(f"{type(e).__name__}: {e}")
+            queue.finish(task_id, worker, e, failed=True)
+        else:
+            queue.finish(task_id, worker, value)
+
+
+def open_queue(spec: str) -> Executor | None:
+    """The work queue a WORK_QUEUE value names; None for an empty one."""
+    if not spec:
+        return None
+    if spec == "local":
+        return InProcessQueue()
+    if spec.startswith("sqlite:"):
+        return SQLiteQueue(spec.removeprefix("sqlite:"))
+    raise ValueError(f"Unknown WORK_QUEUE '{spec}': use 'local' or 'sqlite:<path>'.")
+
+
+def get_work_queue(total_length: int) -> Executor | None:
+    """The configured work queue, created on first use, if an analysis of
+    `total_length` bases should hand its detector tasks to it."""
+    global _queue
+    if not WORK_QUEUE or total_length < QUEUE_MIN_LENGTH:
+        return None
+    with _queue_lock:
+        if _queue is None:
+            _queue = open_queue(WORK_QUEUE)
+        return _queue
+
+
+def result_before(future: Future, deadline: Deadline | None = None):
+    """`future`'s result, or None if `deadline` expires (or its token is
+    cancelled) first."""
+    deadline = deadline or Deadline()
+    while not future.done():
+        if deadline.expired():
+            return None
+        wait([future], timeout=deadline.poll_interval())
+    return future.result()
@@ -0,0 +1,63 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+# Worker counts default to the machine size; override with environment variables.
+ANALYSIS_WORKERS = int(os.getenv("ANALYSIS_WORKERS", "0")) or os.cpu_count() or 1
+FETCH_WORKERS = int(os.getenv("FETCH_WORKERS", "8"))
+# Records at least this long have their ORF scan fanned out across the pool
+PARALLEL_MIN_LENGTH = int(os.getenv("PARALLEL_MIN_LENGTH", str(2 * 1024**2)))
+
+_process_pool = None
+_fetch_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_analysis_pool() -> ProcessPoolExecutor:
+    """Process pool for CPU-bound analysis, created on first use.
+    Uses the spawn start method so it behaves the same on every platform and
+    never forks a threaded Flask worker."""
+    global _process_pool
+    with _pool_lock:
+        if _process_pool is None:
+            _process_pool = ProcessPoolExecutor(
+                max_workers=ANALYSIS_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _process_pool
+
+
+def get_detector_pool(seq_len: int) -> ProcessPoolExecutor | None:
+    """The analysis pool if detector tasks for a record of `seq_len` bases
+    should fan out to it: the record is long enough, there is more than one
+    worker, and this process is not itself a pool worker."""
+    if (
+        seq_len < PARALLEL_MIN_LENGTH
+        or ANALYSIS_WORKERS < 2
+        or multiprocessing.parent_process() is not None
+    ):
+        return None
+    return get_analysis_pool()
+
+
+def reset_analysis_pool() -> None:
+    """Drop a broken process pool (e.g. a worker was OOM-killed) so the next
+    request starts a fresh one."""
+    global _process_pool
+    with _pool_lock:
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+
+
+def get_fetch_pool() -> ThreadPoolExecutor:
+    """Thread pool for network-bound downloads, created on first use."""
+    global _fetch_pool
+    with _pool_lock:
+        if _fetch_pool is None:
+            _fetch_pool = ThreadPoolExecutor(
+                max_workers=FETCH_WORKERS, thread_name_prefix="fetch"
+            )
+        return _fetch_pool
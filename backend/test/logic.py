@@ -1,3 +1,5 @@
+import re
+
 import requests
 
 NUCLEOTIDE_PROPERTIES = {
@@ -8,25 +10,78 @@ NUCLEOTIDE_PROPERTIES = {
     "N": {"label": "Unknown"},
 }
 
-
-def process_nucleotide_sequence(sequence: str):
-    # Remove any whitespace (spaces, tabs, newlines) from the input sequence
-    sequence = "".join(sequence.split())
-
-    visualization_data = []
-
-    for i, base in enumerate(sequence.upper()):
-        props = NUCLEOTIDE_PROPERTIES.get(base, NUCLEOTIDE_PROPERTIES["N"])
-
-        visualization_data.append(
-            {
-                "index": i + 1,
-                "base": base,
-                "label": props["label"],
-            }
-        )
-
-    return visualization_data
+# Complement mapping (DNA, with N mapping to N; other characters unchanged)
+COMPLEMENT_TABLE = str.maketrans("ATGCN", "TACGN")
+
+
+def _run_bound(sequence: str, position: int, base: str, step: int) -> int:
+    """Where the run of `base` next to `position` ends: its first index
+    (step -1) or one past its last (step 1). Probes doubling chunks, so the
+    cost depends on the run's length, not the sequence's."""
+    size = 64
+    while True:
+        if step < 0:
+            chunk = sequence[max(0, position - size) : position].upper()
+            kept = len(chunk.rstrip(base))
+            position -= len(chunk) - kept
+        else:
+            chunk = sequence[position : position + size].upper()
+            kept = len(chunk.lstrip(base))
+            position += len(chunk) - kept
+        if kept or not chunk:
+            return position
+        size *= 2
+
+
+def process_nucleotide_sequence(
+    sequence: str, start: int = 0, end: int = None, bins: int = 100
+):
+    """
+    Compact visualisation data for a window of the sequence (0-based,
+    end-exclusive; default the whole sequence): the bases as one string,
+    A/C/G/T/other (N) counts in `bins` equal windows, run-length encoded runs
+    of N/ambiguous bases as [start, length, base], and the label of each base
+    letter. Replaces one dict per nucleotide.
+
+    Only the window is read, so the cost follows its size and not the
+    sequence's; the sequence must already be free of whitespace, as the
+    routes leave it. Runs cut by the window edges are reported whole.
+    """
+    end = len(sequence) if end is None else min(end, len(sequence))
+    start = min(max(0, start), end)
+    window = sequence[start:end].upper()
+
+    ambiguity_runs = [
+        [start + match.start(), match.end() - match.start(), match.group(1)]
+        for match in re.finditer(r"([^ACGT])\1*", window)
+    ]
+    if ambiguity_runs:
+        first, last = ambiguity_runs[0], ambiguity_runs[-1]
+        if first[0] == start:
+            run_start = _run_bound(sequence, start, first[2], -1)
+            first[1] += first[0] - run_start
+            first[0] = run_start
+        if last[0] + last[1] == end:
+            last[1] = _run_bound(sequence, end, last[2], 1) - last[0]
+
+    bins = max(1, min(bins, end - start))
+    edges = [start + (end - start) * i // bins for i in range(bins + 1)]
+    counts = {base: [] for base in "ACGTN"}
+    for left, right in zip(edges, edges[1:]):
+        piece = window[left - start : right - start]
+        for base in "ACGT":
+            counts[base].append(piece.count(base))
+        counts["N"].append(len(piece) - sum(counts[base][-1] for base in "ACGT"))
+
+    return {
+        "length": len(sequence),
+        "start": start,
+        "end": end,
+        "bases": window,
+        "binned": {"bins": bins, "edges": edges, "counts": counts},
+        "ambiguity_runs": ambiguity_runs,
+        "labels": {base: props["label"] for base, props in NUCLEOTIDE_PROPERTIES.items()},
+    }
 
 
 def fetch_data_from_url(url):
@@ -96,13 +151,5 @@ def get_reverse_complement(sequence: str) -> str:
     sequence = "".join(sequence.split())
     sequence = sequence.upper()
 
-    # Define the complement mapping (DNA, with N mapping to N)
-    complement_map = {"A": "T", "T": "A", "G": "C", "C": "G", "N": "N"}
-
-    # 1. Complement the sequence
-    complement_seq = "".join([complement_map.get(base, base) for base in sequence])
-
-    # 2. Reverse the complemented sequence
-    reverse_complement = complement_seq[::-1]
-
-    return reverse_complement
+    # Complement with one translate table pass, then reverse by slicing
+    return sequence.translate(COMPLEMENT_TABLE)[::-1]
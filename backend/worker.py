@@ -0,0 +1,54 @@
+"""Work queue worker node: python worker.py [--queue sqlite:<path>] [--processes N]
+
+Runs detector tasks that servers with the same WORK_QUEUE hand to the queue
+(see services/work_queue.py), one task at a time per process. Start it on
+any machine that runs this code and can open the queue."""
+import argparse
+import multiprocessing
+import os
+import signal
+import threading
+
+from services.work_queue import WORK_QUEUE, SQLiteQueue, serve
+
+
+def run(path: str) -> None:
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    try:
+        serve(SQLiteQueue(path), stop)
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--queue", default=WORK_QUEUE)
+    parser.add_argument(
+        "--processes",
+        type=int,
+        default=int(os.getenv("ANALYSIS_WORKERS", "0")) or os.cpu_count() or 1,
+    )
+    args = parser.parse_args()
+    if not args.queue.startswith("sqlite:"):
+        parser.error("--queue (or WORK_QUEUE) must be 'sqlite:<path>'.")
+    path = args.queue.removeprefix("sqlite:")
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run, args=(path,), name=f"worker-{i}")
+        for i in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    print(f"{len(processes)} worker processes serving {path}")
+    try:
+        for process in processes:
+            process.join()
+    except KeyboardInterrupt:
+        for process in processes:
+            process.terminate()
+            process.join()
+
+
+if __name__ == "__main__":
+    main()
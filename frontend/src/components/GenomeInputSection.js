@@ -14,6 +14,7 @@ export const GenomeInputSection = ({
   setInputUrl,
   handleLoadFasta,
   loading,
+  progress,
   error,
   handleKeyPress,
   title = "Load Genome Data",
@@ -56,6 +57,10 @@ export const GenomeInputSection = ({
           </div>
         </div>
 
+        {loading && progress && (
+          <p className="text-gray-300 text-sm">{progress}</p>
+        )}
+
         {error && (
           <div className="p-4 bg-red-900/50 border border-red-700 rounded-md text-red-200 text-sm">
             <p className="font-semibold mb-1">Error:</p>
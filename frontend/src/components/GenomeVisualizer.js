@@ -1,6 +1,6 @@
 "use client";
 
-import { useState } from "react";
+import { useRef, useState } from "react";
 import Header from "./Header";
 import StatisticsCards from "./StatisticsCards";
 import Controls from "./Controls";
@@ -10,6 +10,28 @@ import DetailedStatistics from "./DetailedStatistics";
 import FeatureTable from "./FeatureTable";
 import { GenomeInputSection } from "./GenomeInputSection";
 
+// One line on where an ingest is, from its latest progress event
+const describeProgress = (kind, data) => {
+  switch (kind) {
+    case "download": {
+      const mb = (data.bytes / 1e6).toFixed(1);
+      return data.total
+        ? `Downloading ${mb} of ${(data.total / 1e6).toFixed(1)} MB`
+        : `Downloading ${mb} MB`;
+    }
+    case "parse":
+      return `Parsed ${data.records} records (${(data.bases / 1e6).toFixed(1)} Mb)`;
+    case "detect":
+      return `Detecting ${data.stage}: ${data.records_done} of ${data.records} records`;
+    case "kmers":
+      return `Counting k-mers: ${data.records_done} of ${data.records} records`;
+    case "stage":
+      return `Finished ${data.stage} in ${Math.round(data.stage_ms)} ms`;
+    default:
+      return null;
+  }
+};
+
 export default function GenomeVisualizer() {
   const [genomeData, setGenomeData] = useState(null);
   const [loading, setLoading] = useState(false);
@@ -21,9 +43,47 @@ export default function GenomeVisualizer() {
     "https://raw.githubusercontent.com/bunleaps/genomic-visualization-dashboard/refs/heads/main/backend/test/NC_003198.1.fasta"
   );
   const [inputUrl, setInputUrl] = useState(fastaUrl);
+  const [progress, setProgress] = useState(null);
+  // The ingest in progress, cancelled when a new one supersedes it
+  const pendingIngest = useRef(null);
+
+  const cancelPendingIngest = () => {
+    const pending = pendingIngest.current;
+    if (!pending) return;
+    pendingIngest.current = null;
+    pending.controller.abort();
+    pending.events.close();
+    fetch("http://localhost:8000/api/ingest/cancel", {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/json",
+      },
+      body: JSON.stringify({ request_id: pending.requestId }),
+    }).catch(() => {});
+  };
 
   const fetchGenomeData = async (url) => {
+    cancelPendingIngest();
+    const requestId = crypto.randomUUID().replaceAll("-", "");
+    const pending = {
+      requestId,
+      controller: new AbortController(),
+      // Opened before the ingest is sent, so no progress is missed
+      events: new EventSource(
+        `http://localhost:8000/api/ingest/${requestId}/events`
+      ),
+    };
+    for (const kind of ["download", "parse", "detect", "kmers", "stage"]) {
+      pending.events.addEventListener(kind, (e) => {
+        if (pendingIngest.current === pending) {
+          setProgress(describeProgress(kind, JSON.parse(e.data)));
+        }
+      });
+    }
+    pending.events.addEventListener("done", () => pending.events.close());
+    pendingIngest.current = pending;
     setLoading(true);
+    setProgress(null);
     setError(null);
     try {
       const response = await fetch("http://localhost:8000/api/ingest", {
@@ -31,7 +91,8 @@ export default function GenomeVisualizer() {
         headers: {
           "Content-Type": "application/json",
         },
-        body: JSON.stringify({ url }),
+        body: JSON.stringify({ url, request_id: pending.requestId }),
+        signal: pending.controller.signal,
       });
 
       if (!response.ok) {
@@ -47,9 +108,15 @@ export default function GenomeVisualizer() {
         setSelectedSequence(uniqueSeqs[0]);
       }
     } catch (err) {
+      if (err.name === "AbortError") return;
       setError(err.message);
     } finally {
-      setLoading(false);
+      pending.events.close();
+      if (pendingIngest.current === pending) {
+        pendingIngest.current = null;
+        setLoading(false);
+        setProgress(null);
+      }
     }
   };
 
@@ -103,6 +170,7 @@ export default function GenomeVisualizer() {
             setInputUrl={setInputUrl}
             handleLoadFasta={handleLoadFasta}
             loading={loading}
+            progress={progress}
             error={error}
             handleKeyPress={handleKeyPress}
             title={error ? "Error Loading Genome" : "Load Genome Data"}
@@ -195,6 +263,9 @@ export default function GenomeVisualizer() {
             <p className="mt-6 text-gray-300 font-medium animate-pulse uppercase tracking-wider text-sm">
               Sequencing Data...
             </p>
+            {progress && (
+              <p className="mt-2 text-gray-400 text-sm">{progress}</p>
+            )}
           </div>
         )}
 